@@ -1,20 +1,58 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
-from graph_app import soc_app
+from graph_app import public_state, soc_app
+from backends.llm_scheduler import scheduler
+from backends.llm_backend import cascade_stats
+from backends.local_classifier import local_stats
+from backends.llm_policy import policy
+from backends.rag_context import context_stats
+from backends.cache_backend import cache_info
+from backends.circuit_breaker import breaker_stats
+from backends.rag_backend import (
+    astartup, ashutdown, embedding_cache_stats, rag_batching_stats, rag_filter_stats, vector_index_stats,
+)
+from backends.rag_snapshot import arestore_on_startup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Fresh node: load the exported RAG snapshot instead of re-seeding (empty collection only)
+    await arestore_on_startup()
+    # One collection check and warm pooled connections, instead of a round trip per search
+    await astartup()
+    yield
+    await ashutdown()
 
-app = FastAPI(title="SOC LangGraph API")
+
+app = FastAPI(title="SOC LangGraph API", lifespan=lifespan)
 
 @app.get("/health")
 def health_check():
     """Health check endpoint for Docker"""
-    return {"status": "healthy", "service": "soc-analysis"}
+    return {
+        "status": "healthy",
+        "service": "soc-analysis",
+        "llm_scheduler": scheduler.stats(),  # queue_depth, calls, retries, throttled
+        "llm_cascade": cascade_stats(),      # per-model calls, escalations, mean latency
+        "local_classifier": local_stats(),   # items answered locally vs escalated
+        "llm_policy": policy.stats(),        # admitted / sampled out / capped, backlog pressure
+        "rag_context": context_stats(),      # prompt tokens saved by context compaction
+        "embedding_cache": embedding_cache_stats(),  # size, hits, misses, evictions
+        "rag_batching": rag_batching_stats(),        # coalesced searches: batches vs calls
+        "vector_index": vector_index_stats(),        # backend; rows / IVF lists for numpy
+        "rag_filter": rag_filter_stats(),            # rule-family filtered searches vs whole-collection fallbacks
+        "verdict_cache": cache_info(),               # entries, hits / misses, entries from the warm-up artifact
+        "circuit_breakers": breaker_stats(),         # per dependency: closed / open / half_open, window failure rate
+    }
 
 @app.post("/analyze")
-def analyze(payload: dict):
+async def analyze(payload: dict):
     """
     Analyze HTTP requests for security threats.
     
@@ -23,7 +61,12 @@ def analyze(payload: dict):
       "requests": [
         "hello world",
         "id=1 UNION SELECT password FROM users"
-      ]
+      ],
+      "deadline_ms": 3000,  (optional, default SLOW_PATH_BUDGET_MS)
+      "debug": true         (optional: per-node / backend-call timings in result_json["debug"])
     }
+
+    Items whose embedding / retrieval / LLM cannot finish within the
+    deadline return the rule-engine verdict with "degraded": true.
     """
-    return soc_app.invoke(payload)
+    return public_state(await soc_app.ainvoke(payload))
@@ -45,6 +45,8 @@ def batch_decoder(input_data) -> SOCState:
             "rag_context": "",
             "llm_output": {},
             "final_msg": "",
+            "degraded": False,
+            "degraded_reason": "",
         })
 
     return {
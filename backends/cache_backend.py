@@ -1,48 +1,169 @@
 import hashlib
+import os
 import pickle
+import re
+import threading
+import time
+from contextlib import contextmanager
 from typing import Dict, Any, Optional
 from pathlib import Path
 
+from backends.tracing import span
+
 # Persistent cache file (moved to data/ folder)
 CACHE_FILE = Path(__file__).parent.parent / "data" / "cache_data.pkl"
 
+# Precomputed verdicts (scripts/warm_verdict_cache.py), served under live entries from import on
+CACHE_WARMUP_FILE = Path(os.getenv("CACHE_WARMUP_FILE", str(Path(__file__).parent.parent / "data" / "cache_warmup.pkl")))
+WARMUP_VERSION = 1
+
+
+def canonical_request(text: str) -> str:
+    """
+    Form of a request used as cache key: lowercase, CRLF -> LF, blank runs
+    collapsed and each line stripped. Requests that differ only in
+    whitespace / case share a verdict.
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").strip().split("\n")
+    return "\n".join(re.sub(r"[ \t]+", " ", line).strip() for line in lines).lower()
+
+
+def _make_key(text: str) -> str:
+    return hashlib.sha256(canonical_request(text).encode()).hexdigest()
+
+
+def _rekey(cache: dict) -> dict:
+    """Move entries written under the old lowercase-only key to their canonical key."""
+    rekeyed = {}
+    for key, value in cache.items():
+        raw = value.get("raw_request") if isinstance(value, dict) else None
+        rekeyed[_make_key(raw) if raw else key] = value
+    return rekeyed
+
+
 # Load cache from disk on import
 if CACHE_FILE.exists():
     try:
         with open(CACHE_FILE, "rb") as f:
-            _CACHE = pickle.load(f)
+            _CACHE = _rekey(pickle.load(f))
     except Exception:
         _CACHE = {}
 else:
     _CACHE = {}
 
+# Warm-up verdicts: read-only and never persisted, so a large artifact does not
+# make every cache_set re-pickle it; live entries shadow them
+_WARMUP: Dict[str, Dict[str, Any]] = {}
+
+# Guards _CACHE writes/dumps when cache_set runs from worker threads (async path)
+_SAVE_LOCK = threading.Lock()
+
+# False inside deferred_saves(): bulk writers dump once instead of after every write
+_AUTOSAVE = True
+
+_STATS = {"hits": 0, "misses": 0, "warmup_loaded": 0}
+
 
 def _save_cache():
-    """Save cache to disk"""
+    """Save cache to disk (live entries only: the warm-up artifact is its own file)"""
     try:
-        with open(CACHE_FILE, "wb") as f:
+        with span("cache.persist", entries=len(_CACHE)), _SAVE_LOCK, open(CACHE_FILE, "wb") as f:
             pickle.dump(_CACHE, f)
     except Exception as e:
         print(f"Warning: Failed to save cache: {e}")
 
 
-def _make_key(text: str) -> str:
-    return hashlib.sha256(text.lower().encode()).hexdigest()
-
-
 def cache_get(text: str) -> Optional[Dict[str, Any]]:
     """Get full result object from cache"""
     key = _make_key(text)
-    return _CACHE.get(key)
+    value = _CACHE.get(key)
+    if value is None:
+        value = _WARMUP.get(key)
+    _STATS["hits" if value else "misses"] += 1
+    return value
 
 
 def cache_set(text: str, value: Dict[str, Any]) -> None:
     """Save full result object to cache"""
     key = _make_key(text)
-    _CACHE[key] = value
-    _save_cache()  # Save to disk after every write
+    with _SAVE_LOCK:
+        _CACHE[key] = value
+        _WARMUP.pop(key, None)  # superseded by the live verdict
+    if _AUTOSAVE:
+        _save_cache()  # Save to disk after every write
+
+
+@contextmanager
+def deferred_saves(persist: bool = True):
+    """
+    Bulk writers (warm-up job): cache_set only updates memory; the cache is
+    dumped once on exit (persist=False: never - the caller ships an artifact).
+    """
+    global _AUTOSAVE
+    _AUTOSAVE = False
+    try:
+        yield
+    finally:
+        _AUTOSAVE = True
+        if persist:
+            _save_cache()
+
+
+# =====================================================
+# Warm-up artifact
+# =====================================================
+
+def save_warmup(path: Path, entries: Dict[str, Dict[str, Any]], source: str = "") -> None:
+    """Write precomputed verdicts (canonical key -> cache entry) as a loadable artifact."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    artifact = {
+        "version": WARMUP_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "source": source,
+        "entries": entries,
+    }
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump(artifact, f)
+    os.replace(tmp, path)
+
+
+def read_warmup(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Entries of a warm-up artifact ({} if missing)."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, "rb") as f:
+        artifact = pickle.load(f)
+    if artifact.get("version") != WARMUP_VERSION:
+        raise Exception(f"Unsupported cache warm-up artifact version {artifact.get('version')} in {path}")
+    return artifact["entries"]
+
+
+def load_warmup(path: Path = CACHE_WARMUP_FILE) -> int:
+    """Serve a warm-up artifact under the live cache (live verdicts win). Returns entries added."""
+    try:
+        entries = read_warmup(path)
+    except Exception as e:
+        print(f"Warning: Failed to load cache warm-up {path}: {e}")
+        return 0
+    with _SAVE_LOCK:
+        added = {key: value for key, value in entries.items() if key not in _CACHE and key not in _WARMUP}
+        _WARMUP.update(added)
+    _STATS["warmup_loaded"] += len(added)
+    return len(added)
+
+
+load_warmup()
+
+
+def cache_entries() -> Dict[str, Dict[str, Any]]:
+    """Every verdict served: warm-up entries overlaid by the live ones (training, inspection)."""
+    with _SAVE_LOCK:
+        return {**_WARMUP, **_CACHE}
 
 
 def cache_info() -> Dict[str, int]:
     """Return cache statistics"""
-    return {"cached_items": len(_CACHE)}
+    return {"cached_items": len(_CACHE) + len(_WARMUP), "warmup_items": len(_WARMUP), **_STATS}
@@ -0,0 +1,193 @@
+"""Per-dependency circuit breakers (HF embeddings, Qdrant, Groq)
+
+Every network call to a dependency goes through its breaker:
+- closed:    calls pass; outcomes within the last BREAKER_WINDOW_S seconds are
+             kept, and once BREAKER_MIN_CALLS of them show a failure rate of
+             BREAKER_FAILURE_RATE or more, the breaker opens
+- open:      calls fail immediately with CircuitOpen (no network, no timeout)
+             for BREAKER_OPEN_S seconds
+- half-open: up to BREAKER_HALF_OPEN_PROBES calls are let through as probes;
+             a success closes the breaker, a failure re-opens it
+
+Only dependency faults count as failures: transport errors, timeouts, 5xx and
+429. Client errors (4xx) and a request running out of its own budget
+(DeadlineExceeded without an underlying error, or a timeout shortened below
+the stage cap by the request's deadline_ms) do not: a client sending tiny
+budgets must not open a breaker for everyone. The breaker state
+doubles as cached health: /health reports it without probing anything.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+from backends.deadline import DeadlineExceeded
+
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_WINDOW_S = float(os.getenv("BREAKER_WINDOW_S", "30"))
+BREAKER_OPEN_S = float(os.getenv("BREAKER_OPEN_S", "15"))
+BREAKER_HALF_OPEN_PROBES = int(os.getenv("BREAKER_HALF_OPEN_PROBES", "1"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+
+def _status(exc: Exception):
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+def counts_as_failure(exc: BaseException) -> bool:
+    """Whether an exception says something about the dependency's health."""
+    if isinstance(exc, CircuitOpen) or not isinstance(exc, Exception):
+        return False  # cancellation (caller gave up) says nothing either
+    if getattr(exc, "budget_limited", False):
+        return False  # timed out on the caller's budget, not the stage cap (see deadline.budget_bounded)
+    if isinstance(exc, DeadlineExceeded):
+        # Budget spent by retries of a failing dependency counts; a short budget alone does not
+        return exc.__cause__ is not None and counts_as_failure(exc.__cause__)
+    status = _status(exc)
+    if isinstance(status, int):
+        return status >= 500 or status == 429
+    return True
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_rate: float = BREAKER_FAILURE_RATE, min_calls: int = BREAKER_MIN_CALLS,
+                 window: float = BREAKER_WINDOW_S, open_seconds: float = BREAKER_OPEN_S,
+                 half_open_probes: int = BREAKER_HALF_OPEN_PROBES, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._outcomes: deque = deque()   # (time, ok)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self._last_error = ""
+        self._stats = {"calls": 0, "failures": 0, "short_circuited": 0, "opened": 0}
+
+    # ---------- state ----------
+    def _trim(self, now: float) -> None:
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+
+    def _open(self, now: float) -> None:
+        if self._state != OPEN:
+            self._stats["opened"] += 1
+        self._state, self._opened_at, self._probes = OPEN, now, 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def before(self) -> None:
+        """Admit one call or raise CircuitOpen. Every admitted call must end in after()."""
+        with self._lock:
+            now = self._clock()
+            if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+                self._state, self._probes = HALF_OPEN, 0
+            if self._state == OPEN or (self._state == HALF_OPEN and self._probes >= self.half_open_probes):
+                self._stats["short_circuited"] += 1
+                raise CircuitOpen(f"{self.name} unavailable (circuit open: {self._last_error})")
+            if self._state == HALF_OPEN:
+                self._probes += 1
+            self._stats["calls"] += 1
+
+    def after(self, exc: BaseException = None) -> None:
+        """Record the outcome of an admitted call (exc=None: success)."""
+        failed = exc is not None and counts_as_failure(exc)
+        neutral = exc is not None and not failed
+        with self._lock:
+            now = self._clock()
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                if failed:
+                    self._last_error = f"{type(exc).__name__}: {exc}"[:200]
+                    self._stats["failures"] += 1
+                    self._open(now)
+                elif not neutral:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            if neutral:
+                return
+            self._outcomes.append((now, not failed))
+            self._trim(now)
+            if failed:
+                self._last_error = f"{type(exc).__name__}: {exc}"[:200]
+                self._stats["failures"] += 1
+                failures = sum(1 for _, ok in self._outcomes if not ok)
+                if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+                    self._open(now)
+
+    # ---------- calls ----------
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        self.before()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self.after(e)
+            raise
+        self.after()
+        return result
+
+    async def acall(self, afn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        self.before()
+        try:
+            result = await afn(*args, **kwargs)
+        except BaseException as e:
+            self.after(e)
+            raise
+        self.after()
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state, self._probes = CLOSED, 0
+            self._outcomes.clear()
+
+    def stats(self) -> dict:
+        state = self.state
+        with self._lock:
+            self._trim(self._clock())
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                "state": state,
+                "window_calls": len(self._outcomes),
+                "window_failure_rate": round(failures / len(self._outcomes), 3) if self._outcomes else 0.0,
+                "last_error": self._last_error,
+                **self._stats,
+            }
+
+
+_BREAKERS: dict = {}
+_REGISTRY_LOCK = threading.Lock()
+
+
+def breaker(name: str) -> CircuitBreaker:
+    """The process-wide breaker of a dependency (created on first use)."""
+    with _REGISTRY_LOCK:
+        if name not in _BREAKERS:
+            _BREAKERS[name] = CircuitBreaker(name)
+        return _BREAKERS[name]
+
+
+def breaker_stats() -> dict:
+    with _REGISTRY_LOCK:
+        breakers = dict(_BREAKERS)
+    return {name: b.stats() for name, b in breakers.items()}
@@ -0,0 +1,131 @@
+"""Bounded fan-out helpers shared by the sync and async backends"""
+import asyncio
+import contextvars
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Sequence
+
+from backends import tracing
+
+
+def run_bounded(fn: Callable[..., Any], calls: Sequence[tuple], limit: int) -> List[Any]:
+    """
+    Run fn(*args) for every args tuple on at most `limit` threads.
+    Results keep the input order; an exception is returned in place of its
+    result so one failing call never takes down the others.
+    """
+    def _safe(args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            return e
+
+    if not calls:
+        return []
+    if limit <= 1 or len(calls) == 1:
+        return [_safe(args) for args in calls]
+
+    # Each call runs in a copy of the caller's context (request trace, current span)
+    contexts = [contextvars.copy_context() for _ in calls]
+    with ThreadPoolExecutor(max_workers=min(limit, len(calls))) as pool:
+        return list(pool.map(lambda ctx, args: ctx.run(_safe, args), contexts, calls))
+
+
+async def arun_bounded(afn: Callable[..., Awaitable[Any]], calls: Sequence[tuple], limit: int) -> List[Any]:
+    """Async variant of run_bounded: at most `limit` coroutines in flight."""
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def _safe(args):
+        async with semaphore:
+            try:
+                return await afn(*args)
+            except Exception as e:
+                return e
+
+    return list(await asyncio.gather(*(_safe(args) for args in calls)))
+
+
+class _Queue:
+    """Callers waiting for the next batch on one event loop."""
+    __slots__ = ("pending", "size", "timer")
+
+    def __init__(self):
+        self.pending: list = []
+        self.size = 0
+        self.timer = None
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent async callers into one batched call.
+
+    submit(items, deadline) waits up to `window` seconds for other callers (or
+    until `max_size` items are pending), then runs batch_fn(all_items, deadline)
+    once and hands every caller its own slice of the results. The batch runs
+    with the latest caller deadline; each caller still bounds its own wait.
+    Spans opened by batch_fn are recorded in every traced caller's trace.
+    """
+
+    def __init__(self, batch_fn: Callable[[list, Any], Awaitable[list]], window: float, max_size: int):
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_size = max_size
+        # Pending callers and the flush timer belong to one event loop each
+        # (a module-level batcher outlives every asyncio.run)
+        self._queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Queue]" = weakref.WeakKeyDictionary()
+        self._tasks: set = set()  # running batches (the loop only keeps weak references)
+        self._stats = {"batches": 0, "calls": 0, "items": 0}
+
+    async def submit(self, items: list, deadline: Any = None) -> list:
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        queue = self._queues.get(loop)
+        if queue is None:
+            queue = self._queues[loop] = _Queue()
+        future = loop.create_future()
+        queue.pending.append((items, future, deadline, tracing.caller()))
+        queue.size += len(items)
+        self._stats["calls"] += 1
+
+        if queue.size >= self.max_size or self.window <= 0:
+            self._flush(queue)
+        elif queue.timer is None:
+            queue.timer = loop.call_later(self.window, self._flush, queue)
+        return await future
+
+    def _flush(self, queue: "_Queue") -> None:
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+        batch, queue.pending, queue.size = queue.pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list) -> None:
+        items = [item for part, _, _, _ in batch for item in part]
+        deadlines = [deadline for _, _, deadline, _ in batch]
+        callers = [trace for _, _, _, trace in batch if trace is not None]
+        deadline = None if any(d is None for d in deadlines) else max(deadlines)
+        self._stats["batches"] += 1
+        self._stats["items"] += len(items)
+
+        try:
+            with tracing.shared(callers):
+                results = await self.batch_fn(items, deadline)
+        except Exception as e:
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        start = 0
+        for part, future, _, _ in batch:
+            if not future.done():  # caller may have given up (own deadline)
+                future.set_result(results[start:start + len(part)])
+            start += len(part)
+
+    def stats(self) -> dict:
+        return dict(self._stats)
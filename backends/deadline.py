@@ -0,0 +1,71 @@
+"""Per-request latency budget for the slow path (embedding, retrieval, LLM)"""
+import os
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+# Default budget for one /analyze call; override per call with {"deadline_ms": ...}.
+# 0 disables the deadline.
+SLOW_PATH_BUDGET_MS = float(os.getenv("SLOW_PATH_BUDGET_MS", "10000"))
+
+# Below this many seconds left, a stage is not even attempted
+MIN_STAGE_BUDGET = float(os.getenv("MIN_STAGE_BUDGET", "0.05"))
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage cannot finish within the remaining request budget."""
+
+
+def make_deadline(budget_ms: Optional[float] = None) -> Optional[float]:
+    """Absolute deadline (time.monotonic) for a budget in ms, or None for no deadline."""
+    if budget_ms is None:
+        budget_ms = SLOW_PATH_BUDGET_MS
+    budget_ms = float(budget_ms)
+    if budget_ms <= 0:
+        return None
+    return time.monotonic() + budget_ms / 1000.0
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before the deadline (None = unbounded)."""
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def timeout_for(deadline: Optional[float], cap: float, stage: str = "stage") -> float:
+    """
+    Timeout for the next call: the remaining budget, capped by the stage's
+    own timeout. Raises DeadlineExceeded if the budget is already spent.
+    """
+    left = remaining(deadline)
+    if left is None:
+        return cap
+    if left < MIN_STAGE_BUDGET:
+        raise DeadlineExceeded(f"{stage}: request deadline exceeded")
+    return min(cap, left)
+
+
+def is_timeout(exc: BaseException) -> bool:
+    """Whether exc is a client-side timeout (builtin, asyncio, httpx, requests, Groq, or wrapped by qdrant-client)."""
+    while exc is not None:
+        if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+            return True
+        exc = getattr(exc, "source", None) or exc.__cause__
+    return False
+
+
+@contextmanager
+def budget_bounded(timeout: float, cap: float):
+    """
+    Wrap a call made with timeout_for(...). When the request budget, not the
+    stage cap, set its timeout, a timeout says the caller was in a hurry, not
+    that the dependency is slow: the exception is marked budget_limited and
+    circuit breakers ignore it.
+    """
+    try:
+        yield
+    except Exception as e:
+        if timeout < cap and is_timeout(e):
+            e.budget_limited = True
+        raise
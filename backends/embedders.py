@@ -0,0 +1,150 @@
+"""Embedding engines for the RAG backend, selected by EMBEDDER
+
+- "hf":      HuggingFace Inference API (all-MiniLM-L6-v2); embed_batch sends many texts in one HTTP call
+- "hashing": in-process NumPy char n-gram hashing to VECTOR_SIZE (offline, microseconds)
+
+Vectors from different engines are not comparable: a collection must be
+seeded with the same engine that queries it.
+"""
+import os
+
+import httpx
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+EMBEDDER = os.getenv("EMBEDDER", "hf").lower()
+VECTOR_SIZE = 384
+
+# HuggingFace Inference API configuration
+HF_API_URL = "https://router.huggingface.co/hf-inference/models/sentence-transformers/all-MiniLM-L6-v2/pipeline/feature-extraction"
+HF_TOKEN = os.getenv("HF_TOKEN")
+# Upper bound per call (seconds); a request deadline can only shorten it
+HF_TIMEOUT = float(os.getenv("HF_TIMEOUT", "5"))
+# Keep-alive connections kept per client (sync session and async client)
+HF_POOL_SIZE = int(os.getenv("HF_POOL_SIZE", "16"))
+
+HASHING_NGRAM_RANGE = (3, 5)
+HASHING_MAX_CHARS = 4096
+
+
+def _check(response) -> None:
+    """Raise on a non-200 HF API response (requests or httpx)."""
+    if response.status_code != 200:
+        raise Exception(f"HF API error: {response.status_code} - {response.text}")
+
+
+class HFEmbedder:
+    name = "hf"
+
+    def __init__(self, dim: int = VECTOR_SIZE):
+        self.dim = dim
+        # Pooled keep-alive connections: no TCP/TLS handshake per embedding
+        self._http = requests.Session()
+        self._http.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=HF_POOL_SIZE))
+        self._http.headers.update(self._headers())
+        self._async_http = httpx.AsyncClient(
+            timeout=HF_TIMEOUT,
+            headers=self._headers(),
+            limits=httpx.Limits(max_connections=HF_POOL_SIZE, max_keepalive_connections=HF_POOL_SIZE),
+        )
+
+    @staticmethod
+    def _headers() -> dict:
+        headers = {"Content-Type": "application/json"}
+        if HF_TOKEN:
+            headers["Authorization"] = f"Bearer {HF_TOKEN}"
+        return headers
+
+    def embed(self, text: str, timeout: float = HF_TIMEOUT) -> list[float]:
+        response = self._http.post(HF_API_URL, json={"inputs": text}, timeout=timeout)
+        _check(response)
+        return response.json()  # Returns 384-dim vector directly
+
+    async def aembed(self, text: str, timeout: float = HF_TIMEOUT) -> list[float]:
+        response = await self._async_http.post(HF_API_URL, json={"inputs": text}, timeout=timeout)
+        _check(response)
+        return response.json()
+
+    def embed_batch(self, texts: list[str], timeout: float = HF_TIMEOUT) -> list[list[float]]:
+        """One feature-extraction call for many inputs."""
+        response = self._http.post(HF_API_URL, json={"inputs": texts}, timeout=timeout)
+        _check(response)
+        return response.json()
+
+    async def aembed_batch(self, texts: list[str], timeout: float = HF_TIMEOUT) -> list[list[float]]:
+        response = await self._async_http.post(HF_API_URL, json={"inputs": texts}, timeout=timeout)
+        _check(response)
+        return response.json()
+
+    def close(self) -> None:
+        self._http.close()
+
+    async def aclose(self) -> None:
+        await self._async_http.aclose()
+        self._http.close()
+
+
+class HashingEmbedder:
+    """
+    Signed feature hashing of byte n-grams, log-scaled and L2-normalized.
+    Similar requests (shared payload fragments) land close in cosine space.
+    """
+    name = "hashing"
+
+    def __init__(self, dim: int = VECTOR_SIZE, ngram_range: tuple = HASHING_NGRAM_RANGE):
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def embed_array(self, text: str) -> np.ndarray:
+        data = np.frombuffer(text.lower()[:HASHING_MAX_CHARS].encode(), dtype=np.uint8).astype(np.uint64)
+        vec = np.zeros(self.dim, dtype=np.float32)
+        lo, hi = self.ngram_range
+        for n in range(lo, hi + 1):
+            if len(data) < n:
+                break
+            # Polynomial rolling hash of every n-gram at once (FNV prime, wraps mod 2^64)
+            h = np.full(len(data) - n + 1, n, dtype=np.uint64)
+            for j in range(n):
+                h = h * np.uint64(1099511628211) + data[j:len(data) - n + 1 + j]
+            h ^= h >> np.uint64(29)
+            sign = np.where(h & np.uint64(1 << 40), 1.0, -1.0)
+            vec += np.bincount((h % np.uint64(self.dim)).astype(np.int64), weights=sign, minlength=self.dim)
+
+        vec = np.sign(vec) * np.log1p(np.abs(vec))
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def embed(self, text: str, timeout: float = None) -> list[float]:
+        return self.embed_array(text).tolist()
+
+    async def aembed(self, text: str, timeout: float = None) -> list[float]:
+        return self.embed(text)
+
+    def embed_batch(self, texts: list[str], timeout: float = None) -> list[list[float]]:
+        return [self.embed(text) for text in texts]
+
+    async def aembed_batch(self, texts: list[str], timeout: float = None) -> list[list[float]]:
+        return self.embed_batch(texts)
+
+    def close(self) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+EMBEDDERS = {
+    "hf": HFEmbedder,
+    "hashing": HashingEmbedder,
+}
+
+
+def get_embedder(name: str = EMBEDDER, dim: int = VECTOR_SIZE):
+    if name not in EMBEDDERS:
+        raise Exception(f"Unknown EMBEDDER '{name}' (expected one of: {', '.join(EMBEDDERS)})")
+    return EMBEDDERS[name](dim)
+
+
+# Shared instance used by backends.rag_backend
+embedder = get_embedder()
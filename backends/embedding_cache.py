@@ -0,0 +1,154 @@
+"""Bounded embedding cache backed by memory-mapped files
+
+Keys are sha256 digests of the normalized text; vectors are float32 rows of a
+memmap, so cached embeddings survive restarts and cost no heap. When full,
+the oldest slots are overwritten (ring buffer). One file pair per embedder
+engine, so switching EMBEDDER never returns stale vectors.
+
+The files are shared by every worker process (uvicorn --workers N): the ring
+cursor lives in the file too (.meta: total writes, slot = writes % capacity),
+writers hold a file lock, and each process catches its key -> slot map up
+from the slots written since it last looked. A read re-checks the slot's key
+after copying the vector, so a slot another worker recycled is a miss, never
+another text's vector.
+"""
+import atexit
+import hashlib
+import re
+import threading
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from backends.file_lock import file_lock
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Case/whitespace-insensitive form (MiniLM and the hashing engine are uncased)."""
+    return _WS.sub(" ", text.strip().lower())
+
+
+def text_key(text: str) -> bytes:
+    return hashlib.sha256(normalize_text(text).encode()).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: Path, dim: int, capacity: int):
+        self.dim = dim
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        keys_path = path.with_suffix(".keys")
+        vecs_path = path.with_suffix(".f32")
+        meta_path = path.with_suffix(".meta")
+        self._lock_path = path.with_suffix(".lock")
+
+        files = (keys_path, vecs_path, meta_path)
+        expected = (capacity * 32, capacity * dim * 4, 8)
+        with file_lock(self._lock_path):  # one worker creates, the others open
+            fresh = not all(f.exists() for f in files) or (
+                tuple(f.stat().st_size for f in files) != expected
+            )
+            mode = "w+" if fresh else "r+"
+            self._keys = np.memmap(keys_path, dtype=np.uint8, mode=mode, shape=(capacity, 32))
+            self._vecs = np.memmap(vecs_path, dtype=np.float32, mode=mode, shape=(capacity, dim))
+            # [0]: slots ever written by any process; the next one is writes % capacity
+            self._meta = np.memmap(meta_path, dtype=np.int64, mode=mode, shape=(1,))
+            self._rebuild()
+        atexit.register(self.flush)
+
+    # ---------- key -> slot map (per process, caught up from the files) ----------
+    def _rebuild(self) -> None:
+        """Index every persisted key (empty slot = all-zero digest)."""
+        filled = np.flatnonzero(self._keys.any(axis=1))
+        self._slots = {int(slot): self._keys[slot].tobytes() for slot in filled}
+        self._index = {key: slot for slot, key in self._slots.items()}
+        self._seen = int(self._meta[0])
+
+    def _sync(self) -> None:
+        """Under the file lock: pick up the slots other processes wrote since the last look."""
+        writes = int(self._meta[0])
+        if writes - self._seen >= self.capacity:
+            self._rebuild()
+            return
+        for n in range(self._seen, writes):
+            slot = n % self.capacity
+            old = self._slots.pop(slot, None)
+            if old is not None and self._index.get(old) == slot:
+                del self._index[old]
+            key = self._keys[slot].tobytes()
+            if any(key):
+                self._slots[slot] = key
+                self._index[key] = slot
+        self._seen = writes
+
+    def _lookup(self, key: bytes) -> Optional[int]:
+        slot = self._index.get(key)
+        if slot is None and int(self._meta[0]) != self._seen:
+            with file_lock(self._lock_path):
+                self._sync()
+            slot = self._index.get(key)
+        return slot
+
+    # ---------- public API ----------
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = text_key(text)
+        with self._lock:
+            slot = self._lookup(key)
+            vector = np.array(self._vecs[slot]) if slot is not None else None
+            # Another worker may have recycled the slot: the key is zeroed before
+            # its vector is rewritten, so a changed key means the copy is not ours
+            if slot is not None and self._keys[slot].tobytes() != key:
+                self._index.pop(key, None)
+                vector = None
+            if vector is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return vector
+
+    def put(self, text: str, vector) -> None:
+        key = text_key(text)
+        vector = np.asarray(vector, dtype=np.float32)
+        if vector.shape != (self.dim,):
+            return  # unexpected API shape - never cache it
+        with self._lock, file_lock(self._lock_path):
+            self._sync()
+            slot = self._index.get(key)
+            if slot is not None:
+                self._vecs[slot] = vector
+                return
+
+            writes = int(self._meta[0])
+            slot = writes % self.capacity
+            old = self._slots.pop(slot, None)
+            if old is not None:
+                self._index.pop(old, None)
+                self._stats["evictions"] += 1
+            # Vector before key: a crash in between never maps a key to a stale row
+            self._keys[slot] = 0
+            self._vecs[slot] = vector
+            self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+            self._meta[0] = writes + 1
+            self._slots[slot] = key
+            self._index[key] = slot
+            self._seen = writes + 1
+
+    def flush(self) -> None:
+        with self._lock:
+            self._keys.flush()
+            self._vecs.flush()
+            self._meta.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            if int(self._meta[0]) != self._seen:
+                with file_lock(self._lock_path):
+                    self._sync()
+            return {"size": len(self._index), "capacity": self.capacity, **self._stats}
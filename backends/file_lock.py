@@ -0,0 +1,39 @@
+"""Advisory inter-process file locks
+
+uvicorn --workers N runs N processes over the same data/ directory; state
+they share on disk (embedding cache memmaps, RAG snapshot restores) is
+updated under an exclusive flock on a sidecar ".lock" file. Thread locks do
+not cover other processes; this does (POSIX). Without fcntl (Windows) it
+degrades to a process-local lock: run a single worker there.
+"""
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # not POSIX
+    fcntl = None
+
+_LOCAL_LOCKS: dict = {}
+_LOCAL_GUARD = threading.Lock()
+
+
+@contextmanager
+def file_lock(path: Path):
+    """Hold an exclusive lock on path (created if missing) for the block."""
+    path = Path(path)
+    if fcntl is None:
+        with _LOCAL_GUARD:
+            lock = _LOCAL_LOCKS.setdefault(str(path.resolve()), threading.Lock())
+        with lock:
+            yield
+        return
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as handle:
+        fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
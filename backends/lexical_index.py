@@ -0,0 +1,154 @@
+"""Sparse lexical retrieval (RAG_RETRIEVAL=lexical|hybrid): BM25 over char n-grams
+
+Dense embeddings of raw HTTP text blur exact payload tokens (`union select`,
+`../../`, `<script`). This index scores them directly and needs no network:
+- requests are normalized (security-relevant segments, URL-decoded, lowercase,
+  digit runs collapsed, whitespace collapsed) and cut into byte n-grams
+- postings are stored CSR-style (sorted term hashes -> doc rows) with the BM25
+  weight of every posting precomputed, so a query is a searchsorted over its
+  n-grams plus one np.bincount over the matched postings
+- n-grams present in more than max_df of the documents (HTTP boilerplate)
+  are dropped at build time: their IDF is ~0 and their postings dominate cost
+
+The index is immutable: build it from the collection's payloads
+(scripts/build_lexical_index.py, a few seconds for CSIC) and save it as one
+.npz next to the vector data.
+"""
+import json
+import re
+from pathlib import Path
+from urllib.parse import unquote_plus
+
+import numpy as np
+
+from backends.rag_context import relevant_segments
+
+NGRAM_SIZE = 4
+BM25_K1 = 1.2
+BM25_B = 0.75
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+def lexical_text(raw_request: str) -> str:
+    """The part of a request that is indexed: decoded payload segments, digits and blanks collapsed."""
+    text = unquote_plus(relevant_segments(raw_request)).lower()
+    return re.sub(r"\s+", " ", re.sub(r"\d+", "0", text))
+
+
+def ngram_counts(text: str, size: int = NGRAM_SIZE) -> tuple[np.ndarray, np.ndarray]:
+    """Distinct byte `size`-gram hashes of the normalized request and their counts."""
+    data = np.frombuffer(lexical_text(text).encode(), dtype=np.uint8).astype(np.uint64)
+    if len(data) < size:
+        data = np.pad(data, (0, size - len(data)))
+    h = np.zeros(len(data) - size + 1, dtype=np.uint64)
+    for j in range(size):
+        h = h * np.uint64(1099511628211) + data[j:len(data) - size + 1 + j]
+    h ^= h >> np.uint64(31)
+    terms, counts = np.unique((h % _PRIME).astype(np.int64), return_counts=True)
+    return terms, counts.astype(np.float32)
+
+
+class LexicalIndex:
+    def __init__(self, terms: np.ndarray, offsets: np.ndarray, rows: np.ndarray, weights: np.ndarray,
+                 payloads: list[dict]):
+        self.terms = terms          # sorted distinct term hashes
+        self.offsets = offsets      # postings of terms[i]: rows/weights[offsets[i]:offsets[i + 1]]
+        self.rows = rows
+        self.weights = weights      # BM25 term weight of each posting (idf x saturated tf)
+        self.payloads = payloads
+        families = sorted({p.get("attack_type", "normal") for p in payloads})
+        self._family_codes = {name: code for code, name in enumerate(families)}
+        self._families = np.array([self._family_codes[p.get("attack_type", "normal")] for p in payloads],
+                                  dtype=np.int32)
+
+    @classmethod
+    def build(cls, payloads: list[dict], max_df: float = 0.5, size: int = NGRAM_SIZE) -> "LexicalIndex":
+        """Index the raw_request of every payload (one document per payload, in order)."""
+        doc_terms, doc_counts, lengths = [], [], []
+        for payload in payloads:
+            terms, counts = ngram_counts(payload.get("raw_request", ""), size)
+            doc_terms.append(terms)
+            doc_counts.append(counts)
+            lengths.append(counts.sum())
+        n = len(payloads)
+        if n == 0:
+            empty = np.zeros(0, dtype=np.int64)
+            return cls(empty, np.zeros(1, dtype=np.int64), empty.astype(np.int32), empty.astype(np.float32), [])
+
+        all_terms = np.concatenate(doc_terms)
+        all_tf = np.concatenate(doc_counts)
+        all_rows = np.repeat(np.arange(n, dtype=np.int32), [len(t) for t in doc_terms])
+        order = np.argsort(all_terms, kind="stable")
+        all_terms, all_tf, all_rows = all_terms[order], all_tf[order], all_rows[order]
+
+        terms, starts, df = np.unique(all_terms, return_index=True, return_counts=True)
+        keep = df <= max(1, max_df * n)
+        idf = np.log1p((n - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        lengths = np.asarray(lengths, dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / lengths.mean())
+        weights = np.repeat(idf, df) * all_tf * (BM25_K1 + 1) / (all_tf + norm[all_rows])
+
+        posting_keep = np.repeat(keep, df)
+        kept_df = df[keep]
+        offsets = np.zeros(len(kept_df) + 1, dtype=np.int64)
+        np.cumsum(kept_df, out=offsets[1:])
+        return cls(terms[keep], offsets, all_rows[posting_keep], weights[posting_keep].astype(np.float32),
+                   list(payloads))
+
+    # ---------- files ----------
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(tmp, terms=self.terms, offsets=self.offsets, rows=self.rows, weights=self.weights,
+                 payloads=np.array(json.dumps(self.payloads)))
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "LexicalIndex":
+        with np.load(path) as f:
+            return cls(f["terms"], f["offsets"], f["rows"], f["weights"], json.loads(str(f["payloads"])))
+
+    # ---------- search ----------
+    def _scores(self, query: str) -> np.ndarray:
+        if len(self.terms) == 0:
+            return np.zeros(len(self.payloads), dtype=np.float32)
+        terms, _ = ngram_counts(query)
+        pos = np.minimum(np.searchsorted(self.terms, terms), len(self.terms) - 1)
+        pos = pos[self.terms[pos] == terms]
+        # Concatenated posting ranges of the matched terms, without a Python loop
+        starts, lengths = self.offsets[pos], self.offsets[pos + 1] - self.offsets[pos]
+        postings = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.rows[postings], weights=self.weights[postings], minlength=len(self.payloads))
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+    @property
+    def families(self) -> frozenset:
+        """attack_type values of the indexed documents."""
+        return frozenset(self._family_codes)
+
+    def search(self, queries: list[str], k: int = 3, families: list[tuple] = None) -> list[list[tuple[dict, float]]]:
+        """
+        Top-k (payload, BM25 score) per query text. families: per query, attack
+        types to restrict to (empty = all); documents sharing no n-gram with the
+        query are never returned.
+        """
+        families = families or [()] * len(queries)
+        results = []
+        for query, fams in zip(queries, families):
+            scores = self._scores(query)
+            if fams:
+                codes = [self._family_codes[f] for f in fams if f in self._family_codes]
+                scores = np.where(np.isin(self._families, codes), scores, 0)
+            results.append([(self.payloads[i], float(scores[i])) for i in self._top_k(scores, k)])
+        return results
+
+    def stats(self) -> dict:
+        return {"documents": len(self.payloads), "terms": len(self.terms), "postings": len(self.rows)}
@@ -1,6 +1,15 @@
+import json
 import os
+import threading
+import time
 from dotenv import load_dotenv
-from groq import Groq
+from groq import AsyncGroq, Groq
+
+from backends.circuit_breaker import breaker
+from backends.concurrency import run_bounded, arun_bounded
+from backends.deadline import budget_bounded, timeout_for
+from backends.llm_scheduler import scheduler
+from backends.tracing import span
 
 # =====================================================
 # Load environment variables from .env
@@ -10,10 +19,49 @@ load_dotenv()
 # =====================================================
 # Initialize Groq client
 # =====================================================
+# Upper bound for one completion call (seconds); a request deadline can only shorten it
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+
+# Unset = api.groq.com; point at scripts/llm_standin_server.py for offline load tests
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+# max_retries=0: retries/backoff are owned by backends.llm_scheduler
 client = Groq(
-    api_key=os.getenv("GROQ_API_KEY")
+    api_key=os.getenv("GROQ_API_KEY"),
+    base_url=GROQ_BASE_URL,
+    max_retries=0,
+    timeout=LLM_TIMEOUT,
+)
+
+# Async client for the /analyze slow path (sync client stays for scripts)
+async_client = AsyncGroq(
+    api_key=os.getenv("GROQ_API_KEY"),
+    base_url=GROQ_BASE_URL,
+    max_retries=0,
+    timeout=LLM_TIMEOUT,
 )
 
+MODEL_NAME = "llama-3.3-70b-versatile"  # ✅ ACTIVE model (per Groq dashboard)
+
+# Model cascade, cheapest first: each tier answers with a structured verdict and
+# only low-confidence or malicious-leaning items escalate to the next tier.
+# The last tier is the authoritative model. Default: MODEL_NAME alone (one tier);
+# opt in with e.g. LLM_CASCADE=llama-3.1-8b-instant,llama-3.3-70b-versatile
+LLM_CASCADE = [
+    m.strip()
+    for m in os.getenv("LLM_CASCADE", MODEL_NAME).split(",")
+    if m.strip()
+] or [MODEL_NAME]
+LLM_ESCALATE_CONFIDENCE = float(os.getenv("LLM_ESCALATE_CONFIDENCE", "0.8"))
+
+# Max Groq calls in flight for one /analyze batch
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Request packing: several items share one prompt, bounded by a token budget
+# (prompt plus the completion tokens reserved per item)
+LLM_PACK_TOKEN_BUDGET = int(os.getenv("LLM_PACK_TOKEN_BUDGET", "3000"))
+LLM_PACK_MAX_ITEMS = int(os.getenv("LLM_PACK_MAX_ITEMS", "8"))
+
 # =====================================================
 # System prompt for SOC analysis
 # =====================================================
@@ -32,17 +80,10 @@ Rules:
 
 
 # =====================================================
-# LLM analyze function
+# Prompt builder (shared by sync / async paths)
 # =====================================================
-def llm_analyze(query: str, rag_context: str) -> dict:
-    """
-    Run Groq LLM analysis.
-    This function is called ONLY when:
-    - Request is NOT blocked by rule engine
-    - Cache MISS
-    """
-
-    messages = [
+def _build_messages(query: str, rag_context: str) -> list[dict]:
+    return [
         {
             "role": "system",
             "content": SYSTEM_PROMPT,
@@ -61,16 +102,407 @@ Return a concise security verdict.
         },
     ]
 
-    completion = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",  # ✅ ACTIVE model (per Groq dashboard)
-        messages=messages,
-        temperature=0.2,
-        max_tokens=150,
-    )
 
-    verdict = completion.choices[0].message.content.strip()
+# =====================================================
+# Per-tier call counters (cascade observability)
+# =====================================================
+_TIER_STATS: dict = {}
+_TIER_LOCK = threading.Lock()
+
+
+def _record_tier(model: str, **counts) -> None:
+    with _TIER_LOCK:
+        stats = _TIER_STATS.setdefault(
+            model, {"calls": 0, "errors": 0, "latency_ms_total": 0.0, "items": 0, "escalated": 0}
+        )
+        for key, value in counts.items():
+            stats[key] += value
+
+
+def cascade_stats() -> dict:
+    """Per-model call counts and mean latency, in cascade order."""
+    with _TIER_LOCK:
+        out = {}
+        for model in LLM_CASCADE:
+            stats = dict(_TIER_STATS.get(model, {}))
+            calls = stats.get("calls", 0)
+            stats["latency_ms_avg"] = round(stats.pop("latency_ms_total", 0.0) / calls, 1) if calls else 0.0
+            out[model] = stats
+        return out
+
+
+# =====================================================
+# Completion call (metered by the rate-limit scheduler)
+# =====================================================
+# One outcome per logical call (scheduler retries included); while open, no
+# token is spent and every item of the pack falls back to its rule verdict
+_groq_breaker = breaker("groq")
+
+
+def _create(groq_client, model: str, messages: list[dict], max_tokens: int, deadline: float = None):
+    # One attempt (the scheduler retries); its timeout is re-derived from the budget each time
+    timeout = timeout_for(deadline, LLM_TIMEOUT, "llm")
+    with budget_bounded(timeout, LLM_TIMEOUT):
+        return groq_client.chat.completions.create(
+            model=model, messages=messages, temperature=0.2, max_tokens=max_tokens, timeout=timeout,
+        )
+
+
+async def _acreate(groq_client, model: str, messages: list[dict], max_tokens: int, deadline: float = None):
+    timeout = timeout_for(deadline, LLM_TIMEOUT, "llm")
+    with budget_bounded(timeout, LLM_TIMEOUT):
+        return await groq_client.chat.completions.create(
+            model=model, messages=messages, temperature=0.2, max_tokens=max_tokens, timeout=timeout,
+        )
+
+
+def _complete(messages: list[dict], max_tokens: int, priority: float = 0.0,
+              deadline: float = None, model: str = MODEL_NAME) -> str:
+    tokens = estimate_tokens("".join(m["content"] for m in messages)) + max_tokens
+    started = time.perf_counter()
+    try:
+        with span("llm.complete", model=model, tokens=tokens):
+            completion = _groq_breaker.call(
+                scheduler.run,
+                lambda: _create(client, model, messages, max_tokens, deadline),
+                priority=priority,
+                tokens=tokens,
+                deadline=deadline,
+            )
+    except Exception:
+        _record_tier(model, errors=1)
+        raise
+    _record_tier(model, calls=1, latency_ms_total=(time.perf_counter() - started) * 1000)
+    return completion.choices[0].message.content.strip()
+
+
+async def _acomplete(messages: list[dict], max_tokens: int, priority: float = 0.0,
+                     deadline: float = None, model: str = MODEL_NAME) -> str:
+    tokens = estimate_tokens("".join(m["content"] for m in messages)) + max_tokens
+    started = time.perf_counter()
+    try:
+        with span("llm.complete", model=model, tokens=tokens):
+            completion = await _groq_breaker.acall(
+                scheduler.arun,
+                lambda: _acreate(async_client, model, messages, max_tokens, deadline),
+                priority=priority,
+                tokens=tokens,
+                deadline=deadline,
+            )
+    except Exception:
+        _record_tier(model, errors=1)
+        raise
+    _record_tier(model, calls=1, latency_ms_total=(time.perf_counter() - started) * 1000)
+    return completion.choices[0].message.content.strip()
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token) used for prompt budgeting."""
+    return len(text) // 4 + 1
+
+
+# =====================================================
+# LLM analyze function
+# =====================================================
+def llm_analyze(query: str, rag_context: str, priority: float = 0.0, deadline: float = None,
+                model: str = MODEL_NAME) -> dict:
+    """
+    Run Groq LLM analysis.
+    This function is called ONLY when:
+    - Request is NOT blocked by rule engine
+    - Cache MISS
+    """
+
+    verdict = _complete(_build_messages(query, rag_context), max_tokens=150, priority=priority,
+                        deadline=deadline, model=model)
 
     return {
         "analysis": verdict,        
-        "model": "llama-3.3-70b-versatile",
+        "model": model,
     }
+
+
+async def allm_analyze(query: str, rag_context: str, priority: float = 0.0, deadline: float = None,
+                       model: str = MODEL_NAME) -> dict:
+    """Async variant of llm_analyze (does not block the event loop)."""
+
+    verdict = await _acomplete(_build_messages(query, rag_context), max_tokens=150, priority=priority,
+                               deadline=deadline, model=model)
+
+    return {
+        "analysis": verdict,
+        "model": model,
+    }
+
+
+# =====================================================
+# Packed analyze (several requests in one prompt)
+# =====================================================
+PACKED_SYSTEM_PROMPT = SYSTEM_PROMPT + """
+You will receive several HTTP requests, each introduced by "### ITEM <n>".
+Answer ONLY with a JSON array holding one object per item:
+[{"item": <n>, "verdict": "benign" | "malicious", "confidence": <0.0-1.0>, "analysis": "<one sentence>"}]
+For benign items the analysis is EXACTLY "Benign request – no malicious intent detected."
+"""
+
+# Completion tokens reserved per packed item
+_PACKED_TOKENS_PER_ITEM = 80
+
+
+def _format_item(n: int, query: str, rag_context: str) -> str:
+    return f"""### ITEM {n}
+HTTP REQUEST:
+{query}
+
+RELATED CONTEXT (RAG):
+{rag_context if rag_context else "None"}
+"""
+
+
+def pack_entries(entries: list[dict], token_budget: int = None, max_items: int = None) -> list[list[int]]:
+    """
+    Greedily group entry indices into packs whose prompt plus reserved
+    completion tokens stay within token_budget and max_items. An entry larger
+    than the budget gets a pack of its own (sent as a single call).
+    """
+    token_budget = token_budget or LLM_PACK_TOKEN_BUDGET
+    max_items = max_items or LLM_PACK_MAX_ITEMS
+    base = estimate_tokens(PACKED_SYSTEM_PROMPT)
+
+    packs, current, used = [], [], base
+    for idx, e in enumerate(entries):
+        cost = estimate_tokens(_format_item(idx, e["query"], e["rag_context"])) + _PACKED_TOKENS_PER_ITEM
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            packs.append(current)
+            current, used = [], base
+        current.append(idx)
+        used += cost
+    if current:
+        packs.append(current)
+    return packs
+
+
+def _build_packed_messages(entries: list[dict]) -> list[dict]:
+    body = "\n".join(
+        _format_item(n, e["query"], e["rag_context"]) for n, e in enumerate(entries, 1)
+    )
+    return [
+        {"role": "system", "content": PACKED_SYSTEM_PROMPT},
+        {"role": "user", "content": body + "\nReturn the JSON array now."},
+    ]
+
+
+def _as_confidence(value):
+    try:
+        return min(1.0, max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_packed(content: str, count: int, model: str = MODEL_NAME) -> list:
+    """
+    Map a JSON array of per-item verdicts back onto item positions.
+    Missing or malformed entries come back as None (caller falls back).
+    """
+    parsed = [None] * count
+    start = (content or "").find("[")
+    if start < 0:
+        return parsed
+    try:
+        # Decode only the first array: trailing prose (even bracketed) is ignored
+        verdicts, _ = json.JSONDecoder().raw_decode(content, start)
+    except ValueError:
+        return parsed
+
+    for v in verdicts if isinstance(verdicts, list) else []:
+        if not isinstance(v, dict) or not v.get("analysis"):
+            continue
+        try:
+            n = int(v.get("item")) - 1
+        except (TypeError, ValueError):
+            continue
+        if 0 <= n < count and parsed[n] is None:
+            parsed[n] = {
+                "analysis": str(v["analysis"]).strip(),
+                "model": model,
+                "verdict": str(v.get("verdict", "")).lower() or None,
+                "confidence": _as_confidence(v.get("confidence")),
+                "packed": count,
+            }
+    return parsed
+
+
+def _item_ids(entries: list[dict]):
+    """Request items a pack answers (per-item timings); None when the entries carry no id."""
+    ids = [e["id"] for e in entries if e.get("id") is not None]
+    return ids or None
+
+
+def _pack_priority(entries: list[dict]) -> float:
+    return max(e.get("priority", 0.0) for e in entries)
+
+
+def llm_analyze_packed(entries: list[dict], deadline: float = None, model: str = MODEL_NAME,
+                       final: bool = True) -> list[dict]:
+    """
+    Analyze several requests with ONE completion call.
+    final=True (authoritative tier): items missing from the model's JSON answer
+    fall back to llm_analyze, and a single entry uses the plain prompt.
+    final=False (cascade pre-tier): always ask for structured verdicts; missing
+    items come back as errors so the cascade escalates them.
+    """
+    with span("llm.pack", model=model, items=len(entries), item_ids=_item_ids(entries)):
+        if len(entries) == 1 and final:
+            e = entries[0]
+            return [llm_analyze(e["query"], e["rag_context"], e.get("priority", 0.0), deadline, model)]
+
+        content = _complete(
+            _build_packed_messages(entries),
+            max_tokens=_PACKED_TOKENS_PER_ITEM * len(entries),
+            priority=_pack_priority(entries),
+            deadline=deadline,
+            model=model,
+        )
+        parsed = _parse_packed(content, len(entries), model)
+
+        results = []
+        for e, result in zip(entries, parsed):
+            if result is None:
+                if not final:
+                    result = {"error": "no structured verdict", "model": model}
+                else:
+                    try:
+                        result = llm_analyze(e["query"], e["rag_context"], e.get("priority", 0.0), deadline, model)
+                    except Exception as exc:
+                        result = _as_result(exc)
+            results.append(result)
+        return results
+
+
+async def allm_analyze_packed(entries: list[dict], deadline: float = None, model: str = MODEL_NAME,
+                              final: bool = True) -> list[dict]:
+    """Async variant of llm_analyze_packed."""
+    with span("llm.pack", model=model, items=len(entries), item_ids=_item_ids(entries)):
+        if len(entries) == 1 and final:
+            e = entries[0]
+            return [await allm_analyze(e["query"], e["rag_context"], e.get("priority", 0.0), deadline, model)]
+
+        content = await _acomplete(
+            _build_packed_messages(entries),
+            max_tokens=_PACKED_TOKENS_PER_ITEM * len(entries),
+            priority=_pack_priority(entries),
+            deadline=deadline,
+            model=model,
+        )
+        parsed = _parse_packed(content, len(entries), model)
+
+        results = []
+        for e, result in zip(entries, parsed):
+            if result is None:
+                if not final:
+                    result = {"error": "no structured verdict", "model": model}
+                else:
+                    try:
+                        result = await allm_analyze(e["query"], e["rag_context"], e.get("priority", 0.0),
+                                                    deadline, model)
+                    except Exception as exc:
+                        result = _as_result(exc)
+            results.append(result)
+        return results
+
+
+# =====================================================
+# Batch analyze (packed, bounded concurrency, order preserved)
+# =====================================================
+def _as_result(outcome) -> dict:
+    """Turn a captured exception into an error result for that item only."""
+    if isinstance(outcome, Exception):
+        return {"error": f"{type(outcome).__name__}: {outcome}"}
+    return outcome
+
+
+def _scatter(entries: list[dict], packs: list[list[int]], outcomes: list) -> list[dict]:
+    """Put per-pack results back in entry order; a failed pack fails only its items."""
+    results = [None] * len(entries)
+    for pack, outcome in zip(packs, outcomes):
+        for pos, idx in enumerate(pack):
+            results[idx] = _as_result(outcome) if isinstance(outcome, Exception) else outcome[pos]
+    return results
+
+
+def _should_escalate(result: dict) -> bool:
+    """Escalate on error, malicious-leaning or low-confidence pre-tier verdicts."""
+    if result.get("error"):
+        return True
+    if result.get("verdict") != "benign":
+        return True
+    confidence = result.get("confidence")
+    return confidence is None or confidence < LLM_ESCALATE_CONFIDENCE
+
+
+def _merge_tier(results: list, pending: list[int], tier_results: list[dict], tier: int) -> list[int]:
+    """
+    Store one tier's answers and return the indices that escalate.
+    If an escalation fails, the previous tier's answer is kept.
+    """
+    final = tier == len(LLM_CASCADE) - 1
+    model = LLM_CASCADE[tier]
+    escalate = []
+    for idx, result in zip(pending, tier_results):
+        previous = results[idx]
+        if result.get("error") and previous and not previous.get("error"):
+            previous["escalation_error"] = result["error"]
+            continue
+        result["tier"] = tier
+        results[idx] = result
+        if not final and _should_escalate(result):
+            escalate.append(idx)
+    _record_tier(model, items=len(pending), escalated=len(escalate))
+    return escalate
+
+
+def _tier_calls(entries: list[dict], pending: list[int], deadline, tier: int):
+    sub = [entries[i] for i in pending]
+    packs = pack_entries(sub)
+    final = tier == len(LLM_CASCADE) - 1
+    calls = [([sub[i] for i in pack], deadline, LLM_CASCADE[tier], final) for pack in packs]
+    return sub, packs, calls
+
+
+def llm_analyze_batch(entries: list[dict], deadline: float = None) -> list[dict]:
+    """
+    Analyze several requests through the model cascade (LLM_CASCADE).
+    At every tier, entries are packed into as few prompts as the token budget
+    allows and packs run concurrently (at most LLM_MAX_CONCURRENCY calls);
+    only uncertain / malicious-leaning items go on to the next tier.
+
+    entries: [{"query": ..., "rag_context": ..., "priority": ..., "id": ...}, ...]
+    ("id", optional: names the request item in trace spans)
+    Higher priority entries are sent first when the scheduler is throttling.
+    deadline: absolute request deadline (backends.deadline); calls that cannot
+    finish in time come back as errors.
+    Returns one result per entry, in the same order.
+    A failed call yields {"error": "..."} without affecting the others.
+    """
+    results = [None] * len(entries)
+    pending = list(range(len(entries)))
+    for tier in range(len(LLM_CASCADE)):
+        if not pending:
+            break
+        sub, packs, calls = _tier_calls(entries, pending, deadline, tier)
+        outcomes = run_bounded(llm_analyze_packed, calls, LLM_MAX_CONCURRENCY)
+        pending = _merge_tier(results, pending, _scatter(sub, packs, outcomes), tier)
+    return results
+
+
+async def allm_analyze_batch(entries: list[dict], deadline: float = None) -> list[dict]:
+    """Async variant of llm_analyze_batch."""
+    results = [None] * len(entries)
+    pending = list(range(len(entries)))
+    for tier in range(len(LLM_CASCADE)):
+        if not pending:
+            break
+        sub, packs, calls = _tier_calls(entries, pending, deadline, tier)
+        outcomes = await arun_bounded(allm_analyze_packed, calls, LLM_MAX_CONCURRENCY)
+        pending = _merge_tier(results, pending, _scatter(sub, packs, outcomes), tier)
+    return results
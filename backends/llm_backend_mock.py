@@ -1,6 +1,10 @@
 """Mock LLM backend for testing without API"""
+import threading
+import time
+from collections import deque
 
-def llm_analyze(query: str, rag_context: str) -> dict:
+
+def llm_analyze(query: str, rag_context: str, priority: float = 0.0, deadline: float = None) -> dict:
     """Mock LLM that returns canned response"""
     
     # Simple heuristic
@@ -16,3 +20,47 @@ def llm_analyze(query: str, rag_context: str) -> dict:
         "analysis": verdict,        
         "model": "mock-llm",
     }
+
+
+async def allm_analyze(query: str, rag_context: str, priority: float = 0.0, deadline: float = None) -> dict:
+    """Async mock, mirrors backends.llm_backend.allm_analyze"""
+    return llm_analyze(query, rag_context, priority, deadline)
+
+
+def llm_analyze_batch(entries: list[dict], deadline: float = None) -> list[dict]:
+    """Batch mock, mirrors backends.llm_backend.llm_analyze_batch"""
+    return [llm_analyze(e["query"], e["rag_context"]) for e in entries]
+
+
+async def allm_analyze_batch(entries: list[dict], deadline: float = None) -> list[dict]:
+    """Async batch mock, mirrors backends.llm_backend.allm_analyze_batch"""
+    return llm_analyze_batch(entries, deadline)
+
+
+# =====================================================
+# Simulated Groq rate limits (for backends.llm_scheduler tests)
+# =====================================================
+class MockRateLimitError(Exception):
+    """Shaped like groq.RateLimitError: carries status_code=429"""
+    status_code = 429
+
+
+def rate_limited(fn, max_calls: int, window: float = 60.0, clock=time.monotonic):
+    """
+    Wrap fn so that more than max_calls per sliding `window` seconds
+    raise MockRateLimitError, like Groq's requests-per-minute limit.
+    """
+    calls = deque()
+    lock = threading.Lock()
+
+    def wrapper(*args, **kwargs):
+        with lock:
+            now = clock()
+            while calls and now - calls[0] >= window:
+                calls.popleft()
+            if len(calls) >= max_calls:
+                raise MockRateLimitError("Rate limit reached (simulated)")
+            calls.append(now)
+        return fn(*args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,103 @@
+"""LLM escalation policy: how many slow-path items may reach the LLM
+
+Applied per batch before llm_node:
+- low-score MONITOR (and rule-"Unknown") items are sampled at a configurable rate
+- admitted items are capped per batch and per second (token bucket). The caps
+  count items, not Groq calls: packing (LLM_PACK_*) sends several admitted
+  items in one call, so calls/s stay at or below items/s
+- when the scheduler queue backs up, sample rates and the batch cap shrink
+Items that are not admitted keep the rule-engine verdict (degraded).
+"""
+import os
+import random
+import threading
+import time
+
+from backends.llm_scheduler import TokenBucket, item_priority, scheduler
+
+LLM_MAX_ITEMS_PER_SECOND = float(os.getenv("LLM_MAX_ITEMS_PER_SECOND", "10"))
+LLM_MAX_PER_BATCH = int(os.getenv("LLM_MAX_PER_BATCH", "16"))
+LLM_MONITOR_SAMPLE_RATE = float(os.getenv("LLM_MONITOR_SAMPLE_RATE", "0.2"))
+# Only MONITOR items scoring below this are sampled; the rest always reach the LLM
+LLM_MONITOR_SAMPLE_BELOW_SCORE = float(os.getenv("LLM_MONITOR_SAMPLE_BELOW_SCORE", "2"))
+LLM_UNKNOWN_SAMPLE_RATE = float(os.getenv("LLM_UNKNOWN_SAMPLE_RATE", "1.0"))
+# Scheduler queue depth above which the policy starts tightening
+LLM_BACKLOG_THRESHOLD = int(os.getenv("LLM_BACKLOG_THRESHOLD", "8"))
+
+
+class LLMPolicy:
+    def __init__(
+        self,
+        max_items_per_second: float = LLM_MAX_ITEMS_PER_SECOND,
+        max_per_batch: int = LLM_MAX_PER_BATCH,
+        monitor_rate: float = LLM_MONITOR_SAMPLE_RATE,
+        monitor_below_score: float = LLM_MONITOR_SAMPLE_BELOW_SCORE,
+        unknown_rate: float = LLM_UNKNOWN_SAMPLE_RATE,
+        backlog_threshold: int = LLM_BACKLOG_THRESHOLD,
+        queue_depth=lambda: scheduler.queue_depth,
+        rng: random.Random = None,
+        clock=time.monotonic,
+    ):
+        self.bucket = TokenBucket(max_items_per_second * 60, burst_seconds=1.0, clock=clock)
+        self.max_per_batch = max_per_batch
+        self.monitor_rate = monitor_rate
+        self.monitor_below_score = monitor_below_score
+        self.unknown_rate = unknown_rate
+        self.backlog_threshold = backlog_threshold
+        self.queue_depth = queue_depth
+        self.rng = rng or random.Random()
+
+        self._lock = threading.Lock()
+        self._stats = {"admitted": 0, "sampled_out": 0, "batch_capped": 0, "rate_capped": 0}
+
+    def pressure(self) -> float:
+        """1.0 when the LLM queue is healthy, down to 0.1 as it backs up."""
+        depth = self.queue_depth()
+        if depth <= self.backlog_threshold:
+            return 1.0
+        return max(0.1, self.backlog_threshold / depth)
+
+    def _sample_rate(self, item) -> float:
+        if item.get("fast_decision") == "MONITOR":
+            if float(item.get("rule_score") or 0) < self.monitor_below_score:
+                return self.monitor_rate
+            return 1.0
+        if item.get("attack_type") == "Unknown":
+            return self.unknown_rate
+        return 1.0
+
+    def admit(self, items: list) -> list[tuple[dict, str]]:
+        """
+        Decide for each item: "" = send to the LLM, otherwise the reason it was skipped.
+        Highest-priority items claim the batch / per-second budget first.
+        """
+        factor = self.pressure()
+        batch_cap = max(1, int(self.max_per_batch * factor))
+        decisions = {}
+        admitted = 0
+
+        with self._lock:
+            for item in sorted(items, key=item_priority, reverse=True):
+                rate = self._sample_rate(item)
+                if rate < 1.0 and self.rng.random() >= rate * factor:
+                    reason, key = "llm policy: sampled out", "sampled_out"
+                elif admitted >= batch_cap:
+                    reason, key = "llm policy: batch cap reached", "batch_capped"
+                elif self.bucket.wait_time(1) > 0:
+                    reason, key = "llm policy: rate cap reached", "rate_capped"
+                else:
+                    self.bucket.consume(1)
+                    admitted += 1
+                    reason, key = "", "admitted"
+                self._stats[key] += 1
+                decisions[id(item)] = reason
+
+        return [(item, decisions[id(item)]) for item in items]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pressure": round(self.pressure(), 2), **self._stats}
+
+
+# Shared instance used by nodes.nodes_policy
+policy = LLMPolicy()
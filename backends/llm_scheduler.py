@@ -0,0 +1,280 @@
+"""Rate-limit-aware scheduler in front of the Groq LLM backend
+
+Every completion call goes through scheduler.run() / scheduler.arun():
+- requests-per-minute and tokens-per-minute are metered with token buckets
+- waiting calls are admitted by priority (higher rule_score / severity first)
+- transient failures (429, 5xx, timeouts) are retried with jittered backoff
+- an optional request deadline bounds queueing, retries and backoff
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from backends.deadline import DeadlineExceeded, remaining
+
+# Groq limits for the active model (see Groq dashboard -> Limits)
+LLM_RPM = int(os.getenv("LLM_RPM", "30"))
+LLM_TPM = int(os.getenv("LLM_TPM", "12000"))
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))  # seconds
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))     # seconds
+
+TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+TRANSIENT_ERRORS = {"APIConnectionError", "APITimeoutError", "RateLimitError", "InternalServerError"}
+
+SEVERITY_RANK = {
+    "Critical": 3,
+    "High": 2,
+    "Medium": 1,
+}
+
+# Fallback re-check interval for sync waiters behind the head of the queue
+# (they are normally woken by notify_all when the head changes)
+_POLL = 0.02
+
+
+def item_priority(item: dict) -> float:
+    """Higher severity first, then higher rule score."""
+    return SEVERITY_RANK.get(item.get("severity"), 0) * 100 + float(item.get("rule_score") or 0)
+
+
+def is_transient(exc: Exception) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status in TRANSIENT_STATUS:
+        return True
+    if type(exc).__name__ in TRANSIENT_ERRORS:
+        return True
+    return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header, if the error carries one."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Refills `per_minute` units per minute, holding at most `per_minute * burst_seconds / 60`."""
+
+    def __init__(self, per_minute: float, burst_seconds: float = 60.0, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if available now)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        rpm: float = LLM_RPM,
+        tpm: float = LLM_TPM,
+        max_retries: int = LLM_MAX_RETRIES,
+        base_delay: float = LLM_RETRY_BASE_DELAY,
+        max_delay: float = LLM_RETRY_MAX_DELAY,
+        burst_seconds: float = 60.0,
+        clock=time.monotonic,
+        sleep=time.sleep,
+    ):
+        self.requests = TokenBucket(rpm, burst_seconds, clock)
+        self.tokens = TokenBucket(tpm, burst_seconds, clock)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep  # sync retry backoff (tests pass a fake clock's sleep)
+
+        self._cond = threading.Condition()
+        self._queue: list[tuple[float, int]] = []
+        self._wakers: dict = {}  # async ticket -> (loop, asyncio.Event) set when it reaches the head
+        self._seq = itertools.count()
+        self._stats = {"calls": 0, "retries": 0, "throttled": 0, "failed": 0, "expired": 0}
+
+    # ---------- admission ----------
+    def _try_admit(self, ticket, tokens: float) -> float:
+        """Under lock: admit ticket if it heads the queue and budget allows. Returns wait (0 = admitted)."""
+        if self._queue[0] != ticket:
+            return _POLL
+        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+        if wait > 0:
+            return wait
+        self.requests.consume(1)
+        self.tokens.consume(tokens)
+        heapq.heappop(self._queue)
+        self._notify()
+        return 0.0
+
+    def _notify(self) -> None:
+        """Under lock: the head of the queue changed; wake sync waiters and the new async head."""
+        self._cond.notify_all()
+        if self._queue and self._queue[0] in self._wakers:
+            loop, event = self._wakers[self._queue[0]]
+            loop.call_soon_threadsafe(event.set)
+
+    def _enqueue(self, priority: float):
+        ticket = (-priority, next(self._seq))
+        heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _dequeue(self, ticket) -> None:
+        if ticket in self._queue:
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+            self._notify()
+
+    def _check_deadline(self, wait: float, deadline: Optional[float]) -> None:
+        left = remaining(deadline)
+        if left is not None and wait >= left:
+            self._stats["expired"] += 1
+            raise DeadlineExceeded("llm: rate-limit wait exceeds request deadline")
+
+    def acquire(self, priority: float = 0.0, tokens: float = 1, deadline: Optional[float] = None) -> None:
+        """Block until this call may be sent (DeadlineExceeded if it cannot be sent in time)."""
+        with self._cond:
+            ticket = self._enqueue(priority)
+            throttled = False
+            try:
+                while True:
+                    wait = self._try_admit(ticket, tokens)
+                    if wait == 0:
+                        return
+                    if self._queue[0] == ticket and not throttled:
+                        throttled = True
+                        self._stats["throttled"] += 1
+                    self._check_deadline(wait if self._queue[0] == ticket else 0.0, deadline)
+                    self._cond.wait(timeout=wait)
+            except BaseException:
+                self._dequeue(ticket)
+                raise
+
+    async def aacquire(self, priority: float = 0.0, tokens: float = 1, deadline: Optional[float] = None) -> None:
+        """
+        Async variant of acquire (never blocks the event loop). Only the head
+        of the queue sleeps out the token-bucket wait; the others wait on their
+        own event until they become the head.
+        """
+        event = asyncio.Event()
+        with self._cond:
+            ticket = self._enqueue(priority)
+            self._wakers[ticket] = (asyncio.get_running_loop(), event)
+        throttled = False
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_admit(ticket, tokens)
+                    head = bool(self._queue) and self._queue[0] == ticket
+                    if wait and head and not throttled:
+                        throttled = True
+                        self._stats["throttled"] += 1
+                    if wait:
+                        self._check_deadline(wait if head else 0.0, deadline)
+                    event.clear()  # a head change from here on sets it again
+                if wait == 0:
+                    return
+                if head:
+                    await asyncio.sleep(wait)
+                    continue
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=remaining(deadline))
+                except asyncio.TimeoutError:
+                    pass  # deadline reached: _check_deadline raises on the next pass
+        except BaseException:
+            with self._cond:
+                self._dequeue(ticket)
+            raise
+        finally:
+            with self._cond:
+                self._wakers.pop(ticket, None)
+
+    # ---------- retries ----------
+    def _backoff(self, attempt: int, exc: Exception) -> float:
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        # Full jitter: uniform(0, base * 2^attempt), capped
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _should_retry(self, attempt: int, exc: Exception) -> bool:
+        if attempt < self.max_retries and is_transient(exc) and not isinstance(exc, DeadlineExceeded):
+            with self._cond:
+                self._stats["retries"] += 1
+            return True
+        with self._cond:
+            self._stats["failed"] += 1
+        return False
+
+    def _retry_delay(self, attempt: int, exc: Exception, deadline: Optional[float]) -> float:
+        delay = self._backoff(attempt, exc)
+        left = remaining(deadline)
+        if left is not None and delay >= left:
+            with self._cond:
+                self._stats["expired"] += 1
+            raise DeadlineExceeded(f"llm: no budget left to retry after {type(exc).__name__}") from exc
+        return delay
+
+    def run(self, call: Callable[[], Any], priority: float = 0.0, tokens: float = 1,
+            deadline: Optional[float] = None) -> Any:
+        """Run call() within the rate limits, retrying transient failures."""
+        for attempt in itertools.count():
+            self.acquire(priority, tokens, deadline)
+            with self._cond:
+                self._stats["calls"] += 1
+            try:
+                return call()
+            except Exception as exc:
+                if not self._should_retry(attempt, exc):
+                    raise
+                self.sleep(self._retry_delay(attempt, exc, deadline))
+
+    async def arun(self, call: Callable[[], Awaitable[Any]], priority: float = 0.0, tokens: float = 1,
+                   deadline: Optional[float] = None) -> Any:
+        """Async variant of run: call() returns an awaitable."""
+        for attempt in itertools.count():
+            await self.aacquire(priority, tokens, deadline)
+            with self._cond:
+                self._stats["calls"] += 1
+            try:
+                return await call()
+            except Exception as exc:
+                if not self._should_retry(attempt, exc):
+                    raise
+                await asyncio.sleep(self._retry_delay(attempt, exc, deadline))
+
+    # ---------- introspection ----------
+    @property
+    def queue_depth(self) -> int:
+        with self._cond:
+            return len(self._queue)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"queue_depth": len(self._queue), **self._stats}
+
+
+# Shared instance used by backends.llm_backend
+scheduler = LLMScheduler()
@@ -0,0 +1,242 @@
+"""Local distilled classifier: answers confident REVIEW items without calling the LLM
+
+Features: hashed char n-grams of the decoded request + the rule-engine hit vector
+(per-attack-type scores). Model: NumPy logistic regression trained from LLM
+verdicts in the verdict cache (scripts/train_local_classifier.py).
+"""
+import os
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+from urllib.parse import unquote_plus
+
+import numpy as np
+
+from backends.rule_engine import PATTERNS, analyze_request
+
+LOCAL_CLASSIFIER_PATH = Path(os.getenv(
+    "LOCAL_CLASSIFIER_PATH",
+    str(Path(__file__).parent.parent / "data" / "local_classifier.npz"),
+))
+# Minimum max(p, 1-p) to answer locally; below it the item goes on to the LLM
+LOCAL_CLASSIFIER_THRESHOLD = float(os.getenv("LOCAL_CLASSIFIER_THRESHOLD", "0.95"))
+
+# Only items the rule engine escalated for review are answered locally (and
+# trained on); ALLOW / MONITOR slow-path items keep going through the LLM policy
+SCOPE_DECISION = "REVIEW"
+
+MODEL_NAME = "local-classifier"
+BENIGN_MSG = "Benign request – no malicious intent detected."
+
+HASH_DIM = 2 ** 14
+NGRAM_RANGE = (3, 5)
+MAX_CHARS = 4096
+ATTACK_TYPES = list(PATTERNS)
+
+
+# =====================================================
+# Features (sparse rows: indices + values)
+# =====================================================
+def _ngram_features(text: str, hash_dim: int, ngram_range: tuple) -> dict:
+    text = unquote_plus(text.lower())[:MAX_CHARS]
+    counts: dict = {}
+    lo, hi = ngram_range
+    for n in range(lo, hi + 1):
+        for i in range(len(text) - n + 1):
+            idx = zlib.crc32(text[i:i + n].encode()) % hash_dim
+            counts[idx] = counts.get(idx, 0) + 1
+    return counts
+
+
+def _rule_features(rule: dict) -> list[float]:
+    """One slot per attack type (candidate score) + overall score + no-match flag."""
+    scores = {c["type"]: c["score"] for c in rule.get("attack_candidates") or []}
+    return (
+        [scores.get(t, 0.0) / 10.0 for t in ATTACK_TYPES]
+        + [float(rule.get("rule_score") or 0) / 10.0, 0.0 if scores else 1.0]
+    )
+
+
+def featurize(text: str, rule: dict = None, hash_dim: int = HASH_DIM,
+              ngram_range: tuple = NGRAM_RANGE) -> tuple[np.ndarray, np.ndarray]:
+    """Sparse feature row (indices, values) for one request."""
+    rule = rule if rule is not None else analyze_request(text)
+    counts = _ngram_features(text, hash_dim, ngram_range)
+
+    idx = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    val = np.log1p(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+    norm = np.linalg.norm(val)
+    if norm:
+        val /= norm
+
+    rule_vals = np.asarray(_rule_features(rule), dtype=np.float32)
+    rule_idx = hash_dim + np.arange(len(rule_vals), dtype=np.int64)
+    return np.concatenate([idx, rule_idx]), np.concatenate([val, rule_vals])
+
+
+def n_features(hash_dim: int = HASH_DIM) -> int:
+    return hash_dim + len(ATTACK_TYPES) + 2
+
+
+class _Rows:
+    """Minimal CSR matrix for the gradient-descent loop."""
+
+    def __init__(self, rows: list[tuple[np.ndarray, np.ndarray]], dim: int):
+        self.dim = dim
+        self.lengths = np.array([len(i) for i, _ in rows], dtype=np.int64)
+        self.indptr = np.concatenate([[0], np.cumsum(self.lengths)])
+        self.indices = np.concatenate([i for i, _ in rows]) if rows else np.zeros(0, np.int64)
+        self.data = np.concatenate([v for _, v in rows]) if rows else np.zeros(0, np.float32)
+
+    def dot(self, w: np.ndarray) -> np.ndarray:
+        return np.add.reduceat(self.data * w[self.indices], self.indptr[:-1])
+
+    def tdot(self, g: np.ndarray) -> np.ndarray:
+        return np.bincount(self.indices, weights=self.data * np.repeat(g, self.lengths), minlength=self.dim)
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+# =====================================================
+# Model
+# =====================================================
+class LocalClassifier:
+    def __init__(self, weights: np.ndarray, bias: float, hash_dim: int = HASH_DIM,
+                 ngram_range: tuple = NGRAM_RANGE, attack_types: list = None):
+        self.weights = weights.astype(np.float32)
+        self.bias = float(bias)
+        self.hash_dim = hash_dim
+        self.ngram_range = tuple(ngram_range)
+        self.attack_types = list(attack_types or ATTACK_TYPES)
+
+    @classmethod
+    def fit(cls, texts: list[str], labels: list[int], rules: list[dict] = None, epochs: int = 300,
+            lr: float = 0.5, l2: float = 1e-4, hash_dim: int = HASH_DIM) -> "LocalClassifier":
+        """Full-batch gradient descent on the logistic loss (labels: 1 = malicious)."""
+        rules = rules or [None] * len(texts)
+        X = _Rows([featurize(t, r, hash_dim) for t, r in zip(texts, rules)], n_features(hash_dim))
+        y = np.asarray(labels, dtype=np.float64)
+
+        w = np.zeros(X.dim)
+        b = 0.0
+        for _ in range(epochs):
+            g = (_sigmoid(X.dot(w) + b) - y) / len(y)
+            w -= lr * (X.tdot(g) + l2 * w)
+            b -= lr * g.sum()
+        return cls(w, b, hash_dim)
+
+    def predict_proba(self, text: str, rule: dict = None) -> float:
+        """Probability that the request is malicious."""
+        idx, val = featurize(text, rule, self.hash_dim, self.ngram_range)
+        return float(_sigmoid(np.dot(self.weights[idx], val) + self.bias))
+
+    def save(self, path: Path = LOCAL_CLASSIFIER_PATH) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            hash_dim=self.hash_dim,
+            ngram_range=np.asarray(self.ngram_range),
+            attack_types=np.asarray(self.attack_types),
+        )
+
+    @classmethod
+    def load(cls, path: Path = LOCAL_CLASSIFIER_PATH) -> "LocalClassifier":
+        with np.load(path) as f:
+            attack_types = [str(t) for t in f["attack_types"]]
+            if attack_types != ATTACK_TYPES:
+                raise Exception("local classifier was trained on a different rule set - retrain it")
+            return cls(f["weights"], float(f["bias"]), int(f["hash_dim"]),
+                       tuple(int(n) for n in f["ngram_range"]), attack_types)
+
+
+# =====================================================
+# Training labels from the verdict cache
+# =====================================================
+def in_scope(item: dict) -> bool:
+    """Whether an item (or cache entry) is one the local classifier handles."""
+    return item.get("fast_decision") == SCOPE_DECISION
+
+
+def label_from_cache(entry: dict) -> Optional[int]:
+    """1 = malicious, 0 = benign, None = no usable LLM verdict."""
+    out = entry.get("llm_output") or {}
+    if not out or out.get("error") or out.get("model") == MODEL_NAME:
+        return None  # rule-only, failed, or our own (never train on local answers)
+
+    verdict = out.get("verdict")
+    if verdict in ("benign", "malicious"):
+        return int(verdict == "malicious")
+
+    # Plain prompt: benign answers are EXACTLY BENIGN_MSG (see SYSTEM_PROMPT),
+    # anything else is a malicious-leaning verdict
+    analysis = (out.get("analysis") or "").strip()
+    if not analysis:
+        return None
+    return 0 if "no malicious intent" in analysis.lower() else 1
+
+
+# =====================================================
+# Shared instance (loaded once, absent artifact = disabled)
+# =====================================================
+_MODEL: Optional[LocalClassifier] = None
+_LOADED = False
+_LOCK = threading.Lock()
+_STATS = {"answered": 0, "escalated": 0, "latency_ms_total": 0.0}
+
+
+def get_model() -> Optional[LocalClassifier]:
+    global _MODEL, _LOADED
+    with _LOCK:
+        if not _LOADED:
+            _LOADED = True
+            if LOCAL_CLASSIFIER_PATH.exists():
+                try:
+                    _MODEL = LocalClassifier.load(LOCAL_CLASSIFIER_PATH)
+                except Exception as e:
+                    print(f"Warning: Failed to load local classifier: {e}")
+        return _MODEL
+
+
+def classify(text: str, rule: dict = None) -> Optional[dict]:
+    """
+    LLM-shaped verdict if the model is confident, else None (escalate).
+    """
+    model = get_model()
+    if model is None:
+        return None
+
+    started = time.perf_counter()
+    p = model.predict_proba(text, rule)
+    confidence = max(p, 1.0 - p)
+    answered = confidence >= LOCAL_CLASSIFIER_THRESHOLD
+    with _LOCK:
+        _STATS["answered" if answered else "escalated"] += 1
+        _STATS["latency_ms_total"] += (time.perf_counter() - started) * 1000
+    if not answered:
+        return None
+
+    verdict = "malicious" if p >= 0.5 else "benign"
+    return {
+        "analysis": BENIGN_MSG if verdict == "benign" else f"Likely malicious request (local classifier, p={p:.2f}).",
+        "model": MODEL_NAME,
+        "verdict": verdict,
+        "confidence": round(confidence, 3),
+    }
+
+
+def local_stats() -> dict:
+    with _LOCK:
+        calls = _STATS["answered"] + _STATS["escalated"]
+        return {
+            "loaded": _MODEL is not None,
+            "answered": _STATS["answered"],
+            "escalated": _STATS["escalated"],
+            "latency_ms_avg": round(_STATS["latency_ms_total"] / calls, 3) if calls else 0.0,
+        }
@@ -0,0 +1,86 @@
+"""Near-duplicate detection for the RAG corpus: MinHash signatures + LSH banding
+
+Requests are normalized (security-relevant segments, lowercase, digit runs
+collapsed), shingled into byte 5-grams and summarized by NUM_PERM min-hashes.
+LSH puts two requests in the same bucket when one band of ROWS consecutive
+min-hashes matches; bucket members whose estimated Jaccard similarity to the
+bucket head reaches the threshold are merged (union-find). Only requests
+with the same (label, attack_type) key can be merged.
+"""
+import re
+
+import numpy as np
+
+from backends.rag_context import relevant_segments
+
+NUM_PERM = 64
+BANDS = 16          # BANDS x ROWS must equal NUM_PERM
+ROWS = 4
+SHINGLE_SIZE = 5
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+def normalize_request(raw_request: str) -> str:
+    """The part of a request compared for duplicates: relevant segments, digits collapsed."""
+    return re.sub(r"\d+", "0", relevant_segments(raw_request).lower())
+
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """Distinct hashes of every byte `size`-gram (vectorized rolling hash)."""
+    data = np.frombuffer(text.encode(), dtype=np.uint8).astype(np.uint64)
+    if len(data) < size:
+        data = np.pad(data, (0, size - len(data)))
+    h = np.zeros(len(data) - size + 1, dtype=np.uint64)
+    for j in range(size):
+        h = h * np.uint64(1099511628211) + data[j:len(data) - size + 1 + j]
+    h ^= h >> np.uint64(31)
+    return np.unique(h % _PRIME)
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, int(_PRIME), size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), size=(num_perm, 1), dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """num_perm min-hashes of the normalized request (universal hashing mod 2^31-1)."""
+        hashes = shingle_hashes(normalize_request(text))
+        return ((self.a * hashes + self.b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def similarity(sig_a: np.ndarray, sig_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity (share of equal min-hashes)."""
+    return float(np.mean(sig_a == sig_b))
+
+
+def _find(parent: list, i: int) -> int:
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster(signatures: np.ndarray, keys: list, threshold: float = 0.8,
+            bands: int = BANDS, rows: int = ROWS) -> list[list[int]]:
+    """
+    Group row indices of `signatures` (n x bands*rows) into near-duplicate
+    clusters. keys[i] must match for two rows to be merged. Returns the
+    clusters (singletons included), each in ascending index order.
+    """
+    n = len(signatures)
+    parent = list(range(n))
+    for band in range(bands):
+        buckets = {}
+        block = signatures[:, band * rows:(band + 1) * rows]
+        for i in range(n):
+            head = buckets.setdefault((keys[i], block[i].tobytes()), i)
+            if head != i and similarity(signatures[head], signatures[i]) >= threshold:
+                ri, rh = _find(parent, i), _find(parent, head)
+                if ri != rh:
+                    parent[max(ri, rh)] = min(ri, rh)
+
+    clusters = {}
+    for i in range(n):
+        clusters.setdefault(_find(parent, i), []).append(i)
+    return list(clusters.values())
@@ -0,0 +1,270 @@
+"""In-process vector index (VECTOR_BACKEND=numpy): a drop-in for Qdrant on small deployments
+
+Layout under NUMPY_INDEX_DIR:
+- vectors.f32     memory-mapped float32 matrix (capacity x dim), L2-normalized rows
+- payloads.jsonl  side table, one {"row", "id", "payload"} line per write (last one wins)
+- meta.json       dim / count / capacity, rewritten atomically after every write
+- ivf.npz         optional IVF centroids + row assignments (build_ivf)
+
+Search is exact cosine top-k (matrix multiply + argpartition), or IVF when built:
+only the rows of the `nprobe` closest centroids are scored. Readers opened with
+read_only=True share the page cache across workers and pick up new rows when
+meta.json changes.
+
+A snapshot restore (backends/rag_snapshot.py) turns NUMPY_INDEX_DIR/<collection>
+into a symlink to a versioned directory and repoints it in one rename; a load
+reads all files from one resolved version.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+class NumpyIndex:
+    def __init__(self, path: Path, dim: int, read_only: bool = False, nprobe: int = 8):
+        self.path = Path(path)
+        self.dim = dim
+        self.read_only = read_only
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+
+        if not read_only:
+            self.path.mkdir(parents=True, exist_ok=True)
+        self._meta_stamp = None  # (inode, mtime) of the meta.json last loaded or written
+        self._load()
+
+    # ---------- files ----------
+    @property
+    def _meta_path(self) -> Path:
+        return self.path / "meta.json"
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def _payloads_path(self) -> Path:
+        return self.path / "payloads.jsonl"
+
+    @property
+    def _ivf_path(self) -> Path:
+        return self.path / "ivf.npz"
+
+    @staticmethod
+    def _stamp(meta_path: Path) -> tuple:
+        st = meta_path.stat()
+        return st.st_ino, st.st_mtime_ns
+
+    def _load(self) -> None:
+        # Everything comes from one resolved directory, so a concurrent restore
+        # (symlink repointed) never mixes the old and new versions
+        for _ in range(3):
+            root = self.path.resolve()
+            try:
+                self._load_from(root)
+            except FileNotFoundError:
+                continue  # the version being read was swapped out and removed
+            if self.path.resolve() == root:
+                return
+        raise Exception(f"numpy index at {self.path} kept changing while loading")
+
+    def _load_from(self, root: Path) -> None:
+        meta = {"dim": self.dim, "count": 0, "capacity": 0}
+        meta_path = root / "meta.json"
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if meta["dim"] != self.dim:
+                raise Exception(f"numpy index at {self.path} has dim {meta['dim']}, expected {self.dim}")
+            self._meta_stamp = self._stamp(meta_path)
+        self.count = meta["count"]
+        self.capacity = meta["capacity"]
+        self._vectors = self._open_vectors(root / "vectors.f32")
+
+        self._ids: dict = {}
+        self._payloads: list = [None] * self.count
+        payloads_path = root / "payloads.jsonl"
+        if payloads_path.exists():
+            with open(payloads_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line after a crash
+                    if rec["row"] < self.count:
+                        self._payloads[rec["row"]] = rec["payload"]
+                        self._ids[rec["id"]] = rec["row"]
+
+        self._centroids = None
+        self._assign = None
+        self._lists = None
+        ivf_path = root / "ivf.npz"
+        if ivf_path.exists() and self.count:
+            with np.load(ivf_path) as f:
+                self._centroids = f["centroids"]
+                built = f["assign"][:self.count]
+            extra = self._nearest_centroid(self._vectors[len(built):self.count])
+            self._assign = np.concatenate([built, extra]).astype(np.int32)
+
+    def _open_vectors(self, path: Path = None):
+        if not self.capacity:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        mode = "r" if self.read_only else "r+"
+        return np.memmap(path or self._vectors_path, dtype=np.float32, mode=mode, shape=(self.capacity, self.dim))
+
+    def _grow(self, needed: int) -> None:
+        capacity = max(1024, self.capacity)
+        while capacity < needed:
+            capacity *= 2
+        if isinstance(self._vectors, np.memmap):
+            self._vectors.flush()
+        self._vectors = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self.capacity = capacity
+        self._vectors = self._open_vectors()
+
+    def _write_meta(self) -> None:
+        tmp = self._meta_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"dim": self.dim, "count": self.count, "capacity": self.capacity}))
+        os.replace(tmp, self._meta_path)
+        self._meta_stamp = self._stamp(self._meta_path)
+
+    def refresh(self) -> None:
+        """Reload if another process wrote to (or restored) the index (read-only workers)."""
+        try:
+            stamp = self._stamp(self._meta_path)
+        except FileNotFoundError:
+            return  # nothing written yet, or mid-restore: keep what is loaded
+        if stamp != self._meta_stamp:
+            with self._lock:
+                self._load()
+
+    # ---------- writes ----------
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def upsert(self, ids: list[str], vectors, payloads: list[dict]) -> None:
+        """Insert or overwrite rows by id (same semantics as a Qdrant upsert)."""
+        if self.read_only:
+            raise Exception("numpy index is opened read-only")
+        vectors = self._normalize(vectors)
+        with self._lock:
+            rows, pending, new_count = [], {}, self.count
+            for point_id in ids:
+                row = self._ids.get(point_id, pending.get(point_id))
+                if row is None:
+                    row = pending[point_id] = new_count
+                    new_count += 1
+                rows.append(row)
+            if new_count > self.capacity:
+                self._grow(new_count)
+
+            # Vectors first, then payloads, then meta: readers only see complete rows
+            self._vectors[rows] = vectors
+            self._vectors.flush()
+            with open(self._payloads_path, "a", encoding="utf-8") as f:
+                for row, point_id, payload in zip(rows, ids, payloads):
+                    f.write(json.dumps({"row": row, "id": point_id, "payload": payload}) + "\n")
+
+            self._payloads.extend([None] * (new_count - self.count))
+            for row, point_id, payload in zip(rows, ids, payloads):
+                self._payloads[row] = payload
+                self._ids[point_id] = row
+            if self._centroids is not None:
+                assign = np.zeros(new_count, dtype=np.int32)
+                assign[:len(self._assign)] = self._assign
+                assign[rows] = self._nearest_centroid(vectors)
+                self._assign, self._lists = assign, None
+            self.count = new_count
+            self._write_meta()
+
+    # ---------- IVF ----------
+    def _nearest_centroid(self, vectors) -> np.ndarray:
+        if len(vectors) == 0:
+            return np.zeros(0, dtype=np.int32)
+        return np.argmax(np.asarray(vectors) @ self._centroids.T, axis=1).astype(np.int32)
+
+    def build_ivf(self, n_lists: int, iterations: int = 10, sample: int = 50000, seed: int = 0) -> None:
+        """Spherical k-means over (a sample of) the rows; enables IVF search."""
+        if self.read_only:
+            raise Exception("numpy index is opened read-only")
+        with self._lock:
+            data = np.asarray(self._vectors[:self.count])
+            rng = np.random.default_rng(seed)
+            train = data[rng.choice(self.count, min(sample, self.count), replace=False)]
+            centroids = train[rng.choice(len(train), min(n_lists, len(train)), replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(train @ centroids.T, axis=1)
+                for c in range(len(centroids)):
+                    members = train[labels == c]
+                    if len(members):
+                        centroids[c] = members.sum(axis=0)
+                centroids = self._normalize(centroids)
+
+            self._centroids = centroids
+            self._assign = self._nearest_centroid(data)
+            self._lists = None
+            np.savez(self._ivf_path, centroids=centroids, assign=self._assign)
+            self._write_meta()  # bumps mtime so read-only workers reload with the IVF
+
+    def _ivf_lists(self) -> list[np.ndarray]:
+        if self._lists is None:
+            order = np.argsort(self._assign, kind="stable")
+            bounds = np.searchsorted(self._assign[order], np.arange(len(self._centroids) + 1))
+            self._lists = [order[bounds[i]:bounds[i + 1]] for i in range(len(self._centroids))]
+        return self._lists
+
+    # ---------- search ----------
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        k = min(k, scores.shape[-1])
+        if k == 0:
+            return np.zeros(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top])]
+
+    def search(self, queries, k: int = 3) -> list[list[tuple[dict, float]]]:
+        """Top-k (payload, cosine score) per query vector."""
+        if self.read_only:
+            self.refresh()
+        queries = self._normalize(queries)
+        with self._lock:
+            if self.count == 0:
+                return [[] for _ in queries]
+            vectors = self._vectors[:self.count]
+
+            if self._centroids is None:
+                scores = queries @ vectors.T
+                tops = [(self._top_k(row, k), row) for row in scores]
+                return [[(self._payloads[i], float(row[i])) for i in top] for top, row in tops]
+
+            lists = self._ivf_lists()
+            probes = np.argsort(-(queries @ self._centroids.T), axis=1)[:, :self.nprobe]
+            results = []
+            for query, probe in zip(queries, probes):
+                candidates = np.concatenate([lists[c] for c in probe])
+                scores = vectors[candidates] @ query
+                top = self._top_k(scores, k)
+                results.append([(self._payloads[candidates[i]], float(scores[i])) for i in top])
+            return results
+
+    def payloads(self) -> list[dict]:
+        """Payload of every row (input for the lexical index / corpus scans)."""
+        if self.read_only:
+            self.refresh()
+        with self._lock:
+            return [p for p in self._payloads if p is not None]
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "capacity": self.capacity,
+            "ivf_lists": 0 if self._centroids is None else len(self._centroids),
+            "read_only": self.read_only,
+        }
@@ -0,0 +1,99 @@
+"""Qdrant collection profiles: storage, quantization and HNSW settings, selected by QDRANT_PROFILE
+
+- "memory":  float32 vectors in RAM, payload storage left at the server default (previous behaviour, best latency)
+- "int8":    scalar int8 quantization kept in RAM (4x smaller), originals on disk, rescored
+- "binary":  binary quantization kept in RAM (32x smaller), originals on disk, oversampled + rescored
+- "on_disk": float32 vectors, payload and HNSW graph on disk (smallest RAM, page-cache bound)
+
+Profiles apply when a collection is created; an existing collection keeps its
+settings (drop it and reseed, or use scripts/benchmark_collection_profiles.py
+to compare first). Search-time knobs (hnsw_ef, rescoring, oversampling) apply
+to every query.
+"""
+import os
+
+from qdrant_client.http import models as qmodels
+
+from backends.embedders import VECTOR_SIZE
+
+QDRANT_PROFILE = os.getenv("QDRANT_PROFILE", "memory").lower()
+# HNSW graph: links per node and build-time beam (Qdrant defaults 16 / 100); search beam (0 = Qdrant default)
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+QDRANT_HNSW_EF = int(os.getenv("QDRANT_HNSW_EF", "0"))
+# Quantized profiles: candidates fetched = limit x oversampling, re-scored with the original vectors
+QDRANT_OVERSAMPLING = float(os.getenv("QDRANT_OVERSAMPLING", "2.0"))
+QDRANT_RESCORE = os.getenv("QDRANT_RESCORE", "1") == "1"
+
+PROFILES = {
+    "memory": {"on_disk": False, "quantization": None},
+    "int8": {"on_disk": True, "quantization": "int8"},
+    "binary": {"on_disk": True, "quantization": "binary"},
+    "on_disk": {"on_disk": True, "quantization": None, "hnsw_on_disk": True},
+}
+
+
+def _profile(name: str) -> dict:
+    if name not in PROFILES:
+        raise Exception(f"Unknown QDRANT_PROFILE '{name}' (expected one of: {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+
+def _quantization_config(kind: str):
+    if kind == "int8":
+        return qmodels.ScalarQuantization(
+            scalar=qmodels.ScalarQuantizationConfig(type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if kind == "binary":
+        return qmodels.BinaryQuantization(binary=qmodels.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def collection_config(name: str = QDRANT_PROFILE, dim: int = VECTOR_SIZE) -> dict:
+    """Keyword arguments for QdrantClient.create_collection under profile `name`."""
+    profile = _profile(name)
+    return {
+        "vectors_config": qmodels.VectorParams(
+            size=dim,
+            distance=qmodels.Distance.COSINE,
+            on_disk=profile["on_disk"],
+        ),
+        # Only set for on-disk profiles: "memory" keeps the server default, as before profiles
+        "on_disk_payload": True if profile["on_disk"] else None,
+        "hnsw_config": qmodels.HnswConfigDiff(
+            m=QDRANT_HNSW_M,
+            ef_construct=QDRANT_HNSW_EF_CONSTRUCT,
+            on_disk=profile.get("hnsw_on_disk", False),
+        ),
+        "quantization_config": _quantization_config(profile["quantization"]),
+    }
+
+
+def search_params(name: str = QDRANT_PROFILE, exact: bool = False) -> qmodels.SearchParams:
+    """Per-query parameters matching the collection profile (exact=True: brute-force baseline)."""
+    profile = _profile(name)
+    quantization = None
+    if profile["quantization"] and not exact:
+        quantization = qmodels.QuantizationSearchParams(
+            ignore=False,
+            rescore=QDRANT_RESCORE,
+            oversampling=QDRANT_OVERSAMPLING,
+        )
+    return qmodels.SearchParams(
+        hnsw_ef=QDRANT_HNSW_EF or None,
+        exact=exact,
+        quantization=quantization,
+    )
+
+
+def estimate_ram_bytes(name: str, count: int, dim: int = VECTOR_SIZE) -> int:
+    """
+    Rough resident footprint of vectors + HNSW links (payload excluded).
+    Qdrant does not report per-collection RAM, so this is back-of-envelope
+    arithmetic: float32 rows if in RAM, quantized codes, 2 x m int32 links.
+    """
+    profile = _profile(name)
+    quantized = {"int8": dim, "binary": (dim + 7) // 8}.get(profile["quantization"], 0)
+    vectors = 0 if profile["on_disk"] else dim * 4
+    links = 0 if profile.get("hnsw_on_disk") else QDRANT_HNSW_M * 2 * 4
+    return count * (vectors + quantized + links)
@@ -1,48 +1,299 @@
+import asyncio
 import hashlib
+import math
 import os
+import threading
 import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import httpx
 import requests
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.http import models as qmodels
+from qdrant_client.http.exceptions import UnexpectedResponse
 
-# HuggingFace Inference API configuration
-HF_API_URL = "https://router.huggingface.co/hf-inference/models/sentence-transformers/all-MiniLM-L6-v2/pipeline/feature-extraction"
-HF_TOKEN = os.getenv("HF_TOKEN")
+from backends.circuit_breaker import breaker
+from backends.concurrency import MicroBatcher
+from backends.deadline import DeadlineExceeded, budget_bounded, remaining, timeout_for
+from backends.embedders import HF_TIMEOUT, VECTOR_SIZE, embedder
+from backends.embedding_cache import EmbeddingCache
+from backends.lexical_index import LexicalIndex
+from backends.numpy_index import NumpyIndex
+from backends.qdrant_profiles import QDRANT_PROFILE, collection_config, search_params
+from backends.rag_context import build_rag_context
+from backends.tracing import span
 
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "soc_attacks")
-VECTOR_SIZE = 384
+# gRPC (port 6334, exposed by docker-compose) is cheaper per call than REST
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
 
-client = QdrantClient(url=QDRANT_URL)
+# qdrant (server) | numpy (in-process memmap index, see backends/numpy_index.py)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant").lower()
+NUMPY_INDEX_DIR = Path(os.getenv("NUMPY_INDEX_DIR", str(Path(__file__).parent.parent / "data" / "vector_index")))
+NUMPY_INDEX_READONLY = os.getenv("NUMPY_INDEX_READONLY", "0") == "1"   # API workers: share, never write
+NUMPY_INDEX_NPROBE = int(os.getenv("NUMPY_INDEX_NPROBE", "8"))         # IVF lists scanned per query
 
+# Upper bound per call (seconds); a request deadline can only shorten it
+QDRANT_TIMEOUT = float(os.getenv("QDRANT_TIMEOUT", "5"))
 
-def _get_embedding(text: str) -> list[float]:
-    """Get embedding from HuggingFace Inference API."""
-    headers = {"Content-Type": "application/json"}
-    if HF_TOKEN:
-        headers["Authorization"] = f"Bearer {HF_TOKEN}"
-    
-    response = requests.post(
-        HF_API_URL,
-        headers=headers,
-        json={"inputs": text}
-    )
-    
-    if response.status_code != 200:
-        raise Exception(f"HF API error: {response.status_code} - {response.text}")
-    
-    return response.json()  # Returns 384-dim vector directly
+# Embedding cache (memmap files under data/, one pair per engine); 0 disables it
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "20000"))
+EMBED_CACHE_DIR = Path(os.getenv("EMBED_CACHE_DIR", str(Path(__file__).parent.parent / "data")))
 
+# Micro-batching of concurrent async searches: wait window and max queries per batch
+RAG_BATCH_WINDOW_MS = float(os.getenv("RAG_BATCH_WINDOW_MS", "5"))
+RAG_BATCH_MAX = int(os.getenv("RAG_BATCH_MAX", "64"))
 
-def _ensure_collection() -> None:
+# Scope retrieval to the rule engine's attack families (keyword payload index on
+# attack_type); the numpy backend over-fetches k x RAG_FILTER_OVERFETCH instead.
+# Only families the corpus actually stores are filtered on: CSIC seeds store
+# "attack" / "normal", so their searches stay unfiltered (no empty query + top-up)
+RAG_FILTER_BY_RULE = os.getenv("RAG_FILTER_BY_RULE", "1") == "1"
+RAG_FILTER_OVERFETCH = int(os.getenv("RAG_FILTER_OVERFETCH", "10"))
+PAYLOAD_INDEXES = ("attack_type",)
+_FAMILY_FACET_LIMIT = 1000  # distinct attack_type values read from Qdrant
+
+# dense (embeddings) | lexical (BM25 over char n-grams, no embedding call) | hybrid (both, RRF-fused)
+RAG_RETRIEVAL = os.getenv("RAG_RETRIEVAL", "dense").lower()
+LEXICAL_INDEX_DIR = Path(os.getenv("LEXICAL_INDEX_DIR", str(Path(__file__).parent.parent / "data" / "lexical_index")))
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))              # reciprocal rank fusion constant
+RAG_FUSION_FETCH = int(os.getenv("RAG_FUSION_FETCH", "4"))  # hybrid: candidates per k from each side
+
+# Errors that mean "the call ran out of time" (reported as DeadlineExceeded)
+_TIMEOUT_ERRORS = (requests.Timeout, httpx.TimeoutException, asyncio.TimeoutError, TimeoutError)
+
+_QDRANT_OPTIONS = {
+    "url": QDRANT_URL,
+    "timeout": math.ceil(QDRANT_TIMEOUT),
+    "prefer_grpc": QDRANT_PREFER_GRPC,
+    "grpc_port": QDRANT_GRPC_PORT,
+}
+
+client = QdrantClient(**_QDRANT_OPTIONS)
+# Sync searches with a sub-second-precision budget wait on these (see _query_batch)
+_search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="qdrant-search")
+
+# Async client for the /analyze slow path (sync one above stays for scripts)
+async_client = AsyncQdrantClient(**_QDRANT_OPTIONS)
+
+vector_index = (
+    NumpyIndex(NUMPY_INDEX_DIR / COLLECTION_NAME, VECTOR_SIZE, read_only=NUMPY_INDEX_READONLY, nprobe=NUMPY_INDEX_NPROBE)
+    if VECTOR_BACKEND == "numpy" else None
+)
+
+# Open breakers fail these calls in microseconds instead of a timeout each
+_embed_breaker = breaker(embedder.name)
+_qdrant_breaker = breaker("qdrant")
+
+embedding_cache = (
+    EmbeddingCache(EMBED_CACHE_DIR / f"embeddings_{embedder.name}", VECTOR_SIZE, EMBED_CACHE_SIZE)
+    if EMBED_CACHE_SIZE > 0 else None
+)
+
+# Loaded (or built from the collection) on first lexical / hybrid search
+lexical_index = None
+_lexical_lock = threading.Lock()
+
+
+def _split_cached(texts: list[str]) -> tuple[list, list[str]]:
+    """Cached vectors (None where missing) and the distinct texts still to embed."""
+    vectors = [None] * len(texts)
+    missing = []
+    for i, text in enumerate(texts):
+        cached = embedding_cache.get(text) if embedding_cache is not None else None
+        if cached is not None:
+            vectors[i] = cached.tolist()
+        elif text not in missing:
+            missing.append(text)
+    return vectors, missing
+
+
+def _fill(texts: list[str], vectors: list, missing: list[str], embedded: list) -> list:
+    fresh = dict(zip(missing, embedded))
+    if embedding_cache is not None:
+        for text, emb in fresh.items():
+            embedding_cache.put(text, emb)
+    return [vec if vec is not None else fresh[text] for text, vec in zip(texts, vectors)]
+
+
+def _embed_batch(texts: list[str], timeout: float) -> list[list[float]]:
+    with budget_bounded(timeout, HF_TIMEOUT):
+        return embedder.embed_batch(texts, timeout=timeout)
+
+
+async def _aembed_batch(texts: list[str], timeout: float) -> list[list[float]]:
+    with budget_bounded(timeout, HF_TIMEOUT):
+        return await embedder.aembed_batch(texts, timeout=timeout)
+
+
+def _get_embeddings(texts: list[str], timeout: float = HF_TIMEOUT) -> list[list[float]]:
+    """
+    Embed many texts with the configured engine (EMBEDDER: hf | hashing):
+    cache hits are reused, the rest go out in ONE batched call.
+    """
+    vectors, missing = _split_cached(texts)
+    with span("embedding", embedder=embedder.name, texts=len(texts), cache_misses=len(missing)):
+        embedded = _embed_breaker.call(_embed_batch, missing, timeout) if missing else []
+    return _fill(texts, vectors, missing, embedded)
+
+
+async def _aget_embeddings(texts: list[str], timeout: float = HF_TIMEOUT) -> list[list[float]]:
+    """Async variant of _get_embeddings (non-blocking HTTP for the hf engine)."""
+    vectors, missing = _split_cached(texts)
+    with span("embedding", embedder=embedder.name, texts=len(texts), cache_misses=len(missing)):
+        embedded = await _embed_breaker.acall(_aembed_batch, missing, timeout) if missing else []
+    return _fill(texts, vectors, missing, embedded)
+
+
+def _get_embedding(text: str, timeout: float = HF_TIMEOUT) -> list[float]:
+    """Embed one text (cached by normalized text)."""
+    return _get_embeddings([text], timeout=timeout)[0]
+
+
+async def _aget_embedding(text: str, timeout: float = HF_TIMEOUT) -> list[float]:
+    """Async variant of _get_embedding."""
+    return (await _aget_embeddings([text], timeout=timeout))[0]
+
+
+def embedding_cache_stats() -> dict:
+    return embedding_cache.stats() if embedding_cache is not None else {"enabled": False}
+
+
+# Storage / quantization / HNSW settings (QDRANT_PROFILE, see backends/qdrant_profiles.py)
+_SEARCH_PARAMS = search_params(QDRANT_PROFILE)
+
+
+# The collection check runs once per process (startup or first use), not per call
+_collection_ready = False
+_collection_lock = threading.Lock()
+_acollection_locks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()  # event loop -> asyncio.Lock
+
+_FILTER_STATS = {"filtered": 0, "fallbacks": 0}
+_FILTER_LOCK = threading.Lock()
+
+# Distinct attack_type values in the corpus, read once per process (startup or
+# first filtered search) and extended by this process's own writes
+_stored_families = None
+_stored_families_lock = threading.Lock()
+
+
+def _missing_indexes(info) -> list[str]:
+    return [field for field in PAYLOAD_INDEXES if field not in (info.payload_schema or {})]
+
+
+def _check_collection() -> None:
+    global _collection_ready
     if not client.collection_exists(collection_name=COLLECTION_NAME):
         client.create_collection(
             collection_name=COLLECTION_NAME,
-            vectors_config=qmodels.VectorParams(
-                size=VECTOR_SIZE,
-                distance=qmodels.Distance.COSINE,
-            ),
+            **collection_config(QDRANT_PROFILE),
+        )
+    # Keyword indexes for filtered retrieval (also added to collections seeded before them)
+    for field in _missing_indexes(client.get_collection(collection_name=COLLECTION_NAME)):
+        client.create_payload_index(
+            collection_name=COLLECTION_NAME,
+            field_name=field,
+            field_schema=qmodels.PayloadSchemaType.KEYWORD,
         )
+    _collection_ready = True
+
+
+async def _acheck_collection() -> None:
+    global _collection_ready
+    if not await async_client.collection_exists(collection_name=COLLECTION_NAME):
+        await async_client.create_collection(
+            collection_name=COLLECTION_NAME,
+            **collection_config(QDRANT_PROFILE),
+        )
+    for field in _missing_indexes(await async_client.get_collection(collection_name=COLLECTION_NAME)):
+        await async_client.create_payload_index(
+            collection_name=COLLECTION_NAME,
+            field_name=field,
+            field_schema=qmodels.PayloadSchemaType.KEYWORD,
+        )
+    _collection_ready = True
+
+
+def _ensure_collection() -> None:
+    if _collection_ready:
+        return
+    with _collection_lock:
+        if not _collection_ready:
+            _qdrant_breaker.call(_check_collection)
+
+
+def _acollection_lock() -> asyncio.Lock:
+    """One asyncio.Lock per event loop (scripts and tests run several loops)."""
+    loop = asyncio.get_running_loop()
+    lock = _acollection_locks.get(loop)
+    if lock is None:
+        lock = _acollection_locks[loop] = asyncio.Lock()
+    return lock
+
+
+async def _aensure_collection() -> None:
+    if _collection_ready:
+        return
+    async with _acollection_lock():
+        if not _collection_ready:
+            await _qdrant_breaker.acall(_acheck_collection)
+
+
+def _forget_collection(e: UnexpectedResponse) -> None:
+    """Collection dropped behind our back (e.g. re-seed): re-check it on the next call."""
+    global _collection_ready, _stored_families
+    if e.status_code == 404:
+        _collection_ready = False
+        _stored_families = None
+
+
+def _facet_families(facet) -> frozenset:
+    if len(facet.hits) >= _FAMILY_FACET_LIMIT:
+        print(f"Warning: more than {_FAMILY_FACET_LIMIT} attack_type values in '{COLLECTION_NAME}'; "
+              "families past the limit are searched unfiltered")
+    return frozenset(str(hit.value) for hit in facet.hits)
+
+
+def stored_families() -> frozenset:
+    """attack_type values present in the collection (or the in-process index)."""
+    global _stored_families
+    if _stored_families is None:
+        with _stored_families_lock:
+            if _stored_families is None:
+                if vector_index is not None:
+                    _stored_families = frozenset(p.get("attack_type", "normal") for p in vector_index.payloads())
+                else:
+                    _ensure_collection()
+                    _stored_families = _facet_families(_qdrant_breaker.call(
+                        client.facet, collection_name=COLLECTION_NAME, key="attack_type",
+                        limit=_FAMILY_FACET_LIMIT, exact=True,
+                    ))
+    return _stored_families
+
+
+async def astored_families() -> frozenset:
+    """Async variant of stored_families."""
+    global _stored_families
+    if _stored_families is None:
+        if vector_index is not None:
+            return await asyncio.to_thread(stored_families)
+        await _aensure_collection()
+        _stored_families = _facet_families(await _qdrant_breaker.acall(
+            async_client.facet, collection_name=COLLECTION_NAME, key="attack_type",
+            limit=_FAMILY_FACET_LIMIT, exact=True,
+        ))
+    return _stored_families
+
+
+def _note_families(points: list[qmodels.PointStruct]) -> None:
+    """Keep the cached family set current with this process's own writes."""
+    global _stored_families
+    with _stored_families_lock:
+        if _stored_families is not None:
+            _stored_families = _stored_families | {p.payload["attack_type"] for p in points}
 
 
 def _make_doc_id(text: str) -> str:
@@ -51,58 +302,438 @@ def _make_doc_id(text: str) -> str:
     return str(uuid.uuid5(uuid.NAMESPACE_DNS, digest))
 
 
-def add_rag_example(text: str, is_anomalous: bool, attack_type: str = None):
-    """Add example to RAG collection.
-    
-    Args:
-        text: Request/payload text
-        is_anomalous: True if attack/anomalous, False if normal
-        attack_type: Type of attack (e.g., 'SQL Injection', 'XSS'). Can be None for normal requests.
-    """
-    _ensure_collection()
-    emb = _get_embedding(text)
-    doc_id = _make_doc_id(text)
+def _make_point(text: str, emb: list[float], is_anomalous: bool, attack_type: str = None) -> qmodels.PointStruct:
     payload = {
         "raw_request": text,
         "label": "anomalous" if is_anomalous else "normal",
         "attack_type": attack_type or "normal",
     }
-    client.upsert(
-        collection_name=COLLECTION_NAME,
-        points=[
-            qmodels.PointStruct(
-                id=doc_id,
-                vector=emb,
-                payload=payload,
-            )
-        ],
+    return qmodels.PointStruct(
+        id=_make_doc_id(text),
+        vector=emb,
+        payload=payload,
     )
 
-def vector_search(query: str, k: int = 3):
-    _ensure_collection()
-    emb = _get_embedding(query)
-    hits = client.search(
-        collection_name=COLLECTION_NAME,
-        query_vector=emb,
-        limit=k,
-        with_payload=True,
-    )
 
+def _parse_payloads(payloads: list) -> list[dict]:
     results = []
-    for hit in hits:
-        payload = hit.payload or {}
+    for payload in payloads:
+        payload = payload or {}
         results.append({
             "raw_request": payload.get("raw_request", ""),
             "label": payload.get("label", "normal"),
             "attack_type": payload.get("attack_type", "normal"),
+            # >1 after scripts/compact_rag_corpus.py merged near-duplicates into this point
+            "member_count": int(payload.get("member_count", 1)),
         })
     return results
 
+
+def _parse_hits(hits) -> list[dict]:
+    return _parse_payloads([hit.payload for hit in hits])
+
+
+def _upsert(points: list[qmodels.PointStruct]) -> None:
+    if vector_index is not None:
+        vector_index.upsert([p.id for p in points], [p.vector for p in points], [p.payload for p in points])
+        _note_families(points)
+        return
+    _ensure_collection()
+    try:
+        _qdrant_breaker.call(client.upsert, collection_name=COLLECTION_NAME, points=points)
+    except UnexpectedResponse as e:
+        _forget_collection(e)
+        raise
+    _note_families(points)
+
+
+async def _aupsert(points: list[qmodels.PointStruct]) -> None:
+    if vector_index is not None:
+        _upsert(points)
+        return
+    await _aensure_collection()
+    try:
+        await _qdrant_breaker.acall(async_client.upsert, collection_name=COLLECTION_NAME, points=points)
+    except UnexpectedResponse as e:
+        _forget_collection(e)
+        raise
+    _note_families(points)
+
+
+def add_rag_example(text: str, is_anomalous: bool, attack_type: str = None):
+    """Add example to RAG collection.
+
+    Args:
+        text: Request/payload text
+        is_anomalous: True if attack/anomalous, False if normal
+        attack_type: Type of attack (e.g., 'SQL Injection', 'XSS'). Can be None for normal requests.
+    """
+    emb = _get_embedding(text)
+    _upsert([_make_point(text, emb, is_anomalous, attack_type)])
+
+
+async def aadd_rag_example(text: str, is_anomalous: bool, attack_type: str = None):
+    """Async variant of add_rag_example."""
+    emb = await _aget_embedding(text)
+    await _aupsert([_make_point(text, emb, is_anomalous, attack_type)])
+
+
+def add_rag_examples(examples: list[tuple], embed_batch_size: int = 64, timeout: float = HF_TIMEOUT) -> int:
+    """Bulk variant of add_rag_example for seeding: batched embedding, one upsert.
+
+    Args:
+        examples: (text, is_anomalous, attack_type) tuples
+        embed_batch_size: texts per embedding call (HF rejects very large payloads)
+    Returns:
+        Number of points written (duplicate texts collapse into one point)
+    """
+    texts = [text for text, _, _ in examples]
+    embs = []
+    for start in range(0, len(texts), embed_batch_size):
+        # Straight to the engine: a bulk seed would evict every query-time cache entry
+        embs.extend(embedder.embed_batch(texts[start:start + embed_batch_size], timeout=timeout))
+
+    points = {}
+    for (text, is_anomalous, attack_type), emb in zip(examples, embs):
+        point = _make_point(text, emb, is_anomalous, attack_type)
+        points[point.id] = point
+    _upsert(list(points.values()))
+    return len(points)
+
+
+def _families(candidates) -> tuple:
+    """Rule-engine attack families used to scope retrieval (empty = whole collection)."""
+    if not RAG_FILTER_BY_RULE or not candidates:
+        return ()
+    return tuple(sorted({c["type"] for c in candidates}))
+
+
+def _scope(families: list[tuple], stored: frozenset) -> list[tuple]:
+    """Keep the families the corpus stores; a query left with none searches unfiltered."""
+    return [tuple(f for f in fams if f in stored) for fams in families]
+
+
+def _family_filter(families: tuple):
+    if not families:
+        return None
+    return qmodels.Filter(must=[
+        qmodels.FieldCondition(key="attack_type", match=qmodels.MatchAny(any=list(families))),
+    ])
+
+
+def _top_up(filtered: list[dict], unfiltered: list[dict], k: int) -> list[dict]:
+    """Same-family examples first, then the best of the whole collection up to k."""
+    seen = {r["raw_request"] for r in filtered}
+    return (filtered + [r for r in unfiltered if r["raw_request"] not in seen])[:k]
+
+
+def _short(results: list[list[dict]], families: list[tuple], k: int) -> list[int]:
+    """Filtered searches that found fewer than k examples (family absent / rare in the corpus)."""
+    short = [i for i, (hits, fams) in enumerate(zip(results, families)) if fams and len(hits) < k]
+    with _FILTER_LOCK:
+        _FILTER_STATS["filtered"] += sum(1 for fams in families if fams)
+        _FILTER_STATS["fallbacks"] += len(short)
+    return short
+
+
+def _index_search(embs: list, k: int, families: list[tuple] = None) -> list[list[dict]]:
+    families = families or [()] * len(embs)
+    # The in-process index has no payload filter: over-fetch, keep the family matches
+    fetch = k * RAG_FILTER_OVERFETCH if any(families) else k
+    with span("index.search", queries=len(embs), limit=fetch):
+        found = vector_index.search(embs, fetch)
+    results, matched = [], []
+    for hits, fams in zip(found, families):
+        parsed = _parse_payloads([payload for payload, _ in hits])
+        same = [r for r in parsed if r["attack_type"] in fams][:k]
+        matched.append(same)
+        results.append(_top_up(same, parsed, k) if fams else parsed[:k])
+    _short(matched, families, k)
+    return results
+
+
+def _query_requests(embs: list, k: int, families: list[tuple] = None) -> list[qmodels.QueryRequest]:
+    families = families or [()] * len(embs)
+    return [
+        qmodels.QueryRequest(query=emb, limit=k, filter=_family_filter(fams), params=_SEARCH_PARAMS, with_payload=True)
+        for emb, fams in zip(embs, families)
+    ]
+
+
+def _query_batch(embs: list, k: int, families: list[tuple], deadline: float = None) -> list[list[dict]]:
+    search_timeout = timeout_for(deadline, QDRANT_TIMEOUT, "retrieval")
+
+    def query():
+        # Qdrant takes whole seconds (server timeout, and the HTTP timeout over
+        # REST): a fractional budget is enforced by waiting on a worker instead,
+        # like wait_for on the async path
+        def call():
+            return client.query_batch_points(
+                collection_name=COLLECTION_NAME,
+                requests=_query_requests(embs, k, families),
+                timeout=math.ceil(search_timeout),
+            )
+        with budget_bounded(search_timeout, QDRANT_TIMEOUT):
+            if search_timeout == math.ceil(search_timeout):
+                return call()
+            return _search_pool.submit(call).result(timeout=search_timeout)
+
+    with span("qdrant.search", queries=len(embs), limit=k, filtered=any(families or [])):
+        responses = _qdrant_breaker.call(query)
+    return [_parse_hits(response.points) for response in responses]
+
+
+async def _aquery_batch(embs: list, k: int, families: list[tuple], deadline: float = None) -> list[list[dict]]:
+    search_timeout = timeout_for(deadline, QDRANT_TIMEOUT, "retrieval")
+
+    async def query():
+        with budget_bounded(search_timeout, QDRANT_TIMEOUT):
+            return await asyncio.wait_for(
+                async_client.query_batch_points(
+                    collection_name=COLLECTION_NAME,
+                    requests=_query_requests(embs, k, families),
+                    timeout=math.ceil(search_timeout),
+                ),
+                timeout=search_timeout,
+            )
+
+    with span("qdrant.search", queries=len(embs), limit=k, filtered=any(families or [])):
+        responses = await _qdrant_breaker.acall(query)
+    return [_parse_hits(response.points) for response in responses]
+
+
+def corpus_payloads(page_size: int = 1000) -> list[dict]:
+    """Payload of every example in the collection (or the in-process index)."""
+    if vector_index is not None:
+        return vector_index.payloads()
+    payloads, offset = [], None
+    while True:
+        points, offset = client.scroll(collection_name=COLLECTION_NAME, limit=page_size, offset=offset,
+                                       with_payload=True, with_vectors=False)
+        payloads.extend(p.payload or {} for p in points)
+        if offset is None:
+            return payloads
+
+
+def lexical_index_path() -> Path:
+    return LEXICAL_INDEX_DIR / f"{VECTOR_BACKEND}_{COLLECTION_NAME}.npz"
+
+
+def build_lexical_index(save: bool = True) -> LexicalIndex:
+    """(Re)build the BM25 index from the collection; examples added later need a rebuild."""
+    global lexical_index
+    index = LexicalIndex.build(corpus_payloads())
+    if save:
+        index.save(lexical_index_path())
+    lexical_index = index
+    return index
+
+
+def _lexical() -> LexicalIndex:
+    global lexical_index
+    if lexical_index is None:
+        with _lexical_lock:
+            if lexical_index is None:
+                path = lexical_index_path()
+                if path.exists():
+                    lexical_index = LexicalIndex.load(path)
+                else:
+                    print(f"Warning: no lexical index at {path}, building it from '{COLLECTION_NAME}'")
+                    build_lexical_index()
+    return lexical_index
+
+
+def _lexical_search(queries: list[str], k: int, families: list[tuple]) -> list[list[dict]]:
+    """BM25 top-k per query, same-family first and topped up like the dense path."""
+    index = _lexical()
+    if any(families):
+        families = _scope(families, index.families)
+    with span("lexical.search", queries=len(queries), limit=k):
+        found = index.search(queries, k, families)
+    matched = [_parse_payloads([p for p, _ in hits]) for hits in found]
+    if RAG_RETRIEVAL == "lexical":
+        short = _short(matched, families, k)
+    else:
+        short = [i for i, (hits, fams) in enumerate(zip(matched, families)) if fams and len(hits) < k]
+    if short:
+        unfiltered = index.search([queries[i] for i in short], k)
+        for i, hits in zip(short, unfiltered):
+            matched[i] = _top_up(matched[i], _parse_payloads([p for p, _ in hits]), k)
+    return matched
+
+
+def rrf_fuse(dense: list[dict], lexical: list[dict], k: int) -> list[dict]:
+    """Reciprocal rank fusion of one query's dense and lexical hits."""
+    scores, records = {}, {}
+    for hits in (dense, lexical):
+        for rank, r in enumerate(hits):
+            key = r["raw_request"]
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RAG_RRF_K + rank + 1)
+            records.setdefault(key, r)
+    ranked = sorted(scores, key=lambda key: -scores[key])
+    return [records[key] for key in ranked[:k]]
+
+
+def vector_search_batch(queries: list[str], k: int = 3, deadline: float = None,
+                        attack_candidates: list = None) -> list[list[dict]]:
+    """
+    Top-k similar examples for every query: one embedding call for the cache
+    misses and one Qdrant batch query (or one in-process matrix multiply with
+    VECTOR_BACKEND=numpy), whatever the number of queries.
+    deadline: absolute request deadline (backends.deadline); raises
+    DeadlineExceeded if embedding + search cannot finish in time.
+    attack_candidates: per query, the rule engine's candidates (or None);
+    retrieval is then restricted to those attack families (attack_type
+    payload index), topped up from the whole collection when fewer than k match;
+    families the corpus does not store are ignored (see stored_families).
+    RAG_RETRIEVAL=lexical answers from the BM25 index alone (no embedding);
+    hybrid fuses both rankings.
+    """
+    if not queries:
+        return []
+    families = [_families(c) for c in (attack_candidates or [None] * len(queries))]
+    if RAG_RETRIEVAL == "lexical":
+        return _lexical_search(queries, k, families)
+    fetch = k * RAG_FUSION_FETCH if RAG_RETRIEVAL == "hybrid" else k
+    try:
+        if any(families):
+            families = _scope(families, stored_families())
+        embs = _get_embeddings(queries, timeout=timeout_for(deadline, HF_TIMEOUT, "embedding"))
+        if vector_index is not None:
+            results = _index_search(embs, fetch, families)
+        else:
+            _ensure_collection()
+            results = _query_batch(embs, fetch, families, deadline)
+            short = _short(results, families, fetch)
+            if short:
+                fallback = _query_batch([embs[i] for i in short], fetch, None, deadline)
+                for i, hits in zip(short, fallback):
+                    results[i] = _top_up(results[i], hits, fetch)
+    except _TIMEOUT_ERRORS as e:
+        raise DeadlineExceeded(f"retrieval timed out: {e}") from e
+    except UnexpectedResponse as e:
+        _forget_collection(e)
+        raise
+    if RAG_RETRIEVAL == "hybrid":
+        lexical = _lexical_search(queries, fetch, families)
+        results = [rrf_fuse(dense, lex, k) for dense, lex in zip(results, lexical)]
+    return results
+
+
+def vector_search(query: str, k: int = 3, deadline: float = None, attack_candidates: list = None):
+    """Top-k similar examples for query (see vector_search_batch)."""
+    return vector_search_batch([query], k, deadline, [attack_candidates])[0]
+
+
+async def _asearch_batch(items: list[tuple[str, int, tuple]], deadline: float = None) -> list[list[dict]]:
+    """One embedding call + one Qdrant batch query for (query, k, families) items."""
+    k_max = max(k for _, k, _ in items)
+    queries = [query for query, _, _ in items]
+    families = [fams for _, _, fams in items]
+    if RAG_RETRIEVAL == "lexical":
+        results = _lexical_search(queries, k_max, families)  # in-process, sub-millisecond
+        return [hits[:k] for hits, (_, k, _) in zip(results, items)]
+    fetch = k_max * RAG_FUSION_FETCH if RAG_RETRIEVAL == "hybrid" else k_max
+    try:
+        if any(families):
+            families = _scope(families, await astored_families())
+        embs = await _aget_embeddings(queries, timeout=timeout_for(deadline, HF_TIMEOUT, "embedding"))
+        if vector_index is not None:
+            results = _index_search(embs, fetch, families)
+        else:
+            await _aensure_collection()
+            results = await _aquery_batch(embs, fetch, families, deadline)
+            short = _short(results, families, fetch)
+            if short:
+                fallback = await _aquery_batch([embs[i] for i in short], fetch, None, deadline)
+                for i, hits in zip(short, fallback):
+                    results[i] = _top_up(results[i], hits, fetch)
+    except _TIMEOUT_ERRORS as e:
+        raise DeadlineExceeded(f"retrieval timed out: {e}") from e
+    except UnexpectedResponse as e:
+        _forget_collection(e)
+        raise
+    if RAG_RETRIEVAL == "hybrid":
+        lexical = _lexical_search(queries, fetch, families)
+        results = [rrf_fuse(dense, lex, k_max) for dense, lex in zip(results, lexical)]
+    return [hits[:k] for hits, (_, k, _) in zip(results, items)]
+
+
+# Concurrent /analyze requests share one embedding call + one Qdrant query
+_search_batcher = MicroBatcher(_asearch_batch, window=RAG_BATCH_WINDOW_MS / 1000.0, max_size=RAG_BATCH_MAX)
+
+
+async def avector_search_batch(queries: list[str], k: int = 3, deadline: float = None,
+                               attack_candidates: list = None) -> list[list[dict]]:
+    """Async variant of vector_search_batch, coalesced with other in-flight searches."""
+    families = [_families(c) for c in (attack_candidates or [None] * len(queries))]
+    left = remaining(deadline)
+    try:
+        return await asyncio.wait_for(
+            _search_batcher.submit([(query, k, fams) for query, fams in zip(queries, families)], deadline),
+            timeout=None if left is None else max(left, 0.0),
+        )
+    except asyncio.TimeoutError as e:
+        raise DeadlineExceeded("retrieval: request deadline exceeded") from e
+
+
+async def avector_search(query: str, k: int = 3, deadline: float = None, attack_candidates: list = None):
+    """Async variant of vector_search."""
+    return (await avector_search_batch([query], k, deadline, [attack_candidates]))[0]
+
+
+def rag_filter_stats() -> dict:
+    with _FILTER_LOCK:
+        return {"enabled": RAG_FILTER_BY_RULE, **_FILTER_STATS}
+
+
+def rag_batching_stats() -> dict:
+    return _search_batcher.stats()
+
+
+def vector_index_stats() -> dict:
+    stats = {"backend": VECTOR_BACKEND, "retrieval": RAG_RETRIEVAL}
+    if vector_index is not None:
+        stats.update(vector_index.stats())
+    if lexical_index is not None:
+        stats["lexical"] = lexical_index.stats()
+    return stats
+
+
+# =====================================================
+# Lifecycle (FastAPI lifespan in api.py; scripts rely on lazy init)
+# =====================================================
+
+async def astartup() -> None:
+    """Warm connections and check the collection once, before the first request."""
+    if vector_index is None:
+        try:
+            await _aensure_collection()
+            # The check above marks the collection ready for both clients: open
+            # the sync client's connection too (sync graph, lexical index build)
+            await asyncio.to_thread(_qdrant_breaker.call, client.collection_exists,
+                                    collection_name=COLLECTION_NAME)
+            if RAG_FILTER_BY_RULE:
+                await astored_families()
+        except Exception as e:
+            # Qdrant may still be starting (compose depends_on does not wait): retry lazily
+            print(f"Warning: Qdrant collection check failed at startup ({e}); will retry on first use")
+    if RAG_RETRIEVAL != "dense":
+        try:
+            await asyncio.to_thread(_lexical)
+        except Exception as e:
+            print(f"Warning: lexical index not ready at startup ({e}); will retry on first search")
+
+
+async def ashutdown() -> None:
+    """Close pooled connections and flush the embedding cache."""
+    await embedder.aclose()
+    await async_client.close()
+    client.close()
+    if embedding_cache is not None:
+        embedding_cache.flush()
+
+
 def rag_list_parser(results: list[dict]) -> str:
-    """Format RAG results for LLM context."""
-    if not results:
-        return ""
-    return "\n".join(
-        f"[{r['label'].upper()}] {r['attack_type']}: {r['raw_request']}"
-        for r in results
-    )
+    """Format RAG results for LLM context (compacted, token-budgeted - see backends.rag_context)."""
+    return build_rag_context(results)
@@ -0,0 +1,140 @@
+"""Compact RAG context for LLM prompts
+
+Stored neighbours are full HTTP requests (CSIC-style: request line, a dozen
+boilerplate headers, body). For the prompt only the parts an attacker controls
+matter, so each neighbour is reduced to its security-relevant segments,
+near-identical neighbours are merged, and the whole context is kept within a
+token budget.
+"""
+import os
+import re
+import threading
+
+RAG_CONTEXT_TOKEN_BUDGET = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "300"))
+RAG_SEGMENT_MAX_CHARS = int(os.getenv("RAG_SEGMENT_MAX_CHARS", "240"))
+# Char 3-gram Jaccard similarity above which two neighbours count as duplicates
+RAG_DEDUP_SIMILARITY = float(os.getenv("RAG_DEDUP_SIMILARITY", "0.9"))
+
+# Headers every client sends; kept only if they carry a clear attack indicator
+BOILERPLATE_HEADERS = {
+    "accept", "accept-charset", "accept-encoding", "accept-language", "cache-control",
+    "connection", "content-length", "content-type", "host", "pragma", "user-agent",
+}
+_HEADER = re.compile(r"^([A-Za-z0-9-]+):\s?(.*)$")
+_REQUEST_LINE = re.compile(r"^(GET|POST|PUT|DELETE|PATCH|HEAD|OPTIONS)\s", re.I)
+_SUSPICIOUS = re.compile(r"""['"<>;`$|{}]|\.\./|%[0-9a-f]{2}|--|\bor\b|\band\b""", re.I)
+_STRONG = re.compile(r"<script|\bunion\b|\bselect\b|\.\./|\$\{|'|%27|%3c|\bsleep\(|;\s*(ls|cat|wget|curl)\b", re.I)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 chars per token), same heuristic as llm_backend."""
+    return len(text) // 4 + 1
+
+
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def relevant_segments(raw_request: str) -> str:
+    """Request line + body + headers that carry attacker-controlled payloads."""
+    lines = raw_request.strip().splitlines()
+    if len(lines) <= 1:
+        return _clip(raw_request.strip(), RAG_SEGMENT_MAX_CHARS)
+
+    keep = []
+    for i, line in enumerate(lines):
+        line = line.strip()
+        if not line:
+            continue
+        if i == 0 or _REQUEST_LINE.match(line):
+            keep.append(line.rsplit(" HTTP/", 1)[0])  # method + path + query
+            continue
+        header = _HEADER.match(line)
+        if header:
+            name, value = header.group(1).lower(), header.group(2)
+            indicator = _STRONG if name in BOILERPLATE_HEADERS else _SUSPICIOUS
+            if indicator.search(value):
+                keep.append(line)
+            continue
+        keep.append(line)  # body / parameters
+
+    return " | ".join(_clip(seg, RAG_SEGMENT_MAX_CHARS) for seg in keep)
+
+
+def _shingles(text: str) -> set:
+    text = re.sub(r"\d+", "0", text.lower())
+    return {text[i:i + 3] for i in range(max(1, len(text) - 2))}
+
+
+def _similar(a: set, b: set) -> bool:
+    return len(a & b) / (len(a | b) or 1) >= RAG_DEDUP_SIMILARITY
+
+
+# =====================================================
+# Savings counters (exposed on /health)
+# =====================================================
+_STATS = {"contexts": 0, "raw_tokens": 0, "context_tokens": 0, "deduplicated": 0, "dropped": 0}
+_LOCK = threading.Lock()
+
+
+def context_stats() -> dict:
+    with _LOCK:
+        stats = dict(_STATS)
+    stats["tokens_saved"] = stats["raw_tokens"] - stats["context_tokens"]
+    stats["savings_ratio"] = round(stats["tokens_saved"] / stats["raw_tokens"], 3) if stats["raw_tokens"] else 0.0
+    return stats
+
+
+def _raw_context(results: list[dict]) -> str:
+    """The uncompacted format (full raw_request per neighbour), used as the savings baseline."""
+    return "\n".join(f"[{r['label'].upper()}] {r['attack_type']}: {r['raw_request']}" for r in results)
+
+
+def build_rag_context(results: list[dict], token_budget: int = None) -> str:
+    """
+    Format top-k neighbours for the LLM prompt: compacted segments,
+    near-duplicates merged ("xN"), at most token_budget tokens.
+    """
+    if not results:
+        return ""
+    token_budget = token_budget or RAG_CONTEXT_TOKEN_BUDGET
+
+    # Merge near-identical neighbours (same label / attack type, similar segments);
+    # a compacted corpus point already stands for member_count stored requests
+    groups = []  # [label, attack_type, segments, shingles, count]
+    deduplicated = 0
+    for r in results:
+        segments = relevant_segments(r["raw_request"])
+        shingles = _shingles(segments)
+        members = r.get("member_count", 1)
+        for g in groups:
+            if g[0] == r["label"] and g[1] == r["attack_type"] and _similar(g[3], shingles):
+                g[4] += members
+                deduplicated += 1
+                break
+        else:
+            groups.append([r["label"], r["attack_type"], segments, shingles, members])
+
+    # Fill the budget in rank order; the first neighbour is clipped rather than dropped
+    lines, used, dropped = [], 0, 0
+    for label, attack_type, segments, _, count in groups:
+        prefix = f"[{label.upper()}] {attack_type}" + (f" (x{count})" if count > 1 else "") + ": "
+        line = prefix + segments
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            if lines:
+                dropped += 1
+                continue
+            line = _clip(line, token_budget * 4)
+            cost = estimate_tokens(line)
+        lines.append(line)
+        used += cost
+
+    context = "\n".join(lines)
+    with _LOCK:
+        _STATS["contexts"] += 1
+        _STATS["raw_tokens"] += estimate_tokens(_raw_context(results))
+        _STATS["context_tokens"] += estimate_tokens(context)
+        _STATS["deduplicated"] += deduplicated
+        _STATS["dropped"] += dropped
+    return context
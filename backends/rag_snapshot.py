@@ -0,0 +1,269 @@
+"""RAG corpus snapshots: bring up a new environment without re-embedding the dataset
+
+An export (scripts/export_rag_snapshot.py) writes to RAG_SNAPSHOT_DIR:
+- the collection snapshot: a Qdrant snapshot file, or a tar of the numpy index directory
+- the lexical index file, when one was built
+- manifest.json: collection, backend, embedder, vector size, point count, corpus hash
+  (sha256 over the sorted payloads) and the snapshot's sha256
+
+On API startup (RAG_RESTORE_SNAPSHOT=1) an empty or missing collection is
+restored from the snapshot when the manifest matches the running
+configuration (same collection, backend, embedder and vector size): vectors
+from another embedder would be silently wrong. After a restore the point
+count and the corpus hash of the loaded payloads must match the manifest. A populated collection is
+never overwritten except by scripts/restore_rag_snapshot.py --force.
+With uvicorn --workers N every worker runs the startup hook: restores take a
+file lock and re-check the collection under it, so one worker restores and
+the others find it populated.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import time
+from pathlib import Path
+
+import requests
+
+import backends.rag_backend as rag
+from backends.file_lock import file_lock
+
+RAG_SNAPSHOT_DIR = Path(os.getenv("RAG_SNAPSHOT_DIR", str(Path(__file__).parent.parent / "data" / "rag_snapshot")))
+RAG_RESTORE_SNAPSHOT = os.getenv("RAG_RESTORE_SNAPSHOT", "1") == "1"
+# Qdrant snapshot download / upload (seconds); a full CSIC snapshot is ~100 MB
+SNAPSHOT_TRANSFER_TIMEOUT = float(os.getenv("SNAPSHOT_TRANSFER_TIMEOUT", "300"))
+
+MANIFEST_NAME = "manifest.json"
+_CHUNK = 1 << 20
+# Restore lock of the Qdrant backend (the numpy one sits next to its index directory)
+_QDRANT_RESTORE_LOCK = Path(__file__).parent.parent / "data" / "rag_restore.lock"
+
+
+def corpus_hash(payloads: list[dict]) -> str:
+    """Order-independent content hash of the examples."""
+    digest = hashlib.sha256()
+    for line in sorted(json.dumps(p, sort_keys=True) for p in payloads):
+        digest.update(line.encode())
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def current_identity() -> dict:
+    """What a snapshot must have been built with to be usable here."""
+    return {
+        "collection": rag.COLLECTION_NAME,
+        "backend": rag.VECTOR_BACKEND,
+        "embedder": rag.embedder.name,
+        "vector_size": rag.VECTOR_SIZE,
+    }
+
+
+def read_manifest(snapshot_dir: Path = RAG_SNAPSHOT_DIR):
+    path = Path(snapshot_dir) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def manifest_mismatch(manifest: dict) -> str:
+    """Why the snapshot cannot be restored here ('' when it can)."""
+    for key, expected in current_identity().items():
+        if manifest.get(key) != expected:
+            return f"{key} is '{manifest.get(key)}' in the snapshot, '{expected}' here"
+    return ""
+
+
+def collection_points() -> int:
+    """Points in the live collection (0 when it does not exist yet)."""
+    if rag.vector_index is not None:
+        rag.vector_index.refresh()
+        return rag.vector_index.count
+    if not rag.client.collection_exists(collection_name=rag.COLLECTION_NAME):
+        return 0
+    return rag.client.count(collection_name=rag.COLLECTION_NAME, exact=True).count
+
+
+# =====================================================
+# Export
+# =====================================================
+
+def _export_qdrant(out_dir: Path) -> Path:
+    description = rag.client.create_snapshot(collection_name=rag.COLLECTION_NAME)
+    target = out_dir / description.name
+    url = f"{rag.QDRANT_URL}/collections/{rag.COLLECTION_NAME}/snapshots/{description.name}"
+    try:
+        with requests.get(url, stream=True, timeout=SNAPSHOT_TRANSFER_TIMEOUT) as response:
+            response.raise_for_status()
+            with open(target, "wb") as f:
+                for chunk in response.iter_content(_CHUNK):
+                    f.write(chunk)
+    finally:
+        # The copy on the Qdrant server is not needed once downloaded
+        rag.client.delete_snapshot(collection_name=rag.COLLECTION_NAME, snapshot_name=description.name)
+    return target
+
+
+def _export_numpy(out_dir: Path) -> Path:
+    target = out_dir / f"{rag.COLLECTION_NAME}.numpy.tar"
+    with tarfile.open(target, "w") as tar:
+        for path in sorted(rag.vector_index.path.iterdir()):
+            if path.suffix != ".tmp":
+                tar.add(path, arcname=path.name)
+    return target
+
+
+def export_snapshot(out_dir: Path = RAG_SNAPSHOT_DIR) -> dict:
+    """Snapshot the seeded collection (+ lexical index) and write its manifest."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    payloads = rag.corpus_payloads()
+    if not payloads:
+        raise Exception(f"Collection '{rag.COLLECTION_NAME}' is empty - seed it before exporting")
+
+    previous = read_manifest(out_dir)
+    if previous:
+        # Only what the previous export wrote: out_dir may hold other files
+        for name in (previous.get("snapshot"), previous.get("lexical_index"), MANIFEST_NAME):
+            if name:
+                (out_dir / name).unlink(missing_ok=True)
+    snapshot = _export_numpy(out_dir) if rag.vector_index is not None else _export_qdrant(out_dir)
+
+    lexical = None
+    if rag.lexical_index_path().exists():
+        lexical = out_dir / rag.lexical_index_path().name
+        shutil.copyfile(rag.lexical_index_path(), lexical)
+
+    manifest = {
+        **current_identity(),
+        "profile": rag.QDRANT_PROFILE,
+        "points": len(payloads),
+        "corpus_hash": corpus_hash(payloads),
+        "snapshot": snapshot.name,
+        "sha256": _file_sha256(snapshot),
+        "lexical_index": lexical.name if lexical else None,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+    (out_dir / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+# =====================================================
+# Restore
+# =====================================================
+
+def _restore_qdrant(snapshot: Path, checksum: str) -> None:
+    url = f"{rag.QDRANT_URL}/collections/{rag.COLLECTION_NAME}/snapshots/upload"
+    with open(snapshot, "rb") as f:
+        response = requests.post(
+            url,
+            params={"priority": "snapshot", "checksum": checksum, "wait": "true"},
+            files={"snapshot": (snapshot.name, f)},
+            timeout=SNAPSHOT_TRANSFER_TIMEOUT,
+        )
+    if response.status_code >= 300:
+        raise Exception(f"Qdrant snapshot upload failed: HTTP {response.status_code} {response.text[:200]}")
+    rag._collection_ready = False  # re-check payload indexes on next use
+
+
+def _restore_numpy(snapshot: Path) -> None:
+    # The index path becomes a symlink to a versioned directory: extract the new
+    # version beside it, then repoint the link with ONE os.replace, so readers
+    # see the old index or the new one, never a missing or half-extracted one
+    index_dir = rag.vector_index.path
+    version = index_dir.with_name(f"{index_dir.name}.v{time.time_ns()}")
+    with tarfile.open(snapshot) as tar:
+        tar.extractall(version, filter="data")
+    previous = index_dir.resolve() if index_dir.is_symlink() else None
+
+    link = index_dir.with_name(f"{index_dir.name}.link-{os.getpid()}")
+    link.unlink(missing_ok=True)
+    os.symlink(version.name, link, target_is_directory=True)
+    if index_dir.exists() and not index_dir.is_symlink():
+        # First restore over the plain directory NumpyIndex creates: it has to
+        # move aside first; readers keep the index they loaded (refresh skips a
+        # missing meta.json) until the link appears
+        retired = index_dir.with_name(f"{index_dir.name}.old-{os.getpid()}")
+        os.replace(index_dir, retired)
+        os.replace(link, index_dir)
+        shutil.rmtree(retired, ignore_errors=True)
+    else:
+        os.replace(link, index_dir)
+    if previous is not None:
+        shutil.rmtree(previous, ignore_errors=True)  # open memmaps of it stay valid
+    rag.vector_index.refresh()
+
+
+def _restore_lock_path() -> Path:
+    if rag.vector_index is not None:
+        return rag.vector_index.path.with_name(f"{rag.vector_index.path.name}.restore.lock")
+    return _QDRANT_RESTORE_LOCK
+
+
+def restore_snapshot(snapshot_dir: Path = RAG_SNAPSHOT_DIR, force: bool = False) -> bool:
+    """
+    Load the snapshot into an empty collection. Returns True if restored,
+    False if skipped (no snapshot, manifest mismatch, collection already
+    populated and not force). Raises on a corrupt snapshot or a failed load.
+    """
+    snapshot_dir = Path(snapshot_dir)
+    manifest = read_manifest(snapshot_dir)
+    if manifest is None:
+        return False
+    reason = manifest_mismatch(manifest)
+    if reason:
+        print(f"Warning: RAG snapshot in {snapshot_dir} not restored: {reason}")
+        return False
+    if collection_points() and not force:
+        return False
+
+    # Workers starting together: one restores, the others wait and then see
+    # a populated collection
+    with file_lock(_restore_lock_path()):
+        if collection_points() and not force:
+            return False
+
+        started = time.perf_counter()
+        snapshot = snapshot_dir / manifest["snapshot"]
+        if _file_sha256(snapshot) != manifest["sha256"]:
+            raise Exception(f"RAG snapshot {snapshot} does not match its manifest checksum (incomplete copy?)")
+        if rag.vector_index is not None:
+            _restore_numpy(snapshot)
+        else:
+            _restore_qdrant(snapshot, manifest["sha256"])
+
+        if manifest.get("lexical_index"):
+            target = rag.lexical_index_path()
+            target.parent.mkdir(parents=True, exist_ok=True)
+            staged = target.with_name(f"{target.name}.restore-{os.getpid()}")
+            shutil.copyfile(snapshot_dir / manifest["lexical_index"], staged)
+            os.replace(staged, target)
+            rag.lexical_index = None  # reloaded on first lexical search
+
+        restored = collection_points()
+    if restored != manifest["points"]:
+        raise Exception(f"RAG snapshot restore incomplete: {restored} points, manifest has {manifest['points']}")
+    if corpus_hash(rag.corpus_payloads()) != manifest["corpus_hash"]:
+        raise Exception("RAG snapshot restore does not match the manifest's corpus hash (different examples)")
+    print(f"✅ Restored {restored} RAG examples into '{rag.COLLECTION_NAME}' "
+          f"from {snapshot.name} in {time.perf_counter() - started:.1f}s")
+    return True
+
+
+async def arestore_on_startup() -> None:
+    """API startup hook: restore an empty collection, never fail the boot."""
+    if not RAG_RESTORE_SNAPSHOT:
+        return
+    try:
+        await asyncio.to_thread(restore_snapshot)
+    except Exception as e:
+        print(f"Warning: RAG snapshot restore failed at startup ({e}); seed or restore manually")
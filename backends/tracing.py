@@ -0,0 +1,326 @@
+"""Per-request span tracing of the pipeline (nodes and backend calls)
+
+A request is traced when it asks for it ({"debug": true} in the /analyze
+payload: timings come back in result_json["debug"]) or when TRACE_EXPORTER is
+set (every request is exported):
+- console: one indented span tree per request on stdout (local runs)
+- otel:    spans replayed into the OpenTelemetry API (opentelemetry-api); the
+           host's SDK setup is used, else an OTLP/HTTP exporter when
+           opentelemetry-sdk + opentelemetry-exporter-otlp are installed
+           (OTEL_EXPORTER_OTLP_ENDPOINT, ...)
+
+decode_node starts the trace and keeps it in the graph state; every node is
+wrapped in a "node" span (traced_node) and backend calls open "call" spans
+(embedding, qdrant.search, llm.complete, cache.persist, ...) under it. Untraced
+requests pay one context-variable lookup per span.
+"""
+import contextvars
+import functools
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Optional
+
+# none | console | otel
+TRACE_EXPORTER = os.getenv("TRACE_EXPORTER", "none").lower()
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "soc-analysis")
+
+# Sink of the running task / thread: a Trace, or a _Shared one for coalesced batches
+_TRACE: contextvars.ContextVar = contextvars.ContextVar("soc_trace", default=None)
+_PARENT: contextvars.ContextVar = contextvars.ContextVar("soc_span_parent", default=None)
+
+
+class Trace:
+    """Spans of one request; timestamps are perf_counter seconds."""
+
+    def __init__(self):
+        self.trace_id = secrets.token_hex(16)
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans: list[dict] = []
+        self._lock = threading.Lock()  # spans arrive from worker threads too
+
+    def record(self, span: dict) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self) -> None:
+        self.end = time.perf_counter()
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.perf_counter()) - self.start) * 1000
+
+    def epoch_ns(self, perf: float) -> int:
+        """Wall-clock time (ns since epoch) of a perf_counter timestamp."""
+        return int((self.started_at + perf - self.start) * 1e9)
+
+    def summary(self, items: list = None) -> dict:
+        """The debug section of result_json: span list plus per-item stage totals."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        out = {
+            "trace_id": self.trace_id,
+            "total_ms": round(self.duration_ms, 2),
+            "spans": [
+                {
+                    "name": s["name"],
+                    "kind": s["kind"],
+                    "span_id": s["span_id"],
+                    "parent_id": s["parent_id"],
+                    "start_ms": round((s["start"] - self.start) * 1000, 2),
+                    "duration_ms": round(s["duration_ms"], 2),
+                    "attributes": s["attributes"],
+                    **({"error": s["error"]} if s.get("error") else {}),
+                }
+                for s in spans
+            ],
+        }
+        if items:
+            # A batched call counts in full for every item it served; spans
+            # without item_ids serve what their parent serves (default: all)
+            served = {}
+            for s in spans:
+                served[s["span_id"]] = s["attributes"].get("item_ids", served.get(s["parent_id"]))
+            per_item = []
+            for index, item in enumerate(items):
+                stages = {}
+                for s in spans:
+                    ids = served[s["span_id"]]
+                    if ids is None or item.get("id") in ids:
+                        stages[s["name"]] = round(stages.get(s["name"], 0.0) + s["duration_ms"], 2)
+                per_item.append({"index": index, "id": item.get("id"), "stages_ms": stages})
+            out["items"] = per_item
+        return out
+
+
+class _Shared:
+    """Sink of a coalesced batch: every caller's trace gets a copy of each span."""
+
+    def __init__(self, callers: list[tuple]):
+        self.callers = callers  # (trace, parent span id at submit time)
+
+    def record(self, span: dict) -> None:
+        for trace, parent in self.callers:
+            trace.record({
+                **span,
+                "parent_id": span["parent_id"] or parent,
+                "attributes": {**span["attributes"], "coalesced": len(self.callers)},
+            })
+
+
+# =====================================================
+# Spans
+# =====================================================
+
+@contextmanager
+def span(name: str, kind: str = "call", **attributes):
+    """Time the block as a child of the current span (no-op outside a traced request)."""
+    sink = _TRACE.get()
+    if sink is None:
+        yield None
+        return
+    record = {
+        "span_id": secrets.token_hex(8),
+        "parent_id": _PARENT.get(),
+        "name": name,
+        "kind": kind,
+        "attributes": {k: v for k, v in attributes.items() if v is not None},
+        "start": time.perf_counter(),
+    }
+    token = _PARENT.set(record["span_id"])
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = f"{type(e).__name__}: {e}"[:200]
+        raise
+    finally:
+        record["duration_ms"] = (time.perf_counter() - record["start"]) * 1000
+        _PARENT.reset(token)
+        sink.record(record)
+
+
+@contextmanager
+def activate(trace: Optional[Trace]):
+    """Make trace the sink of spans opened in this block (and in tasks / copied contexts it starts)."""
+    token = _TRACE.set(trace)
+    try:
+        yield trace
+    finally:
+        _TRACE.reset(token)
+
+
+def caller() -> Optional[tuple]:
+    """(trace, current span id) to hand a coalesced batch, or None when untraced."""
+    sink = _TRACE.get()
+    if isinstance(sink, Trace):
+        return sink, _PARENT.get()
+    return None
+
+
+@contextmanager
+def shared(callers: list[tuple]):
+    """Record the block's spans into every caller's trace (MicroBatcher batches)."""
+    trace_token = _TRACE.set(_Shared(callers) if callers else None)
+    parent_token = _PARENT.set(None)
+    try:
+        yield
+    finally:
+        _PARENT.reset(parent_token)
+        _TRACE.reset(trace_token)
+
+
+def traced_node(name: str, fn: Callable[[dict], Any]) -> Callable[[dict], Any]:
+    """
+    Wrap a graph node: one "node" span per call when the state carries a trace.
+    A node that raises ends the request before the response node, so the
+    trace is closed and exported here.
+    """
+    @functools.wraps(fn)
+    def node(state):
+        trace = state.get("trace")
+        if trace is None:
+            return fn(state)
+        try:
+            with activate(trace), span(name, kind="node", items=len(state.get("items") or [])):
+                return fn(state)
+        except BaseException:
+            end_trace(trace)
+            raise
+    return node
+
+
+def atraced_node(name: str, afn: Callable[[dict], Awaitable[Any]]) -> Callable[[dict], Awaitable[Any]]:
+    """Async variant of traced_node."""
+    @functools.wraps(afn)
+    async def node(state):
+        trace = state.get("trace")
+        if trace is None:
+            return await afn(state)
+        try:
+            with activate(trace), span(name, kind="node", items=len(state.get("items") or [])):
+                return await afn(state)
+        except BaseException:
+            end_trace(trace)
+            raise
+    return node
+
+
+# =====================================================
+# Exporters
+# =====================================================
+
+class ConsoleExporter:
+    """One indented span tree per request on stdout."""
+
+    def export(self, trace: Trace) -> None:
+        children: dict = {}
+        for s in sorted(trace.spans, key=lambda s: s["start"]):
+            children.setdefault(s["parent_id"], []).append(s)
+        lines = [f"[trace {trace.trace_id[:12]}] {trace.duration_ms:.1f} ms"]
+
+        def walk(parent, depth):
+            for s in children.get(parent, []):
+                attrs = " ".join(f"{k}={v}" for k, v in s["attributes"].items() if k != "item_ids")
+                error = f" ERROR {s['error']}" if s.get("error") else ""
+                lines.append(f"{'  ' * depth}{s['name']:<{max(1, 24 - 2 * depth)}} "
+                             f"{s['duration_ms']:8.1f} ms  {attrs}{error}".rstrip())
+                walk(s["span_id"], depth + 1)
+
+        walk(None, 1)
+        print("\n".join(lines))
+
+
+def _otel_value(value):
+    if isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, (list, tuple)) and all(isinstance(v, (str, bool, int, float)) for v in value):
+        return list(value)
+    return str(value)
+
+
+class OTelExporter:
+    """Replay finished traces into the OpenTelemetry API with their original timestamps."""
+
+    def __init__(self):
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.trace import Status, StatusCode
+
+        self._otel = otel_trace
+        self._error = lambda message: Status(StatusCode.ERROR, message)
+        provider = otel_trace.get_tracer_provider()
+        if not hasattr(provider, "add_span_processor"):  # the host configured no SDK
+            try:
+                from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+                from opentelemetry.sdk.resources import Resource
+                from opentelemetry.sdk.trace import TracerProvider
+                from opentelemetry.sdk.trace.export import BatchSpanProcessor
+            except ImportError:
+                print("Warning: TRACE_EXPORTER=otel without opentelemetry-sdk / opentelemetry-exporter-otlp "
+                      "and no provider configured: spans go to the no-op tracer")
+            else:
+                provider = TracerProvider(resource=Resource.create({"service.name": TRACE_SERVICE_NAME}))
+                provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+                otel_trace.set_tracer_provider(provider)
+        self._tracer = otel_trace.get_tracer(TRACE_SERVICE_NAME)
+
+    def export(self, trace: Trace) -> None:
+        root = self._tracer.start_span(
+            "soc.analyze", start_time=trace.epoch_ns(trace.start), attributes={"soc.trace_id": trace.trace_id},
+        )
+        opened = {}
+        # Parents start before their children
+        for s in sorted(trace.spans, key=lambda s: s["start"]):
+            parent = opened.get(s["parent_id"], root)
+            otel_span = self._tracer.start_span(
+                s["name"],
+                context=self._otel.set_span_in_context(parent),
+                start_time=trace.epoch_ns(s["start"]),
+                attributes={"soc.kind": s["kind"], **{f"soc.{k}": _otel_value(v) for k, v in s["attributes"].items()}},
+            )
+            if s.get("error"):
+                otel_span.set_status(self._error(s["error"]))
+            otel_span.end(end_time=trace.epoch_ns(s["start"] + s["duration_ms"] / 1000))
+            opened[s["span_id"]] = otel_span
+        root.end(end_time=trace.epoch_ns(trace.end or time.perf_counter()))
+
+
+def _make_exporter(name: str):
+    if name in ("", "none"):
+        return None
+    if name == "console":
+        return ConsoleExporter()
+    if name == "otel":
+        try:
+            return OTelExporter()
+        except ImportError:
+            print("Warning: TRACE_EXPORTER=otel needs opentelemetry-api (pip install opentelemetry-api); tracing export off")
+            return None
+    print(f"Warning: unknown TRACE_EXPORTER '{name}' (none | console | otel); tracing export off")
+    return None
+
+
+exporter = _make_exporter(TRACE_EXPORTER)
+
+
+def start_trace(debug: bool = False) -> Optional[Trace]:
+    """A new request trace if it is wanted (debug section or an exporter), else None."""
+    if debug or exporter is not None:
+        return Trace()
+    return None
+
+
+def end_trace(trace: Trace) -> None:
+    """Close the trace and hand it to the exporter, once (export errors never fail the request)."""
+    if trace.end is not None:
+        return
+    trace.finish()
+    if exporter is None:
+        return
+    try:
+        exporter.export(trace)
+    except Exception as e:
+        print(f"Warning: trace export failed: {e}")
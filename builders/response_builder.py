@@ -70,6 +70,8 @@ def response_builder(state: SOCState) -> dict:
         used_llm = item["llm_output"] is not None and item["llm_output"].get("model")
         route = "slow" if used_llm else "fast"
         source = "llm_explainer" if used_llm else "rule_engine"
+        if used_llm == "local-classifier":
+            source = "local_classifier"
         
         # Determine event type
         if item["blocked"]:
@@ -118,6 +120,8 @@ def response_builder(state: SOCState) -> dict:
             "learning_note": get_learning_note(attack_type, item["severity"]),
             "hallucination_suspected": False,
             "hallucination_reasons": [],
+            "degraded": bool(item.get("degraded")),
+            "degraded_reason": item.get("degraded_reason", ""),
             "generated_at": datetime.now(timezone.utc).isoformat()
         }
         
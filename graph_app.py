@@ -1,37 +1,83 @@
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END, START
 from soc_state import SOCState
 from backends.batch_decoder import batch_decoder
-from nodes.nodes_cache import cache_check_node, cache_save_node
+from backends.deadline import make_deadline
+from backends.tracing import activate, atraced_node, end_trace, span, start_trace, traced_node
+from nodes.nodes_cache import cache_check_node, cache_save_node, acache_save_node
 from nodes.nodes_rule import rule_engine_node
+from nodes.nodes_rag import rag_node, arag_node
 from nodes.nodes_router import router_node
-from nodes.nodes_llm import llm_node
+from nodes.nodes_local import local_classifier_node
+from nodes.nodes_policy import llm_policy_node
+from nodes.nodes_llm import llm_node, allm_node
 from nodes.nodes_response import response_node
 
 graph = StateGraph(SOCState)
 
+
+def decode_node(data: SOCState) -> dict:
+    """
+    Decode the batch and start its latency budget (payload "deadline_ms" or
+    default) and its trace (payload "debug": true, or TRACE_EXPORTER set).
+    """
+    trace = start_trace(bool(data.get("debug")))
+    try:
+        with activate(trace), span("decode", kind="node", items=len(data.get("requests") or [])):
+            decoded = batch_decoder(data.get("requests", []))
+    except BaseException:
+        if trace is not None:
+            end_trace(trace)
+        raise
+    decoded["deadline"] = make_deadline(data.get("deadline_ms"))
+    decoded["trace"] = trace
+    return decoded
+
+
+_traced_response = traced_node("response", response_node)
+
+
+def respond_node(state: SOCState) -> dict:
+    """Build result_json, then close the trace: exported, and attached as result_json["debug"] on request."""
+    result = _traced_response(state)
+    trace = state.get("trace")
+    if trace is not None:
+        end_trace(trace)
+        if state.get("debug"):
+            result["result_json"]["debug"] = trace.summary(state.get("items"))
+    return {**result, "trace": None}
+
+
 # Nodes
-graph.add_node("decode", lambda data: batch_decoder(data.get("requests", [])))
-graph.add_node("cache", cache_check_node)        # Early cache check
-graph.add_node("rule", rule_engine_node)
-graph.add_node("router", router_node)
-graph.add_node("llm", llm_node)
-graph.add_node("cache_save", cache_save_node)
-graph.add_node("response", response_node)
+# I/O-bound nodes carry a sync and an async implementation:
+# soc_app.invoke() (scripts) uses the sync one, soc_app.ainvoke() (API) the async one.
+# traced_node: one timing span per node when the request is traced.
+graph.add_node("decode", decode_node)
+graph.add_node("cache", traced_node("cache", cache_check_node))         # Early cache check (in-memory)
+graph.add_node("rule", traced_node("rule", rule_engine_node))
+graph.add_node("rag", RunnableLambda(traced_node("rag", rag_node), afunc=atraced_node("rag", arag_node)))
+graph.add_node("router", traced_node("router", router_node))
+graph.add_node("local", traced_node("local", local_classifier_node))    # Distilled model, no I/O
+graph.add_node("policy", traced_node("policy", llm_policy_node))        # LLM budget / sampling
+graph.add_node("llm", RunnableLambda(traced_node("llm", llm_node), afunc=atraced_node("llm", allm_node)))
+graph.add_node("cache_save", RunnableLambda(traced_node("cache_save", cache_save_node),
+                                            afunc=atraced_node("cache_save", acache_save_node)))
+graph.add_node("response", respond_node)
 
 # Routing functions
 def route_cache_hit(state: SOCState) -> str:
-    """If cache hit, skip all analysis. If miss, go to rule engine."""
+    """If cache hit, skip the rule engine (only fetch RAG context). If miss, go to rule engine."""
     if state.get("items") and all(item.get("cache_hit") for item in state["items"]):
-        return "cache_hit"  # All cached, go to response
+        return "cache_hit"  # All cached, skip analysis
     return "cache_miss"    # Not cached, do analysis
 
 def route_after_rule(state: SOCState) -> str:
-    """After rule: fast path (blocked) or slow path (needs LLM)."""
-    if state.get("items") and all(item.get("blocked") for item in state["items"]):
+    """After rule: fast path (blocked or cached) or slow path (needs LLM)."""
+    if state.get("items") and all(item.get("blocked") or item.get("cache_hit") for item in state["items"]):
         return "fast"
     return "slow"
 
-# Flow: decode → cache_check → {hit: response} | {miss: rule → router → {fast|slow}}
+# Flow: decode → cache_check → {hit: rag} | {miss: rule → rag} → router → {fast: cache_save | slow: local → policy → llm}
 graph.set_entry_point("decode")
 graph.add_edge("decode", "cache")
 
@@ -39,23 +85,36 @@ graph.add_conditional_edges(
     "cache",
     route_cache_hit,
     {
-        "cache_hit": "cache_save",      # Cached, save & response
+        "cache_hit": "rag",             # Cached verdicts, fresh RAG context only
         "cache_miss": "rule",            # Not cached, analyze
     },
 )
 
-graph.add_edge("rule", "router")
+graph.add_edge("rule", "rag")
+graph.add_edge("rag", "router")
 graph.add_conditional_edges(
     "router",
     route_after_rule,
     {
-        "fast": "cache_save",            # Blocked, save & response
-        "slow": "llm",                   # Needs LLM analysis
+        "fast": "cache_save",            # Blocked / cached, save & response
+        "slow": "local",                 # Needs analysis: local model first
     },
 )
 
+graph.add_edge("local", "policy")             # Only items local could not answer...
+graph.add_edge("policy", "llm")               # ...and the policy admitted reach Groq
+
 graph.add_edge("llm", "cache_save")
 graph.add_edge("cache_save", "response")
 graph.add_edge("response", END)
 
 soc_app = graph.compile()
+
+# Request options and per-request internals (absolute deadline, live trace):
+# not part of the /analyze response, which keeps its pre-deadline shape
+INTERNAL_STATE_KEYS = ("deadline_ms", "deadline", "debug", "trace")
+
+
+def public_state(state: dict) -> dict:
+    """The graph's final state without INTERNAL_STATE_KEYS."""
+    return {key: value for key, value in state.items() if key not in INTERNAL_STATE_KEYS}
@@ -1,7 +1,31 @@
 """Cache checking and saving nodes"""
+import asyncio
+
 from soc_state import SOCState
 from backends.cache_backend import cache_get, cache_set
-from backends.rag_backend import vector_search, rag_list_parser
+
+
+def _apply_cache_lookup(item) -> None:
+    """Check cache for one item and restore cached analysis on HIT."""
+    cached_data = cache_get(item["raw_request"])
+
+    if cached_data:
+        # Cache HIT - restore cached analysis (a verdict: rag_node never degrades it)
+        item["cache_hit"] = True
+        item["degraded"] = False
+        item["degraded_reason"] = ""
+        item["attack_type"] = cached_data.get("attack_type")
+        item["rule_score"] = cached_data.get("rule_score")
+        item["severity"] = cached_data.get("severity")
+        item["fast_decision"] = cached_data.get("fast_decision")
+        item["evidence"] = cached_data.get("evidence")
+        item["attack_candidates"] = cached_data.get("attack_candidates")
+        item["blocked"] = cached_data.get("blocked")
+        item["final_msg"] = cached_data.get("final_msg")
+        item["llm_output"] = cached_data.get("llm_output")
+    else:
+        # Cache MISS - mark for analysis
+        item["cache_hit"] = False
 
 
 def cache_check_node(state: SOCState) -> dict:
@@ -9,34 +33,12 @@ def cache_check_node(state: SOCState) -> dict:
     Check if request results are already cached.
     If cached, populate cache_hit=True and copy cached analysis.
     If not cached, set cache_hit=False and continue to rule engine.
-    Always populate RAG context from vector search.
+    RAG context is not cached: rag_node retrieves it fresh for every item.
     """
     for item in state.get("items", []):
-        raw_request = item["raw_request"]
-        
-        # Always load RAG context - it's not cached, it's fresh vector search results
-        search_results = vector_search(raw_request)
-        item["rag_context"] = rag_list_parser(search_results)
-        
         # Check cache using backend
-        cached_data = cache_get(raw_request)
-        
-        if cached_data:
-            # Cache HIT - restore cached analysis
-            item["cache_hit"] = True
-            item["attack_type"] = cached_data.get("attack_type")
-            item["rule_score"] = cached_data.get("rule_score")
-            item["severity"] = cached_data.get("severity")
-            item["fast_decision"] = cached_data.get("fast_decision")
-            item["evidence"] = cached_data.get("evidence")
-            item["attack_candidates"] = cached_data.get("attack_candidates")
-            item["blocked"] = cached_data.get("blocked")
-            item["final_msg"] = cached_data.get("final_msg")
-            item["llm_output"] = cached_data.get("llm_output")
-        else:
-            # Cache MISS - mark for analysis
-            item["cache_hit"] = False
-    
+        _apply_cache_lookup(item)
+
     return state
 
 
@@ -47,11 +49,17 @@ def cache_save_node(state: SOCState) -> dict:
     """
     for item in state.get("items", []):
         raw_request = item["raw_request"]
-        
+
+        # Never cache a degraded slow-path verdict (LLM error / deadline fallback);
+        # rule-engine blocks do not depend on retrieval or the LLM
+        if item.get("degraded") and not item.get("blocked"):
+            continue
+
         # Check if already exists in cache
         if not cache_get(raw_request):
             # Build cache data
             cache_data = {
+                "raw_request": raw_request,      # training input for the local classifier
                 "attack_type": item.get("attack_type"),
                 "rule_score": item.get("rule_score"),
                 "severity": item.get("severity"),
@@ -62,8 +70,13 @@ def cache_save_node(state: SOCState) -> dict:
                 "final_msg": item.get("final_msg"),
                 "llm_output": item.get("llm_output"),
             }
-            
+
             # Save to cache backend
             cache_set(raw_request, cache_data)
-    
+
     return state
+
+
+async def acache_save_node(state: SOCState) -> dict:
+    """Async variant of cache_save_node - disk writes run off the event loop."""
+    return await asyncio.to_thread(cache_save_node, state)
@@ -0,0 +1,19 @@
+"""Rule-engine fallback for items the slow path could not finish"""
+
+
+def mark_degraded(item, reason: str) -> None:
+    """Flag an item whose analysis skipped or lost a slow-path stage."""
+    item["degraded"] = True
+    if reason not in (item.get("degraded_reason") or ""):
+        item["degraded_reason"] = "; ".join(filter(None, [item.get("degraded_reason"), reason]))
+
+
+def apply_rule_fallback(item, reason: str) -> None:
+    """Answer with the rule-engine verdict instead of the LLM (degraded)."""
+    mark_degraded(item, reason)
+    item["final_msg"] = (
+        f"[RULE] {item['attack_type']} | "
+        f"Score={item['rule_score']} | "
+        f"Severity={item['severity']} | "
+        f"Degraded: {reason}"
+    )
@@ -1,25 +1,68 @@
 from soc_state import SOCState
-from backends.llm_backend import llm_analyze
+from backends.llm_backend import llm_analyze_batch, allm_analyze_batch
+from backends.llm_scheduler import item_priority
+from nodes.nodes_fallback import apply_rule_fallback
+
+
+def _needs_llm(item) -> bool:
+    if item["blocked"]:
+        return False
+
+    if item["cache_hit"]:
+        return False
+
+    # Chỉ LLM cho item chưa có final_msg
+    if item["final_msg"]:
+        return False
+
+    return True
+
+
+def _pending(state: SOCState) -> tuple[list, list[dict]]:
+    items = [item for item in state["items"] if _needs_llm(item)]
+    entries = [
+        {
+            "id": item.get("id"),
+            "query": item["raw_request"],
+            "rag_context": item["rag_context"],
+            "priority": item_priority(item),
+        }
+        for item in items
+    ]
+    return items, entries
+
+
+def _apply_result(item, result: dict) -> None:
+    item["llm_output"] = result
+
+    if result.get("error"):
+        # LLM failed or ran out of budget for this item only - keep the rule-engine verdict
+        apply_rule_fallback(item, result["error"])
+        return
+
+    item["final_msg"] = result["analysis"]
 
 
 def llm_node(state: SOCState) -> SOCState:
-    for item in state["items"]:
-        if item["blocked"]:
-            continue
+    items, entries = _pending(state)
+    if not items:
+        return state
+
+    # One concurrent fan-out per batch; results come back in item order
+    for item, result in zip(items, llm_analyze_batch(entries, deadline=state.get("deadline"))):
+        _apply_result(item, result)
 
-        if item["cache_hit"]:
-            continue
+    return state
 
-        # Chỉ LLM cho item chưa có final_msg
-        if item["final_msg"]:
-            continue
 
-        result = llm_analyze(
-            query=item["raw_request"],
-            rag_context=item["rag_context"]
-        )
+async def allm_node(state: SOCState) -> SOCState:
+    """Async variant of llm_node for soc_app.ainvoke."""
+    items, entries = _pending(state)
+    if not items:
+        return state
 
-        item["llm_output"] = result
-        item["final_msg"] = result["analysis"]
+    results = await allm_analyze_batch(entries, deadline=state.get("deadline"))
+    for item, result in zip(items, results):
+        _apply_result(item, result)
 
     return state
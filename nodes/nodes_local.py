@@ -0,0 +1,26 @@
+"""Local classifier node: answers confident REVIEW items before the LLM"""
+from soc_state import SOCState
+from backends.local_classifier import classify, in_scope
+from nodes.nodes_llm import _needs_llm
+
+
+def local_classifier_node(state: SOCState) -> SOCState:
+    """
+    REVIEW items the distilled model is sure about get their verdict here;
+    the rest keep an empty final_msg and go on to llm_node.
+    """
+    for item in state["items"]:
+        if not _needs_llm(item) or not in_scope(item):
+            continue
+
+        result = classify(item["raw_request"], {
+            "attack_candidates": item.get("attack_candidates"),
+            "rule_score": item.get("rule_score"),
+        })
+        if result is None:
+            continue
+
+        item["llm_output"] = result
+        item["final_msg"] = result["analysis"]
+
+    return state
@@ -0,0 +1,19 @@
+"""LLM escalation policy node: caps and samples what reaches llm_node"""
+from soc_state import SOCState
+import backends.llm_policy as llm_policy
+from nodes.nodes_fallback import apply_rule_fallback
+from nodes.nodes_llm import _needs_llm
+
+
+def llm_policy_node(state: SOCState) -> SOCState:
+    """Items the policy does not admit keep the rule verdict and skip the LLM."""
+    items = [item for item in state["items"] if _needs_llm(item)]
+    if not items:
+        return state
+
+    # Looked up per call: offline jobs (scripts/warm_verdict_cache.py) install their own policy
+    for item, reason in llm_policy.policy.admit(items):
+        if reason:
+            apply_rule_fallback(item, reason)
+
+    return state
@@ -0,0 +1,55 @@
+"""RAG retrieval node: similar stored requests for every item, scoped by the rule engine"""
+from soc_state import SOCState
+from backends.rag_backend import vector_search_batch, avector_search_batch, rag_list_parser
+from nodes.nodes_fallback import mark_degraded
+
+
+def _apply_results(items, search_results) -> None:
+    for item, results in zip(items, search_results):
+        item["rag_context"] = rag_list_parser(results)
+
+
+def _retrieval_failed(items, e: Exception) -> None:
+    # Cached verdicts do not depend on retrieval; everything else goes on without context
+    for item in items:
+        item["rag_context"] = ""
+        if not item.get("cache_hit"):
+            mark_degraded(item, f"retrieval unavailable: {e}")
+
+
+def rag_node(state: SOCState) -> dict:
+    """
+    Populate rag_context for the whole batch with one batched search.
+    Runs after the rule engine, so each item's search is restricted to its
+    attack_candidates families (e.g. only SQL Injection examples).
+    If retrieval fails (deadline, Qdrant / embedding outage, open circuit
+    breaker), the items go on without RAG context and are flagged degraded.
+    """
+    items = state.get("items", [])
+    try:
+        search_results = vector_search_batch(
+            [item["raw_request"] for item in items],
+            deadline=state.get("deadline"),
+            attack_candidates=[item.get("attack_candidates") for item in items],
+        )
+    except Exception as e:
+        _retrieval_failed(items, e)
+    else:
+        _apply_results(items, search_results)
+    return state
+
+
+async def arag_node(state: SOCState) -> dict:
+    """Async variant of rag_node - the batch search is coalesced with concurrent requests."""
+    items = state.get("items", [])
+    try:
+        search_results = await avector_search_batch(
+            [item["raw_request"] for item in items],
+            deadline=state.get("deadline"),
+            attack_candidates=[item.get("attack_candidates") for item in items],
+        )
+    except Exception as e:
+        _retrieval_failed(items, e)
+    else:
+        _apply_results(items, search_results)
+    return state
@@ -3,6 +3,8 @@ from soc_state import SOCState
 
 def router_node(state: SOCState) -> SOCState:
     for item in state["items"]:
+        if item["cache_hit"]:
+            continue  # cached verdict and message
         if item["blocked"]:
             # BLOCK sớm – giống BlockerNode
             item["final_msg"] = (
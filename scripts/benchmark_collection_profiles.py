@@ -0,0 +1,133 @@
+"""
+Compare Qdrant collection profiles (backends/qdrant_profiles.py) on the seeded corpus.
+
+Copies up to --limit points of the seeded collection into one scratch
+collection per profile, then reports for each profile:
+- estimated RAM for vectors + HNSW links (Qdrant has no per-collection RAM metric)
+- p50 / p99 latency of single top-k queries
+- recall@k against exact (brute-force, unquantized) search
+
+The last --queries points are held out and used as queries. Scratch
+collections are dropped afterwards unless --keep is given.
+
+Usage:
+    python scripts/benchmark_collection_profiles.py [--limit 20000] [--queries 200] [--k 3]
+                                                    [--profiles memory,int8,binary,on_disk]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from qdrant_client.http import models as qmodels
+
+from backends.qdrant_profiles import PROFILES, collection_config, estimate_ram_bytes, search_params
+from backends.rag_backend import COLLECTION_NAME, VECTOR_SIZE, client
+
+REPORT_PATH = Path(__file__).parent.parent / "artifacts" / "collection_profiles_report.json"
+INDEX_WAIT_S = 300
+
+
+def load_corpus(qdrant, limit: int) -> np.ndarray:
+    """Vectors of up to `limit` points of the seeded collection (scrolled in pages)."""
+    vectors, offset = [], None
+    while len(vectors) < limit:
+        points, offset = qdrant.scroll(
+            collection_name=COLLECTION_NAME,
+            limit=min(1000, limit - len(vectors)),
+            offset=offset,
+            with_payload=False,
+            with_vectors=True,
+        )
+        vectors.extend(p.vector for p in points)
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def _fill_collection(qdrant, name: str, profile: str, corpus: np.ndarray, batch_size: int = 512) -> None:
+    if qdrant.collection_exists(collection_name=name):
+        qdrant.delete_collection(collection_name=name)
+    qdrant.create_collection(collection_name=name, **collection_config(profile, dim=corpus.shape[1]))
+    for start in range(0, len(corpus), batch_size):
+        qdrant.upsert(collection_name=name, points=qmodels.Batch(
+            ids=list(range(start, min(start + batch_size, len(corpus)))),
+            vectors=corpus[start:start + batch_size].tolist(),
+        ))
+
+    # Wait for the optimizer (HNSW / quantization) so latency reflects the final layout
+    deadline = time.monotonic() + INDEX_WAIT_S
+    while time.monotonic() < deadline:
+        if qdrant.get_collection(collection_name=name).status == qmodels.CollectionStatus.GREEN:
+            return
+        time.sleep(0.5)
+    print(f"Warning: {name} still indexing after {INDEX_WAIT_S}s, numbers may be pessimistic")
+
+
+def _search(qdrant, name: str, queries: np.ndarray, k: int, params) -> tuple[list[set], list[float]]:
+    ids, latencies = [], []
+    for query in queries:
+        started = time.perf_counter()
+        points = qdrant.query_points(collection_name=name, query=query.tolist(), limit=k, search_params=params).points
+        latencies.append((time.perf_counter() - started) * 1000)
+        ids.append({p.id for p in points})
+    return ids, latencies
+
+
+def run_benchmark(qdrant, corpus: np.ndarray, queries: np.ndarray, profiles: list[str], k: int = 3,
+                  keep: bool = False) -> dict:
+    report = {"corpus": len(corpus), "queries": len(queries), "k": k, "profiles": {}}
+    truth = None
+    for profile in profiles:
+        name = f"{COLLECTION_NAME}_bench_{profile}"
+        _fill_collection(qdrant, name, profile, corpus)
+        if truth is None:
+            truth, _ = _search(qdrant, name, queries, k, search_params(profile, exact=True))
+
+        found, latencies = _search(qdrant, name, queries, k, search_params(profile))
+        recall = float(np.mean([len(f & t) / max(len(t), 1) for f, t in zip(found, truth)]))
+        report["profiles"][profile] = {
+            "est_ram_mb": round(estimate_ram_bytes(profile, len(corpus), corpus.shape[1]) / 2**20, 2),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+            f"recall@{k}": round(recall, 4),
+        }
+        if not keep:
+            qdrant.delete_collection(collection_name=name)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=20000, help="corpus points copied per profile")
+    parser.add_argument("--queries", type=int, default=200, help="held-out points used as queries")
+    parser.add_argument("--k", type=int, default=3, help="top-k (vector_search uses 3)")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma-separated profile names")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch collections")
+    parser.add_argument("--out", type=Path, default=REPORT_PATH)
+    args = parser.parse_args()
+
+    vectors = load_corpus(client, args.limit + args.queries)
+    if len(vectors) <= args.queries:
+        print(f"Collection '{COLLECTION_NAME}' has {len(vectors)} points - seed it first (scripts/seed_rag_from_csic.py)")
+        sys.exit(1)
+    corpus, queries = vectors[:-args.queries], vectors[-args.queries:]
+    print(f"Benchmarking {len(corpus)} x {VECTOR_SIZE}-dim vectors, {len(queries)} queries, k={args.k}")
+
+    report = run_benchmark(client, corpus, queries, args.profiles.split(","), args.k, args.keep)
+
+    print(f"\n{'profile':<10} {'est RAM MB':>10} {'p50 ms':>8} {'p99 ms':>8} {'recall@' + str(args.k):>9}")
+    for profile, row in report["profiles"].items():
+        print(f"{profile:<10} {row['est_ram_mb']:>10} {row['p50_ms']:>8} {row['p99_ms']:>8} {row[f'recall@{args.k}']:>9}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2))
+    print(f"\nReport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Compare dense, lexical (BM25 char n-gram) and hybrid retrieval on the seeded corpus.
+
+--queries examples of the collection are drawn at random and used as queries
+(their own point is dropped from the results). For each retrieval mode the
+report gives:
+- p50 / p99 latency per query (dense split into embedding + search)
+- label@k / attack_type@k: share of the k neighbours with the query's label /
+  attack type (the corpus labels are the only ground truth available)
+- overlap@k with the dense neighbours
+
+Usage:
+    python scripts/benchmark_lexical_retrieval.py [--queries 200] [--k 3]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from backends.embedders import embedder
+from backends.lexical_index import LexicalIndex
+from backends.rag_backend import COLLECTION_NAME, client, corpus_payloads, rrf_fuse, vector_index
+
+REPORT_PATH = Path(__file__).parent.parent / "artifacts" / "lexical_retrieval_report.json"
+
+
+def dense_search(vector: list[float], limit: int) -> list[dict]:
+    """Payloads of the nearest points (in-process index or Qdrant)."""
+    if vector_index is not None:
+        return [payload for payload, _ in vector_index.search([vector], limit)[0]]
+    points = client.query_points(collection_name=COLLECTION_NAME, query=vector, limit=limit, with_payload=True).points
+    return [p.payload or {} for p in points]
+
+
+def _without_self(hits: list[dict], query: dict, k: int) -> list[dict]:
+    return [p for p in hits if p.get("raw_request") != query.get("raw_request")][:k]
+
+
+def _quality(neighbours: list[list[dict]], queries: list[dict], field: str) -> float:
+    shares = [np.mean([n.get(field) == q.get(field) for n in hits]) for hits, q in zip(neighbours, queries) if hits]
+    return round(float(np.mean(shares)), 4) if shares else 0.0
+
+
+def _row(latencies: list[float], neighbours: list[list[dict]], queries: list[dict], dense: list[list[dict]],
+         k: int) -> dict:
+    overlap = [
+        len({p.get("raw_request") for p in hits} & {p.get("raw_request") for p in ref}) / max(len(ref), 1)
+        for hits, ref in zip(neighbours, dense)
+    ]
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        f"label@{k}": _quality(neighbours, queries, "label"),
+        f"attack_type@{k}": _quality(neighbours, queries, "attack_type"),
+        f"overlap@{k}": round(float(np.mean(overlap)), 4),
+    }
+
+
+def run_benchmark(payloads: list[dict], queries: list[dict], k: int = 3, embed=None, search=dense_search,
+                  fetch: int = 4) -> dict:
+    """embed(text) -> vector and search(vector, limit) -> payloads drive the dense side."""
+    embed = embed or (lambda text: embedder.embed_batch([text])[0])
+    started = time.perf_counter()
+    index = LexicalIndex.build(payloads)
+    report = {"corpus": len(payloads), "queries": len(queries), "k": k,
+              "lexical_build_s": round(time.perf_counter() - started, 3), "lexical_index": index.stats()}
+
+    dense, dense_wide, embed_ms, search_ms = [], [], [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        vector = embed(q["raw_request"])
+        t1 = time.perf_counter()
+        hits = search(vector, k * fetch + 1)
+        t2 = time.perf_counter()
+        embed_ms.append((t1 - t0) * 1000)
+        search_ms.append((t2 - t1) * 1000)
+        dense_wide.append(_without_self(hits, q, k * fetch))
+        dense.append(dense_wide[-1][:k])
+
+    lexical, lexical_wide, lexical_ms = [], [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        hits = [p for p, _ in index.search([q["raw_request"]], k * fetch + 1)[0]]
+        lexical_ms.append((time.perf_counter() - t0) * 1000)
+        lexical_wide.append(_without_self(hits, q, k * fetch))
+        lexical.append(lexical_wide[-1][:k])
+
+    hybrid = [rrf_fuse(d, lx, k) for d, lx in zip(dense_wide, lexical_wide)]
+    dense_total = [e + s for e, s in zip(embed_ms, search_ms)]
+    hybrid_ms = [d + lx for d, lx in zip(dense_total, lexical_ms)]
+
+    report["modes"] = {
+        "dense": {**_row(dense_total, dense, queries, dense, k),
+                  "embed_p50_ms": round(float(np.percentile(embed_ms, 50)), 3),
+                  "search_p50_ms": round(float(np.percentile(search_ms, 50)), 3)},
+        "lexical": _row(lexical_ms, lexical, queries, dense, k),
+        "hybrid": _row(hybrid_ms, hybrid, queries, dense, k),
+    }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200, help="corpus examples used as queries")
+    parser.add_argument("--k", type=int, default=3, help="top-k (vector_search uses 3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", type=Path, default=REPORT_PATH)
+    args = parser.parse_args()
+
+    payloads = corpus_payloads()
+    if len(payloads) <= args.queries:
+        print(f"Collection '{COLLECTION_NAME}' has {len(payloads)} points - seed it first (scripts/seed_rag_from_csic.py)")
+        sys.exit(1)
+    queries = random.Random(args.seed).sample(payloads, args.queries)
+    print(f"Benchmarking {len(payloads)} examples, {len(queries)} queries, k={args.k} (embedder: {embedder.name})")
+
+    report = run_benchmark(payloads, queries, args.k)
+    print(f"Lexical index built in {report['lexical_build_s']}s: {report['lexical_index']}")
+
+    k = args.k
+    print(f"\n{'mode':<8} {'p50 ms':>8} {'p99 ms':>8} {'label@' + str(k):>8} {'type@' + str(k):>8} {'overlap':>8}")
+    for mode, row in report["modes"].items():
+        print(f"{mode:<8} {row['p50_ms']:>8} {row['p99_ms']:>8} {row[f'label@{k}']:>8} "
+              f"{row[f'attack_type@{k}']:>8} {row[f'overlap@{k}']:>8}")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2))
+    print(f"\nReport written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Build (or rebuild) the BM25 char n-gram index used by RAG_RETRIEVAL=lexical|hybrid.
+
+The index is a snapshot of the collection's payloads: rebuild it after
+reseeding or compaction (examples added by feedback afterwards are only
+found by the dense path until the next rebuild). The API builds it on
+startup when the file is missing.
+
+Usage:
+    python scripts/build_lexical_index.py
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backends.rag_backend import COLLECTION_NAME, build_lexical_index, lexical_index_path
+
+
+def main():
+    started = time.perf_counter()
+    index = build_lexical_index()
+    if not index.payloads:
+        print(f"Collection '{COLLECTION_NAME}' is empty - seed it first (scripts/seed_rag_from_csic.py)")
+        sys.exit(1)
+    print(f"Built lexical index over {len(index.payloads)} examples in {time.perf_counter() - started:.1f}s")
+    print(f"{index.stats()} -> {lexical_index_path()}")
+
+
+if __name__ == "__main__":
+    main()
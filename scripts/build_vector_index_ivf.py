@@ -0,0 +1,46 @@
+"""
+Build (or rebuild) the IVF partition of the in-process NumPy vector index.
+
+Exact search scans every row; once the index holds ~100k+ examples, an IVF
+partition keeps /analyze retrieval in the sub-millisecond range by scoring
+only the NUMPY_INDEX_NPROBE closest lists. New rows are assigned to the
+existing centroids on write, so rebuild only after large reseeds.
+
+Usage:
+    VECTOR_BACKEND=numpy python scripts/build_vector_index_ivf.py [--lists N]
+"""
+import argparse
+import math
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backends.rag_backend import VECTOR_BACKEND, vector_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lists", type=int, default=0, help="IVF lists (default: ~sqrt(rows))")
+    parser.add_argument("--iterations", type=int, default=10)
+    parser.add_argument("--sample", type=int, default=50000, help="rows used to train the centroids")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if vector_index is None:
+        print(f"VECTOR_BACKEND is '{VECTOR_BACKEND}': set VECTOR_BACKEND=numpy to build the IVF index")
+        sys.exit(1)
+    if vector_index.count == 0:
+        print("Index is empty - seed it first (scripts/seed_rag_from_csic.py)")
+        sys.exit(1)
+
+    n_lists = args.lists or max(1, int(math.sqrt(vector_index.count)))
+    started = time.perf_counter()
+    vector_index.build_ivf(n_lists, iterations=args.iterations, sample=args.sample, seed=args.seed)
+    print(f"Built {n_lists} IVF lists over {vector_index.count} rows in {time.perf_counter() - started:.1f}s")
+    print(vector_index.stats())
+
+
+if __name__ == "__main__":
+    main()
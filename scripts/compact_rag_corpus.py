@@ -0,0 +1,140 @@
+"""
+Compact the RAG corpus: collapse near-duplicate requests into one representative each.
+
+CSIC is heavily templated, so many points differ only in a parameter value.
+Points are clustered by MinHash/LSH over their normalized text
+(backends/near_dup.py, same label and attack type only). Each cluster keeps
+its shortest request as representative, with `member_count` in its payload.
+Retrieval then spends its top-k on distinct examples, and the prompt shows
+"(xN)" for the representative.
+
+Usage:
+    python scripts/compact_rag_corpus.py --dry-run             # report only
+    python scripts/compact_rag_corpus.py                       # rewrite QDRANT_COLLECTION in place
+    python scripts/compact_rag_corpus.py --target soc_compact  # write representatives to a new collection
+
+Re-running is safe: existing member_count values are summed.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+from qdrant_client.http import models as qmodels
+
+from backends.near_dup import BANDS, NUM_PERM, ROWS, MinHasher, cluster
+from backends.qdrant_profiles import QDRANT_PROFILE, collection_config
+from backends.rag_backend import COLLECTION_NAME, VECTOR_BACKEND, client
+
+PAGE_SIZE = 1000
+
+
+def scan(qdrant, collection: str) -> tuple[list, list[dict]]:
+    """Ids and payloads of every point (vectors are not needed to cluster)."""
+    ids, payloads, offset = [], [], None
+    while True:
+        points, offset = qdrant.scroll(collection_name=collection, limit=PAGE_SIZE, offset=offset,
+                                       with_payload=True, with_vectors=False)
+        for p in points:
+            ids.append(p.id)
+            payloads.append(p.payload or {})
+        if offset is None:
+            return ids, payloads
+
+
+def plan(ids: list, payloads: list[dict], threshold: float = 0.8) -> list[dict]:
+    """One entry per cluster: representative id, member ids, summed member_count."""
+    hasher = MinHasher(NUM_PERM)
+    signatures = np.stack([hasher.signature(p.get("raw_request", "")) for p in payloads]) if payloads \
+        else np.zeros((0, NUM_PERM), dtype=np.uint32)
+    keys = [(p.get("label", "normal"), p.get("attack_type", "normal")) for p in payloads]
+
+    groups = []
+    for members in cluster(signatures, keys, threshold, BANDS, ROWS):
+        rep = min(members, key=lambda i: (len(payloads[i].get("raw_request", "")), i))
+        groups.append({
+            "id": ids[rep],
+            "members": [ids[i] for i in members],
+            "member_count": sum(int(payloads[i].get("member_count", 1)) for i in members),
+        })
+    return groups
+
+
+def _batches(items: list, size: int = PAGE_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def compact_in_place(qdrant, collection: str, groups: list[dict]) -> None:
+    # Delete first, then write counts: a crash in between under-counts (harmless)
+    # instead of leaving duplicates that a re-run would count twice.
+    doomed = [m for g in groups for m in g["members"] if m != g["id"]]
+    for batch in _batches(doomed):
+        qdrant.delete(collection_name=collection, points_selector=qmodels.PointIdsList(points=batch))
+
+    by_count = {}
+    for g in groups:
+        if len(g["members"]) > 1:
+            by_count.setdefault(g["member_count"], []).append(g["id"])
+    for count, rep_ids in by_count.items():
+        for batch in _batches(rep_ids):
+            qdrant.set_payload(collection_name=collection, payload={"member_count": count}, points=batch)
+
+
+def compact_into(qdrant, source: str, target: str, groups: list[dict]) -> None:
+    if qdrant.collection_exists(collection_name=target):
+        raise Exception(f"Target collection '{target}' already exists - drop it or pick another name")
+    dim = qdrant.get_collection(collection_name=source).config.params.vectors.size
+    qdrant.create_collection(collection_name=target, **collection_config(QDRANT_PROFILE, dim=dim))
+
+    counts = {g["id"]: g["member_count"] for g in groups}
+    for batch in _batches(list(counts)):
+        points = qdrant.retrieve(collection_name=source, ids=batch, with_payload=True, with_vectors=True)
+        qdrant.upsert(collection_name=target, points=[
+            qmodels.PointStruct(id=p.id, vector=p.vector, payload={**(p.payload or {}), "member_count": counts[p.id]})
+            for p in points
+        ])
+
+
+def compact(qdrant, collection: str = COLLECTION_NAME, target: str = None, threshold: float = 0.8,
+            dry_run: bool = False) -> dict:
+    started = time.perf_counter()
+    ids, payloads = scan(qdrant, collection)
+    groups = plan(ids, payloads, threshold)
+    merged = [g for g in groups if len(g["members"]) > 1]
+    report = {
+        "points": len(ids),
+        "clusters": len(groups),
+        "merged_clusters": len(merged),
+        "removed": len(ids) - len(groups),
+        "largest": sorted((len(g["members"]) for g in merged), reverse=True)[:5],
+    }
+    print(f"{report['points']} points -> {report['clusters']} representatives "
+          f"({report['removed']} near-duplicates in {report['merged_clusters']} clusters, "
+          f"largest {report['largest']}) in {time.perf_counter() - started:.1f}s")
+
+    if not dry_run:
+        if target:
+            compact_into(qdrant, collection, target, groups)
+        else:
+            compact_in_place(qdrant, collection, groups)
+        final = qdrant.count(collection_name=target or collection, exact=True).count
+        print(f"✅ '{target or collection}' now holds {final} points")
+        report["final_points"] = final
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="MinHash/LSH near-duplicate compaction of the RAG collection")
+    parser.add_argument("--threshold", type=float, default=0.8, help="min estimated Jaccard similarity to merge")
+    parser.add_argument("--target", default=None, help="write representatives to this new collection (source untouched)")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be merged")
+    args = parser.parse_args()
+
+    if VECTOR_BACKEND != "qdrant":
+        print(f"Compaction works on Qdrant collections (VECTOR_BACKEND is '{VECTOR_BACKEND}')")
+        sys.exit(1)
+    compact(client, COLLECTION_NAME, args.target, args.threshold, args.dry_run)
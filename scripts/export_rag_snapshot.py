@@ -0,0 +1,38 @@
+"""
+Export the seeded RAG collection as a snapshot + manifest for fast bring-up.
+
+Writes the Qdrant snapshot (or a tar of the numpy index), the lexical index
+if built, and manifest.json (embedder, vector size, point count, corpus hash,
+checksum) to RAG_SNAPSHOT_DIR. Copy that directory to a new environment:
+the API restores it on startup when the collection is empty and the
+manifest matches (see backends/rag_snapshot.py).
+
+Usage:
+    python scripts/export_rag_snapshot.py [--out data/rag_snapshot]
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backends.rag_snapshot import RAG_SNAPSHOT_DIR, export_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", type=Path, default=RAG_SNAPSHOT_DIR, help="snapshot directory")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    manifest = export_snapshot(args.out)
+    size_mb = (args.out / manifest["snapshot"]).stat().st_size / 2**20
+    print(f"✅ Exported {manifest['points']} points of '{manifest['collection']}' "
+          f"({manifest['backend']}, {manifest['embedder']}/{manifest['vector_size']}) "
+          f"to {args.out / manifest['snapshot']} ({size_mb:.1f} MB) in {time.perf_counter() - started:.1f}s")
+    print(f"   corpus hash {manifest['corpus_hash'][:16]}..., lexical index: {manifest['lexical_index'] or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Offline Groq/OpenAI-compatible stand-in for load testing the LLM slow path.
+
+Serves POST /openai/v1/chat/completions (the path the Groq SDK calls) with
+configurable latency, injected 429 / 5xx errors, server-side RPM/TPM limits
+(429 + retry-after, like Groq) and token accounting. Verdicts come from the
+same keyword heuristic as backends/llm_backend_mock.py; packed prompts
+("### ITEM n") get a JSON array of per-item verdicts.
+
+Usage:
+    python scripts/llm_standin_server.py                  # http://127.0.0.1:8900
+    GROQ_BASE_URL=http://127.0.0.1:8900 GROQ_API_KEY=dummy uvicorn api:app
+
+Config (env):
+    STANDIN_PORT=8900
+    STANDIN_LATENCY_MS=lognormal:600:0.5   fixed:<ms> | uniform:<lo>:<hi> | lognormal:<median>:<sigma>
+    STANDIN_MS_PER_TOKEN=0                 extra latency per completion token
+    STANDIN_429_RATE=0.0                   share of calls failing with 429
+    STANDIN_5XX_RATE=0.0                   share of calls failing with 500/502/503
+    STANDIN_RPM=0 / STANDIN_TPM=0          enforced per-model limits (0 = unlimited)
+    STANDIN_SEED                           RNG seed for reproducible runs
+
+GET /stats returns per-model calls, errors, token totals and latency; POST /stats/reset clears them.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from backends.llm_backend_mock import llm_analyze
+from backends.llm_scheduler import TokenBucket
+
+STANDIN_PORT = int(os.getenv("STANDIN_PORT", "8900"))
+STANDIN_LATENCY_MS = os.getenv("STANDIN_LATENCY_MS", "lognormal:600:0.5")
+STANDIN_MS_PER_TOKEN = float(os.getenv("STANDIN_MS_PER_TOKEN", "0"))
+STANDIN_429_RATE = float(os.getenv("STANDIN_429_RATE", "0"))
+STANDIN_5XX_RATE = float(os.getenv("STANDIN_5XX_RATE", "0"))
+STANDIN_RPM = float(os.getenv("STANDIN_RPM", "0"))
+STANDIN_TPM = float(os.getenv("STANDIN_TPM", "0"))
+
+rng = random.Random(os.getenv("STANDIN_SEED"))
+app = FastAPI(title="LLM stand-in (Groq/OpenAI compatible)")
+
+_limits: dict = {}  # model -> (requests bucket, tokens bucket)
+_stats: dict = {}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def sample_latency(spec: str = STANDIN_LATENCY_MS) -> float:
+    """Seconds drawn from a "kind:params" latency spec (milliseconds)."""
+    kind, *params = spec.split(":")
+    params = [float(p) for p in params]
+    if kind == "fixed":
+        ms = params[0]
+    elif kind == "uniform":
+        ms = rng.uniform(params[0], params[1])
+    elif kind == "lognormal":
+        ms = params[0] * rng.lognormvariate(0.0, params[1])
+    else:
+        raise Exception(f"Unknown STANDIN_LATENCY_MS distribution: {spec}")
+    return max(0.0, ms) / 1000.0
+
+
+def _model_stats(model: str) -> dict:
+    return _stats.setdefault(model, {
+        "calls": 0, "ok": 0, "rate_limited": 0, "server_errors": 0,
+        "prompt_tokens": 0, "completion_tokens": 0, "latency_ms_total": 0.0,
+    })
+
+
+def _error(status: int, message: str, kind: str, headers: dict = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": kind, "code": kind}},
+        headers=headers,
+    )
+
+
+def _rate_limit_wait(model: str, tokens: int) -> float:
+    """Seconds until the call fits the enforced RPM/TPM (0 = admitted and consumed)."""
+    if not STANDIN_RPM and not STANDIN_TPM:
+        return 0.0
+    requests, token_bucket = _limits.setdefault(model, (
+        TokenBucket(STANDIN_RPM) if STANDIN_RPM else None,
+        TokenBucket(STANDIN_TPM) if STANDIN_TPM else None,
+    ))
+    wait = max(
+        requests.wait_time(1) if requests else 0.0,
+        token_bucket.wait_time(tokens) if token_bucket else 0.0,
+    )
+    if wait == 0:
+        if requests:
+            requests.consume(1)
+        if token_bucket:
+            token_bucket.consume(tokens)
+    return wait
+
+
+def _item_verdict(model: str, body: str) -> dict:
+    analysis = llm_analyze(body, "")["analysis"]
+    benign = "no malicious intent" in analysis
+    # Small models are less sure of themselves (exercises the cascade)
+    low, high = (0.55, 0.99) if "8b" in model else (0.8, 0.99)
+    return {
+        "verdict": "benign" if benign else "malicious",
+        "confidence": round(rng.uniform(low, high), 2),
+        "analysis": analysis,
+    }
+
+
+def _completion_text(model: str, messages: list[dict]) -> str:
+    prompt = messages[-1].get("content", "") if messages else ""
+    items = re.split(r"### ITEM (\d+)", prompt)
+    if len(items) > 1:
+        # items = [preamble, n1, body1, n2, body2, ...]
+        return json.dumps([
+            {"item": int(n), **_item_verdict(model, body.split("RELATED CONTEXT")[0])}
+            for n, body in zip(items[1::2], items[2::2])
+        ])
+    query = prompt.split("RELATED CONTEXT")[0]
+    return llm_analyze(query, "")["analysis"]
+
+
+@app.post("/openai/v1/chat/completions")
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "standin")
+    messages = body.get("messages", [])
+    max_tokens = int(body.get("max_tokens") or 1024)
+    stats = _model_stats(model)
+    stats["calls"] += 1
+    started = time.perf_counter()
+
+    prompt_tokens = estimate_tokens("".join(m.get("content", "") for m in messages))
+    wait = _rate_limit_wait(model, prompt_tokens + max_tokens)
+    if wait > 0:
+        stats["rate_limited"] += 1
+        return _error(429, f"Rate limit reached for model `{model}` (stand-in). Please try again in {wait:.2f}s.",
+                      "rate_limit_exceeded", {"retry-after": f"{wait:.2f}"})
+
+    roll = rng.random()
+    if roll < STANDIN_429_RATE:
+        stats["rate_limited"] += 1
+        return _error(429, "Rate limit reached (injected)", "rate_limit_exceeded", {"retry-after": "1"})
+    if roll < STANDIN_429_RATE + STANDIN_5XX_RATE:
+        stats["server_errors"] += 1
+        await asyncio.sleep(sample_latency() / 4)
+        return _error(rng.choice([500, 502, 503]), "Service unavailable (injected)", "internal_server_error")
+
+    content = _completion_text(model, messages)
+    completion_tokens = min(estimate_tokens(content), max_tokens)
+    content = content[:max_tokens * 4]
+    await asyncio.sleep(sample_latency() + completion_tokens * STANDIN_MS_PER_TOKEN / 1000.0)
+
+    stats["ok"] += 1
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += completion_tokens
+    stats["latency_ms_total"] += (time.perf_counter() - started) * 1000
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop" if completion_tokens < max_tokens else "length",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+@app.get("/openai/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": m, "object": "model"} for m in _stats]}
+
+
+@app.get("/stats")
+async def stats():
+    out = {}
+    for model, s in _stats.items():
+        s = dict(s)
+        ok = s["ok"]
+        s["latency_ms_avg"] = round(s.pop("latency_ms_total") / ok, 1) if ok else 0.0
+        out[model] = s
+    return out
+
+
+@app.post("/stats/reset")
+async def reset_stats():
+    _stats.clear()
+    _limits.clear()
+    return {"status": "reset"}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    print(f"LLM stand-in on http://127.0.0.1:{STANDIN_PORT} (latency {STANDIN_LATENCY_MS}, "
+          f"429 {STANDIN_429_RATE:.0%}, 5xx {STANDIN_5XX_RATE:.0%}, rpm {STANDIN_RPM or '∞'}, tpm {STANDIN_TPM or '∞'})")
+    uvicorn.run(app, host="127.0.0.1", port=STANDIN_PORT, log_level="warning")
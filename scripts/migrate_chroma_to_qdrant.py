@@ -1,73 +1,136 @@
-"""Migrate existing ChromaDB data into Qdrant."""
+"""Migrate existing ChromaDB data into Qdrant.
+
+Streams the Chroma collection page by page (limit/offset) and upserts each
+page as soon as it is read, so memory stays bounded by
+page_size x (2 x workers + 1) items whatever the store size. Counts are
+verified at the end (exit code 1 on mismatch).
+
+Usage:
+    python scripts/migrate_chroma_to_qdrant.py [--page-size 512] [--workers 1] [--chroma-path chroma_db]
+
+Do not write to the Chroma store while migrating: offset paging assumes a
+stable order.
+"""
+import argparse
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-import chromadb
 import uuid
 from qdrant_client.http import models as qmodels
+from backends.qdrant_profiles import QDRANT_PROFILE, collection_config
 from backends.rag_backend import client, COLLECTION_NAME, VECTOR_SIZE
 
 
-def migrate_chroma_to_qdrant() -> None:
-    chroma_path = Path(__file__).parent.parent / "chroma_db"
-    chroma_client = chromadb.PersistentClient(path=str(chroma_path))
-    collection = chroma_client.get_or_create_collection("soc_attacks")
-
-    all_items = collection.get(include=["embeddings", "metadatas", "documents"])
-    ids = all_items.get("ids", [])
-    docs = all_items.get("documents", [])
-    metas = all_items.get("metadatas", [])
-    embeddings = all_items.get("embeddings", [])
+def _to_points(page: dict) -> list[qmodels.PointStruct]:
+    points = []
+    for doc_id, doc_text, meta, emb in zip(
+        page.get("ids") or [],
+        page.get("documents") or [],
+        page.get("metadatas") or [],
+        page.get("embeddings") if page.get("embeddings") is not None else [],
+    ):
+        emb = emb.tolist() if hasattr(emb, "tolist") else list(emb)  # newer Chroma returns numpy rows
+        if len(emb) != VECTOR_SIZE:
+            raise Exception(f"Chroma item {doc_id} has a {len(emb)}-dim embedding, Qdrant collection expects {VECTOR_SIZE}")
+        payload = {
+            "raw_request": doc_text,
+            "label": meta.get("label", "normal") if isinstance(meta, dict) else "normal",
+            "attack_type": meta.get("attack_type", "normal") if isinstance(meta, dict) else "normal",
+        }
+        point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, str(doc_id)))
+        points.append(
+            qmodels.PointStruct(
+                id=point_id,
+                vector=emb,
+                payload=payload,
+            )
+        )
+    return points
 
-    if not ids:
-        print("No items found in ChromaDB. Nothing to migrate.")
-        return
 
-    # Ensure collection exists in Qdrant
-    if not client.collection_exists(collection_name=COLLECTION_NAME):
-        client.create_collection(
+def _ensure_collection(qdrant) -> None:
+    if not qdrant.collection_exists(collection_name=COLLECTION_NAME):
+        qdrant.create_collection(
             collection_name=COLLECTION_NAME,
-            vectors_config=qmodels.VectorParams(
-                size=VECTOR_SIZE,
-                distance=qmodels.Distance.COSINE,
-            ),
+            **collection_config(QDRANT_PROFILE),
         )
 
-    batch_size = 256
-    total = len(ids)
-    print(f"Migrating {total} items from ChromaDB to Qdrant...")
-
-    for start in range(0, total, batch_size):
-        end = min(start + batch_size, total)
-        points = []
-        for doc_id, doc_text, meta, emb in zip(
-            ids[start:end],
-            docs[start:end],
-            metas[start:end],
-            embeddings[start:end],
-        ):
-            payload = {
-                "raw_request": doc_text,
-                "label": meta.get("label", "normal") if isinstance(meta, dict) else "normal",
-                "attack_type": meta.get("attack_type", "normal") if isinstance(meta, dict) else "normal",
-            }
-            point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, str(doc_id)))
-            points.append(
-                qmodels.PointStruct(
-                    id=point_id,
-                    vector=emb,
-                    payload=payload,
-                )
-            )
 
-        client.upsert(collection_name=COLLECTION_NAME, points=points)
-        print(f"  Migrated {end}/{total}...")
+def migrate_collection(collection, qdrant=client, page_size: int = 512, workers: int = 1) -> dict:
+    """
+    Copy a Chroma collection into COLLECTION_NAME, one page at a time.
+
+    With workers > 1 several pages are upserted concurrently while the next
+    ones are read; at most 2 x workers pages are held in memory.
+    """
+    total = collection.count()
+    if not total:
+        print("No items found in ChromaDB. Nothing to migrate.")
+        return {"chroma": 0, "migrated": 0, "ok": True}
+
+    _ensure_collection(qdrant)
+    before = qdrant.count(collection_name=COLLECTION_NAME, exact=True).count
+    print(f"Migrating {total} items from ChromaDB to Qdrant (page {page_size}, {workers} worker(s))...")
+
+    def upload(points):
+        qdrant.upsert(collection_name=COLLECTION_NAME, points=points)
+        return len(points)
+
+    started = time.perf_counter()
+    migrated = 0
+    pending = set()
+    offset = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while offset < total or pending:
+            while offset < total and len(pending) < 2 * workers:
+                page = collection.get(limit=page_size, offset=offset, include=["embeddings", "metadatas", "documents"])
+                read = len(page.get("ids") or [])
+                if not read:
+                    total = offset  # store shrank under us; stop paging
+                    break
+                pending.add(pool.submit(upload, _to_points(page)))
+                offset += read
+
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                migrated += future.result()
+            rate = migrated / (time.perf_counter() - started)
+            print(f"  Migrated {migrated}/{total} ({rate:.0f} items/s)")
+
+    after = qdrant.count(collection_name=COLLECTION_NAME, exact=True).count
+    # Chroma ids are unique, so every item is one point; points that already
+    # existed in Qdrant are overwritten, hence the range when it was not empty
+    ok = migrated == total and (after == total if before == 0 else total <= after <= before + total)
+    print(f"\nChroma items: {total} | migrated: {migrated} | Qdrant before: {before} | after: {after}")
+    return {"chroma": total, "migrated": migrated, "qdrant_before": before, "qdrant_after": after, "ok": ok}
+
+
+def migrate_chroma_to_qdrant(chroma_path: Path = None, page_size: int = 512, workers: int = 1) -> bool:
+    import chromadb
+
+    chroma_path = chroma_path or Path(__file__).parent.parent / "chroma_db"
+    chroma_client = chromadb.PersistentClient(path=str(chroma_path))
+    collection = chroma_client.get_or_create_collection("soc_attacks")
 
-    print("✅ Migration complete.")
+    result = migrate_collection(collection, page_size=page_size, workers=workers)
+    if result["ok"]:
+        print("✅ Migration complete.")
+    else:
+        print("❌ Count verification failed - rerun the migration (upserts are idempotent).")
+    return result["ok"]
 
 
 if __name__ == "__main__":
-    migrate_chroma_to_qdrant()
+    parser = argparse.ArgumentParser(description="Stream a ChromaDB collection into Qdrant")
+    parser.add_argument("--chroma-path", type=Path, default=None, help="ChromaDB directory (default: chroma_db/)")
+    parser.add_argument("--page-size", type=int, default=512, help="items read and upserted per page")
+    parser.add_argument("--workers", type=int, default=1, help="concurrent page uploads")
+    args = parser.parse_args()
+    sys.exit(0 if migrate_chroma_to_qdrant(args.chroma_path, args.page_size, args.workers) else 1)
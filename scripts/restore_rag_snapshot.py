@@ -0,0 +1,47 @@
+"""
+Restore the RAG collection from a snapshot written by export_rag_snapshot.py.
+
+The API does this by itself on startup for an empty collection; use this
+script to restore ahead of time, to check a snapshot (--verify recomputes the
+corpus hash) or to replace a populated collection (--force).
+
+Usage:
+    python scripts/restore_rag_snapshot.py [--dir data/rag_snapshot] [--force] [--verify]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backends.rag_backend import corpus_payloads
+from backends.rag_snapshot import RAG_SNAPSHOT_DIR, corpus_hash, manifest_mismatch, read_manifest, restore_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", type=Path, default=RAG_SNAPSHOT_DIR, help="snapshot directory")
+    parser.add_argument("--force", action="store_true", help="replace a populated collection")
+    parser.add_argument("--verify", action="store_true", help="recompute the corpus hash after restoring")
+    args = parser.parse_args()
+
+    manifest = read_manifest(args.dir)
+    if manifest is None:
+        print(f"No manifest in {args.dir} - run scripts/export_rag_snapshot.py first")
+        sys.exit(1)
+    reason = manifest_mismatch(manifest)
+    if reason:
+        print(f"Snapshot does not match this configuration: {reason}")
+        sys.exit(1)
+
+    if not restore_snapshot(args.dir, force=args.force):
+        print("Collection already populated - nothing restored (use --force to replace it)")
+    if args.verify:
+        if corpus_hash(corpus_payloads()) != manifest["corpus_hash"]:
+            print("❌ Corpus hash differs from the manifest")
+            sys.exit(1)
+        print("✅ Corpus hash matches the manifest")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,85 +1,253 @@
 """
 Seed Qdrant from CSIC2010 dataset on Hugging Face
 Dataset: https://huggingface.co/datasets/nquangit/CSIC2010_dataset_classification
+
+Bulk, resumable ingest: rows are embedded in batches and upserted a few
+hundred points at a time by a bounded worker pool. The row offset of the
+last fully written batch is checkpointed, so an interrupted run picks up
+where it stopped (pass --restart to ignore the checkpoint). A batch that keeps
+failing is bisected: rows that fail on their own are skipped and their ranges
+recorded in the checkpoint ("skipped"); a batch where no row goes in (backend
+down) stops the run.
+
+Usage:
+    python scripts/seed_rag_from_csic.py [--batch-size 256] [--workers 4] [--limit N] [--restart]
 """
 
+import argparse
+import json
+import os
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from datasets import load_dataset
-from backends.rag_backend import add_rag_example
+from backends.rag_backend import COLLECTION_NAME, VECTOR_BACKEND, add_rag_examples
 
-def seed_qdrant_from_csic():
-    print("Loading CSIC2010 dataset from Hugging Face...")
-    
+DATASET_NAME = "nquangit/CSIC2010_dataset_classification"
+CHECKPOINT_PATH = Path(__file__).parent.parent / "data" / f"seed_csic_{VECTOR_BACKEND}_{COLLECTION_NAME}.checkpoint.json"
+MAX_BATCH_RETRIES = 3
+
+
+def row_to_example(row: dict, col_request: str, col_label: str):
+    """(text, is_anomalous, attack_type) for one dataset row, or None to skip it."""
+    request = row.get(col_request, "")
+    label_value = row.get(col_label, "Unknown")
+    if not request or label_value is None:
+        return None
+
+    # Determine if anomalous (label: 0=normal, 1=attack)
+    if isinstance(label_value, int):
+        is_anomalous = label_value == 1
+        attack_type = "attack" if is_anomalous else "normal"
+    else:
+        label_str = str(label_value).lower()
+        is_anomalous = label_str not in ["normal", "0"]
+        attack_type = str(label_value)
+    return str(request), is_anomalous, attack_type
+
+
+def load_checkpoint(path: Path) -> dict:
+    if path.exists():
+        try:
+            return json.loads(path.read_text())
+        except ValueError:
+            print(f"Warning: unreadable checkpoint {path}, starting from row 0")
+    return {"offset": 0, "seeded": 0}
+
+
+def save_checkpoint(path: Path, state: dict) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state))
+    os.replace(tmp, path)
+
+
+def _ingest_with_retry(ingest, examples: list) -> int:
+    for attempt in range(MAX_BATCH_RETRIES + 1):
+        try:
+            return ingest(examples) if examples else 0
+        except Exception:
+            if attempt == MAX_BATCH_RETRIES:
+                raise
+            time.sleep(2 ** attempt)
+
+
+def _bisect(ingest, indexed: list) -> tuple[int, list]:
+    """(points written, [(row, error)] for the rows that fail on their own)."""
     try:
-        dataset = load_dataset("nquangit/CSIC2010_dataset_classification", split="train")
+        return ingest([example for _, example in indexed]), []
     except Exception as e:
-        print(f"Error loading dataset: {e}")
-        print("Make sure you have 'datasets' package installed: pip install datasets")
-        sys.exit(1)
-    
-    print(f"Dataset loaded. Total rows: {len(dataset)}")
-    print(f"Columns: {dataset.column_names}")
-    
-    # Inspect first row to understand structure
-    if len(dataset) > 0:
-        print(f"\nFirst row example:\n{dataset[0]}")
-    
-    # Seed Qdrant (using 'request' and 'label' or 'class' column)
-    # Adjust column names based on actual dataset structure
+        if len(indexed) == 1:
+            return 0, [(indexed[0][0], e)]
+    mid = len(indexed) // 2
+    left_points, left_failed = _bisect(ingest, indexed[:mid])
+    right_points, right_failed = _bisect(ingest, indexed[mid:])
+    return left_points + right_points, left_failed + right_failed
+
+
+def _ingest_batch(ingest, indexed: list) -> tuple[int, list[int]]:
+    """
+    Write one batch of (row, example) pairs; returns (points written, skipped rows).
+    After MAX_BATCH_RETRIES the batch is bisected to isolate the failing rows,
+    which are skipped. If no row of the batch goes in, the error is re-raised.
+    """
+    try:
+        return _ingest_with_retry(ingest, [example for _, example in indexed]), []
+    except Exception as e:
+        error = e
+    if len(indexed) == 1:
+        raise error
+    mid = len(indexed) // 2
+    left_points, left_failed = _bisect(ingest, indexed[:mid])
+    right_points, right_failed = _bisect(ingest, indexed[mid:])
+    failed = left_failed + right_failed
+    if len(failed) == len(indexed):
+        raise error  # every row fails: the backend is down, not a bad row
+    for row, row_error in failed:
+        print(f"Warning: skipping row {row}: {row_error}")
+    return left_points + right_points, [row for row, _ in failed]
+
+
+def _add_skipped(ranges: list, rows: list[int]) -> list:
+    """Merge skipped rows into sorted [start, end) ranges."""
+    for row in sorted(rows):
+        if ranges and ranges[-1][1] == row:
+            ranges[-1][1] = row + 1
+        else:
+            ranges.append([row, row + 1])
+    return ranges
+
+
+def seed_rows(fetch, total: int, col_request: str, col_label: str, checkpoint_path: Path = CHECKPOINT_PATH,
+              batch_size: int = 256, workers: int = 4, ingest=add_rag_examples, restart: bool = False) -> dict:
+    """
+    Ingest rows [checkpoint offset, total) in batches of batch_size.
+
+    fetch(start, end) returns the rows of that slice as dicts. At most
+    2 * workers batches are in flight; the checkpoint only advances over a
+    contiguous prefix of finished batches, so a crash never skips rows.
+    Rows that fail on their own are skipped and listed in state["skipped"];
+    a batch where every row fails stops the run.
+    """
+    state = {"offset": 0, "seeded": 0} if restart else load_checkpoint(checkpoint_path)
+    state["total"] = total
+    state.setdefault("skipped", [])
+    start_offset = state["offset"]
+    if start_offset:
+        print(f"Resuming from row {start_offset} ({state['seeded']} points already seeded)")
+
+    started = time.perf_counter()
+    pending = {}   # future -> (start, end)
+    finished = {}  # start -> (end, points) for batches done out of order
+    next_start = start_offset
+
+    def report():
+        rows = state["offset"] - start_offset
+        elapsed = time.perf_counter() - started
+        rate = rows / elapsed if elapsed else 0.0
+        eta = (total - state["offset"]) / rate if rate else float("inf")
+        print(f"  {state['offset']}/{total} rows | {state['seeded']} points | {rate:.0f} rows/s | ETA {eta:.0f}s")
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        try:
+            while next_start < total or pending:
+                while next_start < total and len(pending) < 2 * workers:
+                    end = min(next_start + batch_size, total)
+                    indexed = []  # (row number, example): skipped rows are reported by row
+                    for row, record in enumerate(fetch(next_start, end), start=next_start):
+                        example = row_to_example(record, col_request, col_label)
+                        if example:
+                            indexed.append((row, example))
+                    pending[pool.submit(_ingest_batch, ingest, indexed)] = (next_start, end)
+                    next_start = end
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch_start, batch_end = pending.pop(future)
+                    finished[batch_start] = (batch_end, *future.result())
+
+                advanced = False
+                while state["offset"] in finished:
+                    batch_end, points, skipped = finished.pop(state["offset"])
+                    state["offset"] = batch_end
+                    state["seeded"] += points
+                    _add_skipped(state["skipped"], skipped)
+                    advanced = True
+                if advanced:
+                    save_checkpoint(checkpoint_path, state)
+                    report()
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            print(f"\nStopped at row {state['offset']}: rerun to resume from the checkpoint ({checkpoint_path})")
+            raise
+
+    state["elapsed_s"] = round(time.perf_counter() - started, 1)
+    return state
+
+
+def _detect_columns(column_names: list[str]) -> tuple[str, str]:
     col_request = None
     col_label = None
-    
-    for col in dataset.column_names:
+
+    for col in column_names:
         if col.lower() in ["request", "requests", "http_request", "payload", "text"]:
             col_request = col
         if col.lower() in ["label", "labels", "class", "classification", "attack_type"]:
             col_label = col
-    
+
     if not col_request or not col_label:
         print(f"\nWarning: Could not auto-detect request/label columns")
-        print(f"Available columns: {dataset.column_names}")
+        print(f"Available columns: {column_names}")
         col_request = input("Enter request column name: ")
         col_label = input("Enter label column name: ")
-    
-    print(f"\nSeeding Qdrant using columns: request='{col_request}', label='{col_label}'")
-    
-    count = 0
-    batch_size = 100
-    
-    for idx, row in enumerate(dataset):
-        request = row.get(col_request, "")
-        label_value = row.get(col_label, "Unknown")
-        
-        if request and label_value is not None:
-            try:
-                # Determine if anomalous (label: 0=normal, 1=attack)
-                if isinstance(label_value, int):
-                    is_anomalous = label_value == 1
-                    attack_type = "attack" if is_anomalous else "normal"
-                else:
-                    label_str = str(label_value).lower()
-                    is_anomalous = label_str not in ["normal", "0"]
-                    attack_type = str(label_value)
-                
-                # Add to RAG
-                add_rag_example(
-                    text=str(request),
-                    is_anomalous=is_anomalous,
-                    attack_type=attack_type
-                )
-                count += 1
-                
-                if (idx + 1) % batch_size == 0:
-                    print(f"  Seeded {idx + 1} examples...")
-            except Exception as e:
-                print(f"  Error seeding row {idx}: {e}")
-    
-    print(f"\n✅ Successfully seeded {count} examples to Qdrant")
-    return count
+    return col_request, col_label
+
+
+def seed_qdrant_from_csic(batch_size: int = 256, workers: int = 4, limit: int = None, restart: bool = False):
+    print("Loading CSIC2010 dataset from Hugging Face...")
+
+    try:
+        from datasets import load_dataset
+        dataset = load_dataset(DATASET_NAME, split="train")
+    except Exception as e:
+        print(f"Error loading dataset: {e}")
+        print("Make sure you have 'datasets' package installed: pip install datasets")
+        sys.exit(1)
+
+    print(f"Dataset loaded. Total rows: {len(dataset)}")
+    print(f"Columns: {dataset.column_names}")
+
+    # Inspect first row to understand structure
+    if len(dataset) > 0:
+        print(f"\nFirst row example:\n{dataset[0]}")
+
+    col_request, col_label = _detect_columns(dataset.column_names)
+    print(f"\nSeeding {VECTOR_BACKEND} collection '{COLLECTION_NAME}' using columns: "
+          f"request='{col_request}', label='{col_label}' (batch {batch_size}, {workers} workers)")
+
+    def fetch(start: int, end: int) -> list[dict]:
+        columns = dataset[start:end]  # column-major slice: {col: [values]}
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    total = min(len(dataset), limit) if limit else len(dataset)
+    state = seed_rows(fetch, total, col_request, col_label,
+                      batch_size=batch_size, workers=workers, restart=restart)
+
+    print(f"\n✅ Successfully seeded {state['seeded']} examples to {VECTOR_BACKEND} in {state['elapsed_s']}s")
+    if state["skipped"]:
+        skipped = sum(end - start for start, end in state["skipped"])
+        print(f"Warning: {skipped} rows skipped after repeated failures, see 'skipped' in {CHECKPOINT_PATH}")
+    return state["seeded"]
 
 
 if __name__ == "__main__":
-    seed_qdrant_from_csic()
+    parser = argparse.ArgumentParser(description="Bulk, resumable RAG seeding from CSIC2010")
+    parser.add_argument("--batch-size", type=int, default=256, help="points per upsert")
+    parser.add_argument("--workers", type=int, default=4, help="batches embedded/upserted concurrently")
+    parser.add_argument("--limit", type=int, default=None, help="only seed the first N rows")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and start from row 0")
+    args = parser.parse_args()
+    seed_qdrant_from_csic(args.batch_size, args.workers, args.limit, args.restart)
@@ -0,0 +1,123 @@
+"""
+Train the local distilled classifier from LLM verdicts in the verdict cache
+(REVIEW items only: the scope the classifier answers at runtime).
+
+Writes the model artifact (LOCAL_CLASSIFIER_PATH, default data/local_classifier.npz)
+and an accuracy / latency report to artifacts/local_classifier_report.json.
+
+Usage:
+    python scripts/train_local_classifier.py [--epochs 300] [--test-split 0.2]
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from backends.cache_backend import cache_entries
+from backends.local_classifier import (
+    LOCAL_CLASSIFIER_PATH,
+    LOCAL_CLASSIFIER_THRESHOLD,
+    LocalClassifier,
+    in_scope,
+    label_from_cache,
+)
+
+REPORT_FILE = Path(__file__).parent.parent / "artifacts" / "local_classifier_report.json"
+
+
+def load_examples() -> list[tuple[str, dict, int]]:
+    """(raw_request, rule fields, label) for every REVIEW cache entry with an LLM verdict."""
+    examples = []
+    for entry in cache_entries().values():
+        if not in_scope(entry):
+            continue
+        label = label_from_cache(entry)
+        if label is None or not entry.get("raw_request"):
+            continue
+        rule = {"attack_candidates": entry.get("attack_candidates"), "rule_score": entry.get("rule_score")}
+        examples.append((entry["raw_request"], rule, label))
+    return examples
+
+
+def evaluate(model: LocalClassifier, examples: list, threshold: float) -> dict:
+    correct = answered = answered_correct = tp = fp = fn = 0
+    latencies = []
+    for text, rule, label in examples:
+        start = time.perf_counter()
+        p = model.predict_proba(text, rule)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        pred = int(p >= 0.5)
+        correct += pred == label
+        tp += pred == 1 and label == 1
+        fp += pred == 1 and label == 0
+        fn += pred == 0 and label == 1
+        if max(p, 1 - p) >= threshold:
+            answered += 1
+            answered_correct += pred == label
+
+    n = len(examples) or 1
+    return {
+        "samples": len(examples),
+        "accuracy": round(correct / n, 4),
+        "precision": round(tp / (tp + fp), 4) if tp + fp else 0.0,
+        "recall": round(tp / (tp + fn), 4) if tp + fn else 0.0,
+        "threshold": threshold,
+        "coverage": round(answered / n, 4),  # share of items answered without the LLM
+        "answered_accuracy": round(answered_correct / answered, 4) if answered else 0.0,
+        "latency_ms_p50": round(float(np.percentile(latencies, 50)), 3) if latencies else 0.0,
+        "latency_ms_p99": round(float(np.percentile(latencies, 99)), 3) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--test-split", type=float, default=0.2)
+    parser.add_argument("--out", type=Path, default=LOCAL_CLASSIFIER_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    examples = load_examples()
+    labels = [label for _, _, label in examples]
+    print(f"Cache entries with LLM verdicts: {len(examples)} "
+          f"(malicious={sum(labels)}, benign={len(labels) - sum(labels)})")
+    if len(set(labels)) < 2:
+        print("Need both benign and malicious verdicts in the cache to train - run more traffic first.")
+        sys.exit(1)
+
+    random.Random(args.seed).shuffle(examples)
+    n_test = int(len(examples) * args.test_split)
+    test, train = examples[:n_test], examples[n_test:]
+
+    start = time.perf_counter()
+    model = LocalClassifier.fit(
+        [t for t, _, _ in train], [y for _, _, y in train], [r for _, r, _ in train], epochs=args.epochs
+    )
+    train_seconds = time.perf_counter() - start
+    model.save(args.out)
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "artifact": str(args.out),
+        "train_samples": len(train),
+        "train_seconds": round(train_seconds, 2),
+        "train": evaluate(model, train, LOCAL_CLASSIFIER_THRESHOLD),
+        "test": evaluate(model, test, LOCAL_CLASSIFIER_THRESHOLD) if test else None,
+    }
+    REPORT_FILE.parent.mkdir(exist_ok=True)
+    REPORT_FILE.write_text(json.dumps(report, indent=2))
+
+    print(json.dumps(report, indent=2))
+    print(f"\nModel saved to {args.out}, report to {REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
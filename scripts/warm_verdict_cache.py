@@ -0,0 +1,167 @@
+"""
+Precompute verdicts for a corpus and ship them as a verdict-cache warm-up artifact.
+
+Runs the full pipeline (rule engine, RAG, local classifier, LLM) over the
+corpus in bulk and writes every cacheable
+verdict, keyed by canonical request (backends/cache_backend.py), to
+CACHE_WARMUP_FILE. The API serves that file under its live cache from import on,
+so the first requests of a fresh deploy already hit.
+
+Sources (any combination, deduplicated by canonical key):
+    --csic                CSIC 2010 rows (Hugging Face datasets)
+    --jsonl PATH          one request per line: a JSON string or an object with raw_request / request / text
+    --audit-log PATH      replay soc_audit.log records (their raw_request)
+
+The live LLM policy (MONITOR sampling, batch and per-second item caps) is
+replaced by one that admits every item: only the scheduler's Groq RPM/TPM
+limits pace the run. Degraded items (deadline, LLM errors) are not cached, so
+they are missing from the artifact; re-running resumes from the existing
+artifact and retries only what is missing.
+
+Usage:
+    python scripts/warm_verdict_cache.py --csic --limit 5000 [--batch-size 32] [--concurrency 4]
+    python scripts/warm_verdict_cache.py --audit-log soc_audit.log --jsonl extra.jsonl
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent))
+
+import backends.llm_policy as llm_policy
+from backends.cache_backend import CACHE_WARMUP_FILE, _make_key, cache_get, deferred_saves, read_warmup, save_warmup
+from backends.llm_policy import LLMPolicy
+
+CHECKPOINT_EVERY = 20  # batches between artifact saves
+
+
+def load_jsonl(path: Path) -> list[str]:
+    """Requests from a JSONL file (bare strings or objects with raw_request / request / text)."""
+    texts = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                record = record.get("raw_request") or record.get("request") or record.get("text")
+            if isinstance(record, str) and record.strip():
+                texts.append(record)
+    return texts
+
+
+def load_csic(limit: int = None) -> list[str]:
+    from datasets import load_dataset
+    from seed_rag_from_csic import DATASET_NAME, _detect_columns
+
+    dataset = load_dataset(DATASET_NAME, split="train")
+    col_request, _ = _detect_columns(dataset.column_names)
+    rows = dataset if limit is None else dataset.select(range(min(limit, len(dataset))))
+    return [str(row[col_request]) for row in rows if row.get(col_request)]
+
+
+def offline_policy() -> LLMPolicy:
+    """Admit every item that needs the LLM: no sampling, no batch or per-second caps."""
+    return LLMPolicy(max_items_per_second=10**9, max_per_batch=10**9, monitor_rate=1.0, unknown_rate=1.0)
+
+
+def pending_requests(texts: list[str], done: set) -> list[str]:
+    """First occurrence of every canonical request that has no verdict yet."""
+    seen, pending = set(done), []
+    for text in texts:
+        key = _make_key(text)
+        if key not in seen:
+            seen.add(key)
+            pending.append(text)
+    return pending
+
+
+async def warm(texts: list[str], invoke, batch_size: int = 32, concurrency: int = 4,
+               deadline_ms: float = 60000, checkpoint=None) -> tuple[dict, int]:
+    """
+    Run invoke({"requests": batch, "deadline_ms": ...}) over texts, `concurrency`
+    batches at a time. Returns (canonical key -> cache entry, uncached count).
+    """
+    entries, missed, completed = {}, 0, 0
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.perf_counter()
+
+    async def run(batch: list[str]) -> None:
+        nonlocal missed, completed
+        async with semaphore:
+            await invoke({"requests": batch, "deadline_ms": deadline_ms})
+        for text in batch:
+            entry = cache_get(text)  # written by the pipeline's cache_save node
+            if entry:
+                entries[_make_key(text)] = entry
+            else:
+                missed += 1
+        completed += 1
+        if completed % CHECKPOINT_EVERY == 0 or completed == len(batches):
+            done = sum(len(b) for b in batches[:completed])
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            print(f"  {completed}/{len(batches)} batches, {len(entries)} verdicts, {missed} uncached "
+                  f"({rate:.1f} req/s)")
+            if checkpoint:
+                checkpoint(entries)
+
+    await asyncio.gather(*(run(batch) for batch in batches))
+    return entries, missed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--csic", action="store_true", help="include CSIC 2010 rows")
+    parser.add_argument("--jsonl", type=Path, action="append", default=[], help="JSONL request file (repeatable)")
+    parser.add_argument("--audit-log", type=Path, action="append", default=[], help="audit log to replay (repeatable)")
+    parser.add_argument("--limit", type=int, default=None, help="max requests to run this time")
+    parser.add_argument("--batch-size", type=int, default=32, help="requests per pipeline invocation")
+    parser.add_argument("--concurrency", type=int, default=4, help="pipeline invocations in flight")
+    parser.add_argument("--deadline-ms", type=float, default=60000, help="per-batch budget (offline: generous)")
+    parser.add_argument("--out", type=Path, default=CACHE_WARMUP_FILE)
+    parser.add_argument("--restart", action="store_true", help="ignore the existing artifact")
+    args = parser.parse_args()
+
+    texts, sources = [], []
+    if args.csic:
+        texts += load_csic(args.limit)
+        sources.append("csic")
+    for path in args.jsonl + args.audit_log:
+        texts += load_jsonl(path)
+        sources.append(path.name)
+    if not texts:
+        print("No requests: pass --csic, --jsonl and/or --audit-log")
+        sys.exit(1)
+
+    existing = {} if args.restart else read_warmup(args.out)
+    pending = pending_requests(texts, set(existing))[:args.limit]
+    print(f"{len(texts)} requests from {', '.join(sources)}: {len(existing)} already warm, {len(pending)} to run")
+
+    from graph_app import soc_app  # after arg parsing: importing the graph loads every backend
+
+    llm_policy.policy = offline_policy()  # the scheduler still meters Groq calls
+
+    source = ",".join(sources)
+    started = time.perf_counter()
+    # The artifact is the output: do not rewrite this machine's live cache on every verdict
+    with deferred_saves(persist=False):
+        entries, missed = asyncio.run(warm(
+            pending, soc_app.ainvoke, args.batch_size, args.concurrency, args.deadline_ms,
+            checkpoint=lambda found: save_warmup(args.out, {**existing, **found}, source),
+        ))
+    save_warmup(args.out, {**existing, **entries}, source)
+    print(f"✅ {len(existing) + len(entries)} verdicts in {args.out} "
+          f"(+{len(entries)} in {time.perf_counter() - started:.1f}s, {missed} uncached - re-run to retry)")
+
+
+if __name__ == "__main__":
+    main()
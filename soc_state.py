@@ -1,4 +1,4 @@
-from typing import TypedDict, List, Dict, Any
+from typing import TypedDict, List, Dict, Any, Optional
 
 
 class SOCItem(TypedDict):
@@ -27,10 +27,23 @@ class SOCItem(TypedDict):
     # ===== FINAL =====
     final_msg: str
 
+    # ===== DEGRADED (deadline / fallback) =====
+    degraded: bool
+    degraded_reason: str
+
 
 class SOCState(TypedDict):
     # batch input (initial)
     requests: List[str]
+
+    # latency budget: per-call override (ms) and absolute deadline (time.monotonic)
+    deadline_ms: Optional[float]
+    deadline: Optional[float]
+
+    # tracing: {"debug": true} adds per-node / per-call timings to result_json["debug"];
+    # trace is the running backends.tracing.Trace (None when untraced, and after response)
+    debug: Optional[bool]
+    trace: Any
     
     # decoded items
     items: List[SOCItem]
@@ -0,0 +1,95 @@
+"""Test the async pipeline (soc_app.ainvoke) end to end against the offline stand-ins (no network)"""
+import os
+import sys
+import tempfile
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+os.environ.setdefault("GROQ_API_KEY", "standin")  # the stand-in ignores it
+
+import asyncio
+
+import httpx
+from groq import AsyncGroq
+
+import backends.llm_backend as llm
+import backends.local_classifier as local
+import backends.rag_backend as rag
+import llm_standin_server as standin
+from backends.cache_backend import deferred_saves
+from backends.embedders import HashingEmbedder
+from backends.numpy_index import NumpyIndex
+from graph_app import INTERNAL_STATE_KEYS, public_state, soc_app
+
+EXAMPLES = [
+    ("GET /tienda1/publico/anadir.jsp?id=1+UNION+SELECT+password+FROM+users", True, "SQL Injection"),
+    ("GET /tienda1/publico/buscar.jsp?q=<script>alert(1)</script>", True, "Cross-Site Scripting"),
+    ("GET /tienda1/index.jsp", False, None),
+]
+
+
+def _standin_client() -> AsyncGroq:
+    """AsyncGroq talking to the stand-in app in-process (ASGI transport)."""
+    transport = httpx.ASGITransport(app=standin.app)
+    return AsyncGroq(api_key="standin", base_url="http://standin", max_retries=0,
+                     http_client=httpx.AsyncClient(transport=transport, base_url="http://standin"))
+
+
+def _requests(tag: str) -> list[str]:
+    # Unique per run: never answered from the persisted verdict cache
+    return [
+        f"GET /home.jsp?session={tag}",
+        f"GET /a.jsp?id=1 UNION SELECT password FROM users--{tag}",
+        f"GET /file.jsp?path=../../etc/passwd&t={tag}",
+    ]
+
+
+def test_ainvoke_runs_the_async_pipeline():
+    saved = (llm.async_client, rag.embedder, rag.embedding_cache, rag.vector_index, rag.RAG_RETRIEVAL,
+             local._MODEL, local._LOADED)
+    standin.STANDIN_LATENCY_MS, standin.STANDIN_429_RATE, standin.STANDIN_5XX_RATE = "fixed:5", 0.0, 0.0
+    standin.STANDIN_RPM, standin.STANDIN_TPM = 0, 0  # other suites leave enforced limits behind
+    standin._stats.clear()
+    with tempfile.TemporaryDirectory() as tmp, deferred_saves(persist=False):
+        try:
+            llm.async_client = _standin_client()
+            rag.embedder, rag.embedding_cache, rag.RAG_RETRIEVAL = HashingEmbedder(), None, "dense"
+            rag.vector_index, rag._stored_families = NumpyIndex(Path(tmp), rag.embedder.dim), None
+            local._MODEL, local._LOADED = None, True  # no trained artifact: REVIEW items reach the LLM
+            for text, anomalous, attack_type in EXAMPLES:
+                rag.add_rag_example(text, anomalous, attack_type)
+
+            async def run():
+                # Concurrent requests share the event loop (and coalesced retrieval)
+                return await asyncio.gather(*(
+                    soc_app.ainvoke({"requests": _requests(uuid.uuid4().hex[:8]), "deadline_ms": 5000})
+                    for _ in range(3)
+                ))
+
+            outputs = asyncio.run(run())
+        finally:
+            (llm.async_client, rag.embedder, rag.embedding_cache, rag.vector_index, rag.RAG_RETRIEVAL,
+             local._MODEL, local._LOADED) = saved
+            rag._stored_families = None
+
+    for out in outputs:
+        benign, sqli, traversal = out["result_json"]["results"]
+        assert sqli["route"] == "fast" and sqli["source"] == "rule_engine" and sqli["risk_score"] > 0
+        assert traversal["route"] == "fast"
+        # The REVIEW item went through the async LLM path (stand-in answered, nothing degraded)
+        assert benign["source"] == "llm_explainer" and benign["llm_model"] in llm.LLM_CASCADE
+        assert not any(r["degraded"] for r in out["result_json"]["results"])
+        assert all(item["rag_context"] for item in out["items"])
+        # The API response keeps its shape: no deadline, trace or request options
+        assert not set(public_state(out)) & set(INTERNAL_STATE_KEYS) and "result_json" in public_state(out)
+    assert sum(model["ok"] for model in standin._stats.values()) >= 3
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll async pipeline tests passed")
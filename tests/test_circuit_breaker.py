@@ -0,0 +1,315 @@
+"""Test per-dependency circuit breakers and degraded fast-fail on retrieval (no network)"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("GROQ_API_KEY", "standin")  # the Groq client needs a key at import
+
+import asyncio
+
+import httpx
+from groq import APITimeoutError
+
+import backends.llm_backend as llm
+import backends.rag_backend as rag
+from backends.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, counts_as_failure
+from backends.deadline import DeadlineExceeded, budget_bounded
+from backends.embedders import HashingEmbedder
+from nodes.nodes_rag import arag_node, rag_node
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class DownQdrant:
+    """Every client method fails like an unreachable server."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            self.calls += 1
+            raise ConnectionRefusedError("qdrant: connection refused")
+        return fail
+
+
+class DownAsyncQdrant(DownQdrant):
+    def __getattr__(self, name):
+        async def fail(*args, **kwargs):
+            self.calls += 1
+            raise ConnectionRefusedError("qdrant: connection refused")
+        return fail
+
+
+def _fail(breaker, exc):
+    try:
+        breaker.call(lambda: (_ for _ in ()).throw(exc))
+    except type(exc):
+        pass
+
+
+def test_opens_on_failure_rate_and_recovers_through_half_open():
+    clock = FakeClock()
+    b = CircuitBreaker("dep", failure_rate=0.5, min_calls=4, window=10, open_seconds=5, clock=clock)
+    b.call(lambda: 1)
+    _fail(b, ConnectionError("down"))
+    _fail(b, ConnectionError("down"))
+    assert b.state == CLOSED  # 3 calls: below min_calls
+    _fail(b, TimeoutError("slow"))
+    assert b.state == OPEN  # 3 failures / 4 calls
+
+    try:
+        b.call(lambda: 1)
+        assert False, "open breaker let a call through"
+    except CircuitOpen as e:
+        assert "TimeoutError" in str(e)
+
+    clock.now = 5
+    assert b.state == HALF_OPEN
+    _fail(b, ConnectionError("still down"))  # failed probe: open again for open_seconds
+    assert b.state == OPEN
+    clock.now = 10
+    assert b.call(lambda: "ok") == "ok"
+    assert b.state == CLOSED and b.stats()["window_calls"] == 0
+    assert b.stats()["opened"] == 2
+
+
+def test_old_outcomes_leave_the_window():
+    clock = FakeClock()
+    b = CircuitBreaker("dep", failure_rate=0.6, min_calls=2, window=10, clock=clock)
+    _fail(b, ConnectionError("blip"))
+    clock.now = 11
+    b.call(lambda: 1)
+    _fail(b, ConnectionError("blip"))
+    assert b.state == CLOSED  # 1 failure in 2 calls: the first one is out of the window
+    _fail(b, ConnectionError("blip"))
+    assert b.state == OPEN
+
+
+def test_only_dependency_faults_count():
+    assert counts_as_failure(ConnectionError("refused"))
+    assert counts_as_failure(HTTPError(503)) and counts_as_failure(HTTPError(429))
+    assert not counts_as_failure(HTTPError(400)) and not counts_as_failure(HTTPError(404))
+    assert not counts_as_failure(DeadlineExceeded("request budget spent"))
+    try:
+        raise DeadlineExceeded("no budget left to retry") from HTTPError(502)
+    except DeadlineExceeded as e:
+        assert counts_as_failure(e)
+    assert not counts_as_failure(CircuitOpen("open"))
+    assert not counts_as_failure(asyncio.CancelledError())
+
+    b = CircuitBreaker("dep", failure_rate=0.5, min_calls=2)
+    for _ in range(5):
+        _fail(b, HTTPError(400))
+    assert b.state == CLOSED and b.stats()["window_calls"] == 0
+
+
+def test_half_open_admits_limited_probes():
+    clock = FakeClock()
+    b = CircuitBreaker("dep", failure_rate=0.5, min_calls=1, open_seconds=1, half_open_probes=1, clock=clock)
+    _fail(b, ConnectionError("down"))
+    clock.now = 1
+    b.before()  # the probe
+    try:
+        b.before()
+        assert False, "second probe admitted"
+    except CircuitOpen:
+        pass
+    b.after()
+    assert b.state == CLOSED
+
+    async def probe():
+        return "ok"
+    assert asyncio.run(b.acall(probe)) == "ok"
+
+
+def test_open_breaker_fails_fast():
+    b = CircuitBreaker("dep", failure_rate=0.5, min_calls=1, open_seconds=60)
+    _fail(b, ConnectionError("down"))
+    started = time.perf_counter()
+    for _ in range(1000):
+        try:
+            b.call(lambda: 1)
+        except CircuitOpen:
+            pass
+    assert (time.perf_counter() - started) / 1000 < 1e-3
+    assert b.stats()["short_circuited"] == 1000
+
+
+def _items():
+    return [
+        {"raw_request": "GET /a.jsp?id=1 UNION SELECT pass FROM users", "attack_type": "SQL Injection",
+         "rule_score": 9, "attack_candidates": [{"type": "SQL Injection", "score": 9}]},
+        {"raw_request": "GET /home.jsp", "attack_type": "None", "rule_score": 0, "attack_candidates": []},
+        {"raw_request": "GET /cached.jsp", "cache_hit": True},
+    ]
+
+
+def test_rag_node_degrades_when_qdrant_is_down():
+    saved = (rag.client, rag.async_client, rag.embedder, rag.embedding_cache, rag.vector_index,
+             rag.RAG_RETRIEVAL, rag._collection_ready, rag._qdrant_breaker.min_calls)
+    down, adown = DownQdrant(), DownAsyncQdrant()
+    rag.client, rag.async_client, rag.embedder, rag.embedding_cache, rag.vector_index = (
+        down, adown, HashingEmbedder(), None, None)
+    rag.RAG_RETRIEVAL, rag._collection_ready, rag._stored_families = "dense", False, None
+    rag._qdrant_breaker.reset()
+    rag._qdrant_breaker.min_calls = 2
+    try:
+        for _ in range(2):
+            state = rag_node({"items": _items(), "deadline": None})
+        assert rag._qdrant_breaker.state == OPEN
+        calls = down.calls
+
+        state = rag_node({"items": _items(), "deadline": None})
+        assert down.calls == calls  # open: Qdrant not even tried
+        attack, benign, cached = state["items"]
+        assert attack["degraded"] and "circuit open" in attack["degraded_reason"]
+        assert attack["attack_type"] == "SQL Injection" and attack["rule_score"] == 9  # rule verdict kept
+        assert benign["degraded"] and benign["rag_context"] == ""
+        assert not cached.get("degraded")
+
+        state = asyncio.run(arag_node({"items": _items(), "deadline": None}))
+        assert adown.calls == 0 and all(item["rag_context"] == "" for item in state["items"])
+        assert "retrieval unavailable" in state["items"][0]["degraded_reason"]
+    finally:
+        (rag.client, rag.async_client, rag.embedder, rag.embedding_cache, rag.vector_index,
+         rag.RAG_RETRIEVAL, rag._collection_ready, rag._qdrant_breaker.min_calls) = saved
+        rag._stored_families = None
+        rag._qdrant_breaker.reset()
+
+
+def _timed_out(timeout, cap):
+    try:
+        with budget_bounded(timeout, cap):
+            raise TimeoutError("slow")
+    except TimeoutError as e:
+        return e
+
+
+def test_timeouts_shortened_by_the_request_budget_are_neutral():
+    assert counts_as_failure(_timed_out(5.0, 5.0))  # the full stage cap was used
+    assert not counts_as_failure(_timed_out(0.3, 5.0))
+    try:
+        raise DeadlineExceeded("no budget left to retry") from _timed_out(0.3, 5.0)
+    except DeadlineExceeded as e:
+        assert not counts_as_failure(e)
+    try:
+        with budget_bounded(0.3, 5.0):
+            raise ConnectionRefusedError("down")  # not a timeout: still a fault
+    except ConnectionRefusedError as e:
+        assert counts_as_failure(e)
+
+
+class SlowQdrant:
+    """Searches take `delay` seconds (the server is healthy, just not instant)."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def query_batch_points(self, **kwargs):
+        time.sleep(self.delay)
+        return []
+
+
+class AsyncSlowQdrant(SlowQdrant):
+    async def query_batch_points(self, **kwargs):
+        await asyncio.sleep(self.delay)
+        return []
+
+
+def test_short_deadlines_do_not_open_the_qdrant_breaker():
+    saved = (rag.client, rag.async_client, rag.QDRANT_TIMEOUT, rag._qdrant_breaker.min_calls)
+    rag.client, rag.async_client = SlowQdrant(0.3), AsyncSlowQdrant(0.3)
+    rag._qdrant_breaker.reset()
+    rag._qdrant_breaker.min_calls = 2
+
+    def search(budget=None):
+        def deadline():  # fresh per call, like two separate requests
+            return budget and time.monotonic() + budget
+
+        try:
+            rag._query_batch([[0.0]], 1, [()], deadline=deadline())
+            assert False, "slow search returned"
+        except TimeoutError:
+            pass
+        try:
+            asyncio.run(rag._aquery_batch([[0.0]], 1, [()], deadline=deadline()))
+            assert False, "slow search returned"
+        except TimeoutError:
+            pass
+
+    try:
+        for _ in range(3):  # a client sending deadline_ms=100
+            search(0.1)
+        assert rag._qdrant_breaker.state == CLOSED and rag._qdrant_breaker.stats()["window_calls"] == 0
+
+        rag.QDRANT_TIMEOUT = 0.1  # the stage's own cap is what runs out: Qdrant is slow
+        search()
+        assert rag._qdrant_breaker.state == OPEN
+    finally:
+        rag.client, rag.async_client, rag.QDRANT_TIMEOUT, rag._qdrant_breaker.min_calls = saved
+        rag._qdrant_breaker.reset()
+
+
+class SlowCompletions:
+    """Fake chat.completions answering in `latency` seconds; times out like the Groq client."""
+
+    def __init__(self, latency):
+        self.latency, self.calls = latency, 0
+
+    def create(self, timeout, **kwargs):
+        self.calls += 1
+        time.sleep(min(self.latency, timeout))
+        if self.latency > timeout:
+            raise APITimeoutError(request=httpx.Request("POST", "http://standin/chat/completions"))
+        raise AssertionError("the fake LLM is only used to time out")
+
+
+def test_short_deadlines_do_not_open_the_groq_breaker():
+    completions = SlowCompletions(0.5)
+    saved = (llm.client, llm.LLM_TIMEOUT, llm.scheduler.max_retries, llm._groq_breaker.min_calls)
+    llm.client = type("Client", (), {"chat": type("Chat", (), {"completions": completions})()})()
+    llm._groq_breaker.reset()
+    llm._groq_breaker.min_calls = 3
+    messages = [{"role": "user", "content": "GET /index.jsp"}]
+    try:
+        for _ in range(6):  # deadline_ms=300 against a healthy 500 ms model
+            try:
+                llm._complete(messages, 10, deadline=time.monotonic() + 0.3)
+                assert False, "slow completion returned"
+            except (APITimeoutError, DeadlineExceeded):
+                pass
+        assert llm._groq_breaker.state == CLOSED and llm._groq_breaker.stats()["window_calls"] == 0
+
+        llm.LLM_TIMEOUT, llm.scheduler.max_retries = 0.1, 0  # the full stage cap runs out
+        for _ in range(3):
+            try:
+                llm._complete(messages, 10)
+            except APITimeoutError:
+                pass
+        assert llm._groq_breaker.state == OPEN
+    finally:
+        llm.client, llm.LLM_TIMEOUT, llm.scheduler.max_retries, llm._groq_breaker.min_calls = saved
+        llm._groq_breaker.reset()
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll circuit breaker tests passed")
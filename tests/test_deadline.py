@@ -0,0 +1,90 @@
+"""Test the per-request latency budget: stage timeouts and the rule-verdict fallback (no network)"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("GROQ_API_KEY", "standin")  # the Groq client needs a key at import
+
+import asyncio
+
+import backends.llm_backend as llm
+from backends.deadline import MIN_STAGE_BUDGET, DeadlineExceeded, make_deadline, remaining, timeout_for
+from nodes.nodes_llm import allm_node, llm_node
+
+
+def test_make_deadline():
+    assert make_deadline(0) is None and make_deadline(-5) is None
+    left = remaining(make_deadline(2000))
+    assert 1.9 < left <= 2.0
+    assert remaining(None) is None
+
+
+def test_timeout_for_clamps_to_the_remaining_budget():
+    assert timeout_for(None, 30.0) == 30.0  # no deadline: the stage cap
+    assert timeout_for(time.monotonic() + 60, 5.0) == 5.0  # budget larger than the cap
+
+    timeout = timeout_for(time.monotonic() + 0.5, 5.0)
+    assert 0.4 < timeout <= 0.5  # budget smaller than the cap
+
+    for deadline in (time.monotonic() - 1, time.monotonic() + MIN_STAGE_BUDGET / 2):
+        try:
+            timeout_for(deadline, 5.0, "llm")
+            assert False, "spent budget returned a timeout"
+        except DeadlineExceeded as e:
+            assert str(e) == "llm: request deadline exceeded"
+
+
+class CountingCompletions:
+    """Fake chat.completions: counts calls (none expected once the budget is spent)."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        raise AssertionError("the LLM was called after the deadline")
+
+
+class AsyncCountingCompletions(CountingCompletions):
+    async def create(self, **kwargs):
+        return super().create(**kwargs)
+
+
+class FakeClient:
+    def __init__(self, completions):
+        self.chat = type("Chat", (), {"completions": completions})()
+
+
+def _state(deadline):
+    item = {
+        "id": "r1", "raw_request": "GET /search.jsp?q=abc", "rag_context": "", "blocked": False,
+        "cache_hit": False, "final_msg": None, "attack_type": "None", "rule_score": 1, "severity": "Low",
+    }
+    return {"items": [item], "deadline": deadline}
+
+
+def test_expired_budget_returns_the_rule_verdict_without_calling_the_llm():
+    completions, acompletions = CountingCompletions(), AsyncCountingCompletions()
+    saved = (llm.client, llm.async_client)
+    llm.client, llm.async_client = FakeClient(completions), FakeClient(acompletions)
+    try:
+        state = llm_node(_state(time.monotonic() - 0.1))
+        astate = asyncio.run(allm_node(_state(time.monotonic() - 0.1)))
+    finally:
+        llm.client, llm.async_client = saved
+
+    assert completions.calls == 0 and acompletions.calls == 0
+    for item in (state["items"][0], astate["items"][0]):
+        assert item["degraded"] and "deadline exceeded" in item["degraded_reason"]
+        assert item["final_msg"].startswith("[RULE] None | Score=1 | Severity=Low")
+        assert item["llm_output"]["error"].startswith("DeadlineExceeded")
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll deadline tests passed")
@@ -0,0 +1,45 @@
+"""Test the in-process hashing embedder (no API needed)"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from backends.embedders import VECTOR_SIZE, HashingEmbedder, get_embedder
+
+
+def test_shape_and_norm():
+    vec = np.array(HashingEmbedder().embed("GET /api/users?id=1"))
+    assert vec.shape == (VECTOR_SIZE,)
+    assert abs(np.linalg.norm(vec) - 1.0) < 1e-5
+    assert not np.any(HashingEmbedder().embed_array("ab"))  # shorter than any n-gram
+
+
+def test_similar_payloads_are_closer():
+    emb = HashingEmbedder()
+    sqli = emb.embed_array("id=1 UNION SELECT password FROM users")
+    sqli2 = emb.embed_array("id=7 union select name from accounts")
+    static = emb.embed_array("GET /static/css/site.css")
+    assert sqli @ sqli2 > sqli @ static + 0.2
+
+
+def test_deterministic_across_instances():
+    text = "<script>alert(1)</script>"
+    assert HashingEmbedder().embed(text) == HashingEmbedder().embed(text)
+
+
+def test_unknown_engine_rejected():
+    try:
+        get_embedder("word2vec")
+        assert False, "expected an error"
+    except Exception as e:
+        assert "Unknown EMBEDDER" in str(e)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll embedder tests passed")
@@ -0,0 +1,115 @@
+"""Test the memmap-backed embedding cache (no API needed)"""
+import multiprocessing
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from backends.embedding_cache import EmbeddingCache
+
+
+def test_hit_after_put_with_normalized_key():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(Path(tmp) / "emb", dim=4, capacity=8)
+        assert cache.get("GET /home") is None
+        cache.put("GET /home", [1, 2, 3, 4])
+        assert np.array_equal(cache.get("  get   /HOME "), np.float32([1, 2, 3, 4]))
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_survives_restart():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(Path(tmp) / "emb", dim=4, capacity=8)
+        cache.put("id=1 UNION SELECT", [0.5, 0, 0, 0.5])
+        cache.flush()
+
+        reopened = EmbeddingCache(Path(tmp) / "emb", dim=4, capacity=8)
+        assert np.allclose(reopened.get("id=1 union select"), [0.5, 0, 0, 0.5])
+        assert reopened.stats()["size"] == 1
+
+
+def test_bounded_ring_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(Path(tmp) / "emb", dim=2, capacity=3)
+        for i in range(5):
+            cache.put(f"req {i}", [i, i])
+        assert cache.stats()["size"] == 3
+        assert cache.stats()["evictions"] == 2
+        assert cache.get("req 0") is None and cache.get("req 1") is None
+        assert np.allclose(cache.get("req 4"), [4, 4])
+
+
+def test_shape_change_starts_fresh():
+    with tempfile.TemporaryDirectory() as tmp:
+        EmbeddingCache(Path(tmp) / "emb", dim=2, capacity=3).put("x", [1, 1])
+        cache = EmbeddingCache(Path(tmp) / "emb", dim=4, capacity=3)
+        assert cache.get("x") is None
+        cache.put("bad", [1, 2])  # wrong dimension is never cached
+        assert cache.stats()["size"] == 0
+
+
+def test_restart_resumes_at_the_oldest_slot():
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EmbeddingCache(Path(tmp) / "emb", dim=2, capacity=3)
+        for i in range(5):  # slots: req 3, req 4, req 2 (oldest)
+            cache.put(f"req {i}", [i, i])
+
+        reopened = EmbeddingCache(Path(tmp) / "emb", dim=2, capacity=3)
+        reopened.put("req 5", [5, 5])
+        assert reopened.get("req 2") is None  # the oldest entry went, not a recent one
+        assert all(reopened.get(f"req {i}") is not None for i in (3, 4, 5))
+
+
+def test_instances_sharing_the_files_stay_consistent():
+    # Two instances on one path behave like two uvicorn workers
+    with tempfile.TemporaryDirectory() as tmp:
+        a = EmbeddingCache(Path(tmp) / "emb", dim=2, capacity=2)
+        b = EmbeddingCache(Path(tmp) / "emb", dim=2, capacity=2)
+        a.put("x", [1, 1])
+        b.put("y", [2, 2])  # b catches up first: takes the next slot, not x's
+        assert np.allclose(a.get("x"), [1, 1]) and np.allclose(a.get("y"), [2, 2])
+
+        b.put("z", [3, 3])  # recycles x's slot behind a's back
+        assert a.get("x") is None  # never z's vector
+        assert np.allclose(a.get("z"), [3, 3])
+        assert a.stats()["size"] == b.stats()["size"] == 2
+
+
+def _put_range(path, worker, ready):
+    cache = EmbeddingCache(path, dim=2, capacity=64)
+    ready.wait()  # every worker has opened the files before anyone writes
+    for i in range(16):
+        cache.put(f"worker {worker} req {i}", [worker, i])
+    cache.flush()
+
+
+def test_concurrent_worker_processes():
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return  # POSIX only, like the file lock
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "emb"
+        EmbeddingCache(path, dim=2, capacity=64)
+        ctx = multiprocessing.get_context("fork")
+        ready = ctx.Barrier(4)
+        workers = [ctx.Process(target=_put_range, args=(path, w, ready)) for w in range(4)]
+        for p in workers:
+            p.start()
+        for p in workers:
+            p.join()
+
+        cache = EmbeddingCache(path, dim=2, capacity=64)
+        assert cache.stats()["size"] == 64
+        for w in range(4):
+            for i in range(16):
+                assert np.allclose(cache.get(f"worker {w} req {i}"), [w, i])
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll embedding cache tests passed")
@@ -0,0 +1,115 @@
+"""Test the BM25 char n-gram lexical index and lexical / hybrid retrieval (no network)"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import asyncio
+
+import backends.rag_backend as rag
+from backends.embedders import HashingEmbedder
+from backends.lexical_index import LexicalIndex, lexical_text
+from backends.numpy_index import NumpyIndex
+import benchmark_lexical_retrieval as bench
+
+TEMPLATE = "GET /tienda1/publico/anadir.jsp?id={i}&nombre=Jam%F3n&precio={p}&B1=A%F1adir HTTP/1.1"
+
+
+def _payloads():
+    rows = [{"raw_request": TEMPLATE.format(i=i, p=i * 7), "label": "normal", "attack_type": "normal"}
+            for i in range(30)]
+    rows += [
+        {"raw_request": "GET /tienda1/publico/anadir.jsp?id=1+UNION+SELECT+password+FROM+users HTTP/1.1",
+         "label": "anomalous", "attack_type": "SQL Injection"},
+        {"raw_request": "GET /tienda1/miembros/editar.jsp?email=a'+or+'1'='1 HTTP/1.1",
+         "label": "anomalous", "attack_type": "SQL Injection"},
+        {"raw_request": "GET /tienda1/imagenes/../../../../etc/passwd HTTP/1.1",
+         "label": "anomalous", "attack_type": "Directory Traversal"},
+        {"raw_request": "POST /tienda1/publico/registro.jsp\n\nnombre=<script>alert(document.cookie)</script>",
+         "label": "anomalous", "attack_type": "Cross-Site Scripting"},
+    ]
+    return rows
+
+
+def test_lexical_text_normalizes_encoding_digits_and_case():
+    assert lexical_text("GET /a?id=12%20UNION+Select  1") == "get /a?id=0 union select 0"
+
+
+def test_exact_payload_tokens_rank_first():
+    index = LexicalIndex.build(_payloads())
+    top = index.search(["GET /tienda1/publico/vaciar.jsp?B2=x'+UNION+SELECT+1 HTTP/1.1"], 3)[0]
+    assert top[0][0]["attack_type"] == "SQL Injection"
+
+    top = index.search(["GET /tienda1/publico/autenticar.jsp?file=..%2F..%2F..%2Fboot.ini HTTP/1.1"], 1)[0]
+    assert top[0][0]["attack_type"] == "Directory Traversal"
+
+    # Family filter, and no n-gram in common -> no hits at all
+    assert {p["attack_type"] for p, _ in index.search(["union select"], 5, [("Cross-Site Scripting",)])[0]} <= {"Cross-Site Scripting"}
+    assert index.search(["zzzzzzzz"], 3) == [[]]
+    assert index.families == {"normal", "SQL Injection", "Directory Traversal", "Cross-Site Scripting"}
+
+
+def test_save_load_round_trip():
+    index = LexicalIndex.build(_payloads())
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "lex.npz"
+        index.save(path)
+        loaded = LexicalIndex.load(path)
+    assert loaded.stats() == index.stats()
+    query = ["GET /x.jsp?q=<script>alert(1)</script>"]
+    assert loaded.search(query, 2) == index.search(query, 2)
+
+
+def test_rrf_fuse_prefers_examples_found_by_both():
+    a, b, c = ({"raw_request": x} for x in "abc")
+    fused = rag.rrf_fuse([a, b], [c, b], 2)
+    assert fused[0] is b and len(fused) == 2
+
+
+def test_lexical_mode_needs_no_embedding():
+    saved = rag.RAG_RETRIEVAL, rag.lexical_index, rag.embedder
+    rag.RAG_RETRIEVAL, rag.lexical_index, rag.embedder = "lexical", LexicalIndex.build(_payloads()), None
+    try:
+        query = "GET /tienda1/publico/pagar.jsp?modo=1+union+select+2 HTTP/1.1"
+        hits = rag.vector_search(query, k=2)
+        assert hits[0]["attack_type"] == "SQL Injection"
+        # Rule families scope the BM25 search too, topped up when short
+        query = "GET /tienda1/imagenes/logo.jsp?id=1+union+select+2 HTTP/1.1"
+        hits = rag.vector_search(query, k=2, attack_candidates=[{"type": "Directory Traversal", "score": 5}])
+        assert [h["attack_type"] for h in hits] == ["Directory Traversal", "SQL Injection"]
+        assert asyncio.run(rag.avector_search(query, k=1))[0]["attack_type"] == "SQL Injection"
+        # A family the corpus does not store is not filtered on (no empty search + top-up)
+        fallbacks = rag.rag_filter_stats()["fallbacks"]
+        hits = rag.vector_search(query, k=2, attack_candidates=[{"type": "Command Injection", "score": 5}])
+        assert hits == rag.vector_search(query, k=2)
+        assert rag.rag_filter_stats()["fallbacks"] == fallbacks
+    finally:
+        rag.RAG_RETRIEVAL, rag.lexical_index, rag.embedder = saved
+
+
+def test_benchmark_reports_every_mode():
+    payloads = _payloads()
+    embedder = HashingEmbedder()
+    with tempfile.TemporaryDirectory() as tmp:
+        dense = NumpyIndex(Path(tmp), embedder.dim)
+        dense.upsert([str(i) for i in range(len(payloads))],
+                     embedder.embed_batch([p["raw_request"] for p in payloads]), payloads)
+        report = bench.run_benchmark(
+            payloads, payloads[-4:], k=2,
+            embed=lambda text: embedder.embed_batch([text])[0],
+            search=lambda vector, limit: [p for p, _ in dense.search([vector], limit)[0]],
+        )
+    assert set(report["modes"]) == {"dense", "lexical", "hybrid"}
+    assert report["modes"]["dense"]["overlap@2"] == 1.0
+    for row in report["modes"].values():
+        assert 0.0 <= row["label@2"] <= 1.0 and row["p50_ms"] >= 0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll lexical retrieval tests passed")
@@ -0,0 +1,119 @@
+"""Test the LLM model cascade: escalation thresholds, tier merging, per-tier stats (no network)"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("GROQ_API_KEY", "standin")  # the Groq client needs a key at import
+
+import backends.llm_backend as llm
+
+CASCADE = ["small-model", "large-model"]
+
+
+def _verdict(verdict="benign", confidence=0.95, **extra):
+    return {"analysis": f"{verdict} analysis", "verdict": verdict, "confidence": confidence, **extra}
+
+
+def _with_cascade(fn):
+    saved = (llm.LLM_CASCADE, llm.LLM_ESCALATE_CONFIDENCE, dict(llm._TIER_STATS))
+    llm.LLM_CASCADE, llm.LLM_ESCALATE_CONFIDENCE = CASCADE, 0.8
+    llm._TIER_STATS.clear()
+    try:
+        return fn()
+    finally:
+        llm.LLM_CASCADE, llm.LLM_ESCALATE_CONFIDENCE, stats = saved
+        llm._TIER_STATS.clear()
+        llm._TIER_STATS.update(stats)
+
+
+def test_default_is_the_active_model_alone():
+    if "LLM_CASCADE" not in os.environ:  # opt-in: upgrading never switches the first-tier model
+        assert llm.LLM_CASCADE == [llm.MODEL_NAME]
+
+
+def test_should_escalate_thresholds():
+    def check():
+        assert not llm._should_escalate(_verdict(confidence=0.95))
+        assert not llm._should_escalate(_verdict(confidence=0.8))  # at the threshold: confident enough
+        assert llm._should_escalate(_verdict(confidence=0.79))
+        assert llm._should_escalate(_verdict(confidence=None))
+        assert llm._should_escalate(_verdict("malicious", confidence=0.99))
+        assert llm._should_escalate(_verdict(verdict=None))
+        assert llm._should_escalate({"error": "no structured verdict", "model": "small-model"})
+    _with_cascade(check)
+
+
+def test_merge_tier_escalates_and_records():
+    def check():
+        results = [None] * 4
+        tier0 = [_verdict(), _verdict(confidence=0.5), _verdict("malicious"), {"error": "no structured verdict"}]
+        escalate = llm._merge_tier(results, [0, 1, 2, 3], tier0, 0)
+        assert escalate == [1, 2, 3]
+        assert all(r["tier"] == 0 for r in results)
+
+        tier1 = [_verdict("benign", None), _verdict("malicious", None), _verdict("benign", None)]
+        assert llm._merge_tier(results, escalate, tier1, 1) == []  # the last tier never escalates
+        assert [r["tier"] for r in results] == [0, 1, 1, 1]
+        assert results[2]["verdict"] == "malicious"
+    _with_cascade(check)
+
+
+def test_failed_escalation_keeps_the_previous_verdict():
+    def check():
+        results = [None] * 2
+        llm._merge_tier(results, [0, 1], [_verdict(confidence=0.5), {"error": "no structured verdict"}], 0)
+        llm._merge_tier(results, [0, 1], [{"error": "RateLimitError: 429"}, {"error": "APITimeoutError: slow"}], 1)
+
+        kept, failed = results
+        assert kept["tier"] == 0 and kept["analysis"] == "benign analysis"
+        assert kept["escalation_error"] == "RateLimitError: 429"
+        # Nothing usable from tier 0 either: the final error stands (rule fallback downstream)
+        assert failed == {"error": "APITimeoutError: slow", "tier": 1}
+    _with_cascade(check)
+
+
+def test_batch_keeps_tier0_when_escalation_fails():
+    def fake_packed(entries, deadline=None, model=llm.MODEL_NAME, final=True):
+        if model == "large-model":
+            raise ConnectionError("large model down")
+        return [_verdict(confidence=0.95) if "home" in e["query"] else _verdict("malicious", 0.9)
+                for e in entries]
+
+    def run():
+        saved = llm.llm_analyze_packed
+        llm.llm_analyze_packed = fake_packed
+        try:
+            return llm.llm_analyze_batch([
+                {"query": "GET /home.jsp", "rag_context": ""},
+                {"query": "GET /a.jsp?id=1 UNION SELECT 1", "rag_context": ""},
+            ]), llm.cascade_stats()
+        finally:
+            llm.llm_analyze_packed = saved
+
+    (benign, malicious), stats = _with_cascade(run)
+    assert benign["tier"] == 0 and "escalation_error" not in benign
+    assert malicious["tier"] == 0 and malicious["verdict"] == "malicious"
+    assert malicious["escalation_error"] == "ConnectionError: large model down"
+    assert stats["small-model"]["items"] == 2 and stats["small-model"]["escalated"] == 1
+    assert stats["large-model"]["items"] == 1 and stats["large-model"]["escalated"] == 0
+
+
+def test_cascade_stats_counts_and_latency():
+    def check():
+        llm._record_tier("small-model", calls=1, latency_ms_total=100.0)
+        llm._record_tier("small-model", calls=1, latency_ms_total=50.0, items=3, escalated=1)
+        llm._record_tier("large-model", errors=1)
+        stats = llm.cascade_stats()
+        assert list(stats) == CASCADE
+        assert stats["small-model"] == {"calls": 2, "errors": 0, "items": 3, "escalated": 1, "latency_ms_avg": 75.0}
+        assert stats["large-model"]["errors"] == 1 and stats["large-model"]["latency_ms_avg"] == 0.0
+    _with_cascade(check)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll model cascade tests passed")
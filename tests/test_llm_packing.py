@@ -0,0 +1,115 @@
+"""Test request packing: token-budgeted packs, per-item JSON parsing, per-item fallback (no network)"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("GROQ_API_KEY", "standin")  # the Groq client needs a key at import
+
+import json
+
+import backends.llm_backend as llm
+
+
+def _entries(n, query="GET /tienda1/publico/buscar.jsp?q=abc", rag_context=""):
+    return [{"query": f"{query}&n={i}", "rag_context": rag_context} for i in range(n)]
+
+
+def _verdict(n, verdict="benign", confidence=0.9):
+    return {"item": n, "verdict": verdict, "confidence": confidence, "analysis": f"item {n} analysis"}
+
+
+def test_parse_maps_verdicts_to_items():
+    content = json.dumps([_verdict(2, "malicious", 0.95), _verdict(1)])
+    first, second = llm._parse_packed(content, 2, model="m")
+    assert first["analysis"] == "item 1 analysis" and first["verdict"] == "benign"
+    assert second["verdict"] == "malicious" and second["confidence"] == 0.95
+    assert second["model"] == "m" and second["packed"] == 2
+
+
+def test_parse_ignores_trailing_bracketed_text():
+    # A greedy [.*] match would swallow "[1]" and fail to decode the whole answer
+    content = "Here you go:\n" + json.dumps([_verdict(1), _verdict(2)]) + "\nSee note [1] for details."
+    assert all(llm._parse_packed(content, 2))
+
+
+def test_parse_leaves_missing_and_malformed_items_empty():
+    content = json.dumps([_verdict(1), {"item": 2}, {"item": "x", "analysis": "a"}, _verdict(9), _verdict(1, "malicious")])
+    first, second, third = llm._parse_packed(content, 3)
+    assert first["verdict"] == "benign"  # the duplicate item 1 is ignored
+    assert second is None and third is None
+    assert llm._parse_packed("no json here", 2) == [None, None]
+    assert llm._parse_packed("[{broken", 2) == [None, None]
+    assert llm._parse_packed('{"item": 1}', 1) == [None]
+    assert llm._parse_packed(None, 1) == [None]
+
+
+def test_packs_budget_prompt_and_completion_tokens():
+    entries = _entries(6)
+    base = llm.estimate_tokens(llm.PACKED_SYSTEM_PROMPT)
+    item = llm.estimate_tokens(llm._format_item(0, entries[0]["query"], "")) + llm._PACKED_TOKENS_PER_ITEM
+
+    # Room for exactly two items once their completion tokens are reserved
+    packs = llm.pack_entries(entries, token_budget=base + 2 * item + 1, max_items=10)
+    assert packs == [[0, 1], [2, 3], [4, 5]]
+    for pack in packs:
+        prompt = sum(llm.estimate_tokens(llm._format_item(i, entries[i]["query"], "")) for i in pack)
+        assert base + prompt + llm._PACKED_TOKENS_PER_ITEM * len(pack) <= base + 2 * item + 1
+
+    assert llm.pack_entries(entries, token_budget=100_000, max_items=4) == [[0, 1, 2, 3], [4, 5]]
+    # An entry over budget still gets a pack of its own
+    assert llm.pack_entries(_entries(2, rag_context="x" * 4000), token_budget=500) == [[0], [1]]
+
+
+class FakeCompletions:
+    """Stands in for _complete: packed prompts get `packed`, single prompts `single`."""
+
+    def __init__(self, packed, single):
+        self.packed, self.single, self.calls = packed, single, []
+
+    def __call__(self, messages, max_tokens, priority=0.0, deadline=None, model=llm.MODEL_NAME):
+        is_pack = messages[0]["content"] == llm.PACKED_SYSTEM_PROMPT
+        self.calls.append(("pack" if is_pack else "single", max_tokens))
+        reply = self.packed if is_pack else self.single
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def _with_complete(fake, fn):
+    saved = llm._complete
+    llm._complete = fake
+    try:
+        return fn()
+    finally:
+        llm._complete = saved
+
+
+def test_missing_items_fall_back_to_single_calls():
+    fake = FakeCompletions(json.dumps([_verdict(1), _verdict(3, "malicious")]), "Benign request – single call.")
+    results = _with_complete(fake, lambda: llm.llm_analyze_packed(_entries(3)))
+    assert fake.calls == [("pack", 3 * llm._PACKED_TOKENS_PER_ITEM), ("single", 150)]
+    assert results[0]["packed"] == 3 and results[2]["verdict"] == "malicious"
+    assert results[1] == {"analysis": "Benign request – single call.", "model": llm.MODEL_NAME}
+
+
+def test_failed_fallback_fails_only_that_item():
+    fake = FakeCompletions(json.dumps([_verdict(2)]), ConnectionError("groq down"))
+    first, second = _with_complete(fake, lambda: llm.llm_analyze_packed(_entries(2)))
+    assert first == {"error": "ConnectionError: groq down"}
+    assert second["analysis"] == "item 2 analysis"
+
+
+def test_pre_tier_marks_missing_items_for_escalation():
+    fake = FakeCompletions("[]", "unused")
+    results = _with_complete(fake, lambda: llm.llm_analyze_packed(_entries(2), model="small", final=False))
+    assert fake.calls == [("pack", 2 * llm._PACKED_TOKENS_PER_ITEM)]  # no single-call fallback
+    assert results == [{"error": "no structured verdict", "model": "small"}] * 2
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll request packing tests passed")
@@ -0,0 +1,66 @@
+"""Test the LLM escalation policy (caps, sampling, backlog tightening) without any API"""
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backends.llm_policy import LLMPolicy
+
+
+def _item(decision="REVIEW", severity="Medium", score=3.0, attack_type="SQL Injection"):
+    return {"fast_decision": decision, "severity": severity, "rule_score": score, "attack_type": attack_type}
+
+
+def _admitted(decisions):
+    return [item for item, reason in decisions if not reason]
+
+
+def test_monitor_items_are_sampled():
+    policy = LLMPolicy(max_items_per_second=10**6, max_per_batch=10**6, monitor_rate=0.0, queue_depth=lambda: 0)
+    review, monitor, close_call = _item(), _item("MONITOR", "Low", 1.0), _item("MONITOR", "Low", 2.5)
+    decisions = dict((id(i), r) for i, r in policy.admit([review, monitor, close_call]))
+    assert decisions[id(review)] == ""
+    assert "sampled out" in decisions[id(monitor)]
+    assert decisions[id(close_call)] == ""  # at or above monitor_below_score: not sampled
+
+
+def test_batch_cap_keeps_highest_priority():
+    policy = LLMPolicy(max_items_per_second=10**6, max_per_batch=2, monitor_rate=1.0, queue_depth=lambda: 0)
+    low, high, mid = _item(score=3.0), _item("REVIEW", "High", 4.5), _item(score=4.0)
+    admitted = _admitted(policy.admit([low, high, mid]))
+    assert admitted == [high, mid]
+    assert policy.stats()["batch_capped"] == 1
+
+
+def test_per_second_cap():
+    now = [0.0]
+    policy = LLMPolicy(max_items_per_second=3, max_per_batch=100, queue_depth=lambda: 0, clock=lambda: now[0])
+    assert len(_admitted(policy.admit([_item() for _ in range(5)]))) == 3
+    now[0] += 1.0
+    assert len(_admitted(policy.admit([_item() for _ in range(5)]))) == 3
+    assert policy.stats()["rate_capped"] == 4
+
+
+def test_backlog_tightens_policy():
+    depth = [0]
+    policy = LLMPolicy(max_items_per_second=10**6, max_per_batch=10, monitor_rate=0.5,
+                       backlog_threshold=4, queue_depth=lambda: depth[0], rng=random.Random(1))
+    assert len(_admitted(policy.admit([_item() for _ in range(10)]))) == 10
+
+    depth[0] = 20  # 5x over the threshold -> pressure 0.2
+    assert policy.pressure() == 0.2
+    assert len(_admitted(policy.admit([_item() for _ in range(10)]))) == 2
+
+    monitors = [_item("MONITOR", "Low", 1.0) for _ in range(200)]
+    policy.max_per_batch = 10**6
+    sampled = len(_admitted(policy.admit(monitors)))
+    assert sampled < 50  # ~0.5 * 0.2 = 10% instead of 50%
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll LLM policy tests passed")
@@ -0,0 +1,141 @@
+"""Test LLM scheduler against the mock backend with simulated Groq limits (no API needed)"""
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import backends.llm_scheduler as scheduler_module
+from backends.llm_backend_mock import llm_analyze, rate_limited
+from backends.llm_scheduler import LLMScheduler, TokenBucket, item_priority
+
+
+def test_token_bucket_refill():
+    now = [0.0]
+    bucket = TokenBucket(per_minute=60, burst_seconds=2, clock=lambda: now[0])
+    assert bucket.capacity == 2
+    bucket.consume(2)
+    assert bucket.wait_time(1) == 1.0
+    now[0] += 1.0
+    assert bucket.wait_time(1) == 0.0
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the code under test sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_retries_recover_from_429():
+    # Server allows 5 calls / 0.5s; scheduler is configured too optimistic, so it
+    # has to absorb 429s through retries instead of surfacing them. Fake time and
+    # seeded jitter: the backoff sequence (and so the outcome) is fixed.
+    clock = FakeClock()
+    flaky_llm = rate_limited(llm_analyze, max_calls=5, window=0.5, clock=clock)
+    sched = LLMScheduler(rpm=6000, tpm=10**7, max_retries=8, base_delay=0.05, max_delay=0.3,
+                         clock=clock, sleep=clock.sleep)
+
+    saved = scheduler_module.random
+    scheduler_module.random = random.Random(29)
+    try:
+        results = [sched.run(lambda: flaky_llm("id=1 UNION SELECT", "")) for _ in range(12)]
+    finally:
+        scheduler_module.random = saved
+
+    assert len(results) == 12
+    assert sched.stats()["retries"] > 0
+    assert sched.stats()["failed"] == 0
+    assert clock.now >= 1.0  # calls 6-12 waited out two 0.5s windows
+
+
+def test_metering_avoids_429():
+    # Scheduler matches the simulated limit (600 rpm = 10/s, burst of 2): no 429 at all
+    strict_llm = rate_limited(llm_analyze, max_calls=5, window=0.25)
+    sched = LLMScheduler(rpm=600, tpm=10**7, max_retries=0, burst_seconds=0.2)
+
+    start = time.monotonic()
+    for _ in range(8):
+        sched.run(lambda: strict_llm("/api/users", ""))
+    elapsed = time.monotonic() - start
+
+    assert sched.stats()["retries"] == 0
+    assert elapsed >= 0.5  # 8 calls at 10/s with burst 2 → ≥ 0.6s
+
+
+def test_non_transient_error_is_not_retried():
+    sched = LLMScheduler(rpm=6000, tpm=10**7, max_retries=3)
+
+    def bad():
+        raise ValueError("bad request")
+
+    try:
+        sched.run(bad)
+        assert False, "expected ValueError"
+    except ValueError:
+        pass
+    assert sched.stats()["retries"] == 0
+
+
+def test_priority_order_when_throttled():
+    # One call per 0.1s: queued calls must be admitted highest priority first
+    sched = LLMScheduler(rpm=600, tpm=10**7, burst_seconds=0.1)
+    order = []
+
+    async def call(name, priority):
+        await sched.arun(lambda: asyncio.sleep(0, result=order.append(name)), priority=priority)
+
+    async def main():
+        await call("warmup", 0)
+        tasks = [
+            asyncio.create_task(call("low", item_priority({"severity": "Low", "rule_score": 2}))),
+            asyncio.create_task(call("high", item_priority({"severity": "Medium", "rule_score": 4}))),
+            asyncio.create_task(call("unknown", item_priority({"severity": "Info", "rule_score": 0}))),
+        ]
+        await asyncio.sleep(0.01)
+        assert sched.queue_depth == 3
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order == ["warmup", "high", "low", "unknown"], order
+
+
+def test_queued_async_waiters_do_not_poll():
+    # One call per 0.2s and 10 callers queued: only the head sleeps out the
+    # bucket wait; the others wake once each time the head changes
+    sched = LLMScheduler(rpm=300, tpm=10**7, burst_seconds=0.2)
+    checks = [0]
+    try_admit = sched._try_admit
+
+    def counting_try_admit(ticket, tokens):
+        checks[0] += 1
+        return try_admit(ticket, tokens)
+    sched._try_admit = counting_try_admit
+
+    async def main():
+        await sched.aacquire()
+        tasks = [asyncio.create_task(sched.aacquire(priority=i)) for i in range(10)]
+        await asyncio.sleep(0.5)  # ~2 admitted; 20 ms polling would make ~250 checks
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run(main())
+    assert checks[0] < 40, checks[0]
+    assert sched.queue_depth == 0 and not sched._wakers
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll scheduler tests passed (mock backend, simulated limits)")
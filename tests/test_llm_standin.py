@@ -0,0 +1,70 @@
+"""Test the offline LLM stand-in server in-process (no network, no API key)"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+from fastapi.testclient import TestClient
+
+import llm_standin_server as standin
+
+client = TestClient(standin.app)
+
+
+def _chat(content: str, model: str = "llama-3.3-70b-versatile", max_tokens: int = 200):
+    return client.post("/openai/v1/chat/completions", json={
+        "model": model,
+        "messages": [{"role": "system", "content": "x"}, {"role": "user", "content": content}],
+        "max_tokens": max_tokens,
+    })
+
+
+def _reset(**config):
+    client.post("/stats/reset")
+    standin.STANDIN_LATENCY_MS = "fixed:0"
+    standin.STANDIN_429_RATE = config.get("rate_429", 0.0)
+    standin.STANDIN_5XX_RATE = config.get("rate_5xx", 0.0)
+    standin.STANDIN_RPM = config.get("rpm", 0)
+    standin.STANDIN_TPM = config.get("tpm", 0)
+
+
+def test_openai_shaped_completion_with_usage():
+    _reset()
+    body = _chat("HTTP REQUEST:\nid=1 UNION SELECT 1\n\nRELATED CONTEXT (RAG):\nNone").json()
+    assert body["choices"][0]["message"]["content"].startswith("Suspicious")
+    assert body["usage"]["total_tokens"] == body["usage"]["prompt_tokens"] + body["usage"]["completion_tokens"]
+    assert client.get("/stats").json()["llama-3.3-70b-versatile"]["ok"] == 1
+
+
+def test_packed_prompt_gets_json_verdicts():
+    _reset()
+    prompt = "### ITEM 1\nHTTP REQUEST:\n/home\n\n### ITEM 2\nHTTP REQUEST:\n<script>alert(1)</script>\n"
+    verdicts = json.loads(_chat(prompt).json()["choices"][0]["message"]["content"])
+    assert [v["item"] for v in verdicts] == [1, 2]
+    assert [v["verdict"] for v in verdicts] == ["benign", "malicious"]
+
+
+def test_error_injection():
+    _reset(rate_429=1.0)
+    response = _chat("hello")
+    assert response.status_code == 429 and "retry-after" in response.headers
+
+    _reset(rate_5xx=1.0)
+    assert _chat("hello").status_code in (500, 502, 503)
+
+
+def test_enforced_rpm():
+    _reset(rpm=2)
+    codes = [_chat("hello").status_code for _ in range(4)]
+    assert codes == [200, 200, 429, 429]
+    assert client.get("/stats").json()["llama-3.3-70b-versatile"]["rate_limited"] == 2
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll LLM stand-in tests passed")
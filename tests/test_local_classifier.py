@@ -0,0 +1,105 @@
+"""Test the local distilled classifier on synthetic cache verdicts (no API needed)"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("GROQ_API_KEY", "standin")  # the node imports the LLM backend
+
+import backends.local_classifier as lc
+from backends.local_classifier import LocalClassifier, label_from_cache
+from nodes.nodes_local import local_classifier_node
+
+MALICIOUS = [
+    "id=1 UNION SELECT password FROM users",
+    "q=<script>alert(document.cookie)</script>",
+    "file=../../../../etc/passwd",
+    "cmd=ls;cat /etc/shadow",
+    "name=admin' OR '1'='1",
+    "search=<img src=x onerror=alert(1)>",
+    "page=....//....//etc/hosts",
+    "id=5;drop table users--",
+]
+BENIGN = [
+    "GET /api/users?page=2",
+    "search=python tutorial",
+    "GET /products/list?sort=price",
+    "login=alice&remember=true",
+    "GET /static/css/site.css",
+    "q=weather in hanoi",
+    "GET /blog/2024/05/hello-world",
+    "email=bob@example.com&newsletter=1",
+]
+
+
+def _train() -> LocalClassifier:
+    texts = MALICIOUS + BENIGN
+    return LocalClassifier.fit(texts, [1] * len(MALICIOUS) + [0] * len(BENIGN), epochs=400)
+
+
+def test_separates_training_verdicts():
+    model = _train()
+    assert all(model.predict_proba(t) > 0.5 for t in MALICIOUS)
+    assert all(model.predict_proba(t) < 0.5 for t in BENIGN)
+
+
+def test_save_load_roundtrip():
+    model = _train()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "clf.npz"
+        model.save(path)
+        loaded = LocalClassifier.load(path)
+    text = "id=2 UNION SELECT 1,2"
+    assert abs(loaded.predict_proba(text) - model.predict_proba(text)) < 1e-5
+
+
+def test_labels_from_cache_entries():
+    assert label_from_cache({"llm_output": {"verdict": "malicious", "model": "x"}}) == 1
+    assert label_from_cache({"llm_output": {"analysis": "Benign request – no malicious intent detected.", "model": "x"}}) == 0
+    assert label_from_cache({"llm_output": {"analysis": "Suspicious patterns detected.", "model": "x"}}) == 1
+    assert label_from_cache({"llm_output": {"error": "RateLimitError: 429"}}) is None
+    assert label_from_cache({"llm_output": {"verdict": "benign", "model": lc.MODEL_NAME}}) is None
+    assert label_from_cache({"blocked": True, "llm_output": None}) is None
+
+
+def test_classify_answers_confident_and_escalates_uncertain():
+    model = _train()
+    lc._MODEL, lc._LOADED = model, True
+    try:
+        threshold = lc.LOCAL_CLASSIFIER_THRESHOLD
+        lc.LOCAL_CLASSIFIER_THRESHOLD = 0.5
+        assert lc.classify(MALICIOUS[0])["verdict"] == "malicious"
+        lc.LOCAL_CLASSIFIER_THRESHOLD = 1.01  # nothing is that confident → escalate
+        assert lc.classify(MALICIOUS[0]) is None
+        assert lc.local_stats()["escalated"] >= 1
+    finally:
+        lc.LOCAL_CLASSIFIER_THRESHOLD = threshold
+        lc._MODEL, lc._LOADED = None, False
+
+
+def _item(raw_request, fast_decision):
+    return {"raw_request": raw_request, "fast_decision": fast_decision, "blocked": False, "cache_hit": False,
+            "final_msg": None, "attack_candidates": [], "rule_score": 0}
+
+
+def test_node_answers_review_items_only():
+    lc._MODEL, lc._LOADED = _train(), True
+    threshold = lc.LOCAL_CLASSIFIER_THRESHOLD
+    lc.LOCAL_CLASSIFIER_THRESHOLD = 0.5
+    try:
+        review, monitor, allow = _item(MALICIOUS[0], "REVIEW"), _item(MALICIOUS[0], "MONITOR"), _item(BENIGN[0], "ALLOW")
+        local_classifier_node({"items": [review, monitor, allow]})
+    finally:
+        lc.LOCAL_CLASSIFIER_THRESHOLD = threshold
+        lc._MODEL, lc._LOADED = None, False
+    assert review["llm_output"]["model"] == lc.MODEL_NAME and review["final_msg"]
+    assert monitor["final_msg"] is None and allow["final_msg"] is None  # left to the LLM policy
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll local classifier tests passed (synthetic verdicts)")
@@ -0,0 +1,114 @@
+"""Test async micro-batch coalescing (no API needed)"""
+import asyncio
+import gc
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backends.concurrency import MicroBatcher
+
+
+def test_concurrent_callers_share_one_batch():
+    calls = []
+
+    async def batch_fn(items, deadline):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, window=0.01, max_size=100)
+        results = await asyncio.gather(batcher.submit([1, 2]), batcher.submit([3]), batcher.submit([4, 5, 6]))
+        assert results == [[10, 20], [30], [40, 50, 60]]
+        assert calls == [[1, 2, 3, 4, 5, 6]]
+        assert batcher.stats() == {"batches": 1, "calls": 3, "items": 6}
+
+    asyncio.run(main())
+
+
+def test_max_size_flushes_early():
+    async def batch_fn(items, deadline):
+        return items
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, window=10.0, max_size=2)  # window never expires in this test
+        assert await asyncio.wait_for(batcher.submit(["a", "b"]), timeout=1.0) == ["a", "b"]
+
+    asyncio.run(main())
+
+
+def test_errors_reach_every_caller():
+    async def batch_fn(items, deadline):
+        raise TimeoutError("backend down")
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, window=0.01, max_size=100)
+        results = await asyncio.gather(batcher.submit([1]), batcher.submit([2]), return_exceptions=True)
+        assert all(isinstance(r, TimeoutError) for r in results)
+
+    asyncio.run(main())
+
+
+def test_batch_uses_latest_deadline():
+    seen = []
+
+    async def batch_fn(items, deadline):
+        seen.append(deadline)
+        return items
+
+    async def main():
+        batcher = MicroBatcher(batch_fn, window=0.01, max_size=100)
+        await asyncio.gather(batcher.submit([1], deadline=5.0), batcher.submit([2], deadline=9.0))
+        await asyncio.gather(batcher.submit([1], deadline=5.0), batcher.submit([2]))
+        assert seen == [9.0, None]
+
+    asyncio.run(main())
+
+
+def test_running_batches_are_kept_alive():
+    release = None
+
+    async def batch_fn(items, deadline):
+        await release.wait()
+        return items
+
+    async def main():
+        nonlocal release
+        release = asyncio.Event()
+        batcher = MicroBatcher(batch_fn, window=0, max_size=100)
+        pending = asyncio.ensure_future(batcher.submit([1]))
+        await asyncio.sleep(0)
+        assert len(batcher._tasks) == 1  # a strong reference while the batch runs
+        gc.collect()
+        release.set()
+        assert await asyncio.wait_for(pending, timeout=1.0) == [1]
+        assert not batcher._tasks
+
+    asyncio.run(main())
+
+
+def test_one_batcher_serves_several_event_loops():
+    async def batch_fn(items, deadline):
+        return items
+
+    batcher = MicroBatcher(batch_fn, window=0.05, max_size=100)
+
+    async def abandoned():
+        try:  # the caller gives up before the window ends; its loop then closes
+            await asyncio.wait_for(batcher.submit(["stale"]), timeout=0.01)
+        except asyncio.TimeoutError:
+            pass
+
+    async def main():
+        return await asyncio.wait_for(batcher.submit(["fresh"]), timeout=1.0)
+
+    asyncio.run(abandoned())
+    assert asyncio.run(main()) == ["fresh"]  # not queued behind the dead loop's timer
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll micro-batcher tests passed")
@@ -0,0 +1,81 @@
+"""Test the paged Chroma -> Qdrant migration (fake Chroma, in-memory Qdrant)"""
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+import migrate_chroma_to_qdrant as migrate
+from backends.rag_backend import COLLECTION_NAME, VECTOR_SIZE
+
+
+class FakeChroma:
+    """Chroma collection API subset: count() and paged get(); records the largest page served."""
+
+    def __init__(self, n):
+        rng = np.random.default_rng(0)
+        self.items = [
+            (f"doc-{i}", f"GET /item?id={i}", {"label": "anomalous" if i % 5 == 0 else "normal"}, rng.normal(size=VECTOR_SIZE))
+            for i in range(n)
+        ]
+        self.max_page = 0
+
+    def count(self):
+        return len(self.items)
+
+    def get(self, limit, offset, include):
+        page = self.items[offset:offset + limit]
+        self.max_page = max(self.max_page, len(page))
+        return {
+            "ids": [i[0] for i in page],
+            "documents": [i[1] for i in page],
+            "metadatas": [i[2] for i in page],
+            "embeddings": np.array([i[3] for i in page]),
+        }
+
+
+class LockedQdrant(QdrantClient):
+    """The in-memory client is not thread-safe (a real server is)."""
+
+    _lock = threading.Lock()
+
+    def upsert(self, *args, **kwargs):
+        with self._lock:
+            return super().upsert(*args, **kwargs)
+
+
+def test_paged_migration_verifies_counts():
+    qdrant = LockedQdrant(":memory:")
+    chroma = FakeChroma(1234)
+    result = migrate.migrate_collection(chroma, qdrant, page_size=100, workers=3)
+    assert result["ok"] and result["migrated"] == 1234 and result["qdrant_after"] == 1234
+    assert chroma.max_page == 100
+
+    # Idempotent rerun: same point ids, count unchanged
+    again = migrate.migrate_collection(chroma, qdrant, page_size=500, workers=1)
+    assert again["ok"] and again["qdrant_after"] == 1234
+
+    hit = qdrant.query_points(COLLECTION_NAME, query=chroma.items[5][3].tolist(), limit=1).points[0]
+    assert hit.payload == {"raw_request": "GET /item?id=5", "label": "anomalous", "attack_type": "normal"}
+
+
+def test_dimension_mismatch_is_reported():
+    chroma = FakeChroma(3)
+    chroma.items = [(i, d, m, e[:128]) for i, d, m, e in chroma.items]
+    try:
+        migrate.migrate_collection(chroma, QdrantClient(":memory:"))
+        assert False, "128-dim embeddings were accepted"
+    except Exception as e:
+        assert "128-dim" in str(e)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll Chroma migration tests passed")
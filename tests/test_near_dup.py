@@ -0,0 +1,80 @@
+"""Test MinHash/LSH near-duplicate compaction of the RAG corpus (in-memory Qdrant)"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from backends.near_dup import MinHasher, similarity
+from backends.rag_context import build_rag_context
+import compact_rag_corpus as compact
+
+TEMPLATE = "GET /tienda1/publico/anadir.jsp?id={i}&nombre=Jam%F3n+Ib%E9rico&precio={p}&cantidad={q}&B1=A%F1adir HTTP/1.1"
+ATTACK = "GET /tienda1/publico/anadir.jsp?id=2&nombre=Jam%F3n&precio=85' OR '1'='1&B1=A%F1adir HTTP/1.1"
+
+
+def _corpus():
+    rows = [(TEMPLATE.format(i=i, p=i * 7, q=i % 9), "normal", "normal") for i in range(40)]
+    rows.append((ATTACK, "anomalous", "SQL Injection"))
+    # Same text as a normal row, different label: must never merge across labels
+    rows.append((TEMPLATE.format(i=1, p=7, q=1), "anomalous", "Parameter Tampering"))
+    rows += [(f"POST /login.jsp user=u{i}&pass=<script>alert({i})</script>", "anomalous", "XSS") for i in range(10)]
+    return rows
+
+
+def _seed(qdrant):
+    qdrant.create_collection("rag", vectors_config=qmodels.VectorParams(size=8, distance=qmodels.Distance.COSINE))
+    rng = np.random.default_rng(0)
+    qdrant.upsert("rag", points=[
+        qmodels.PointStruct(id=i, vector=rng.normal(size=8).tolist(),
+                            payload={"raw_request": text, "label": label, "attack_type": attack})
+        for i, (text, label, attack) in enumerate(_corpus())
+    ])
+
+
+def test_minhash_separates_templates_from_attacks():
+    hasher = MinHasher()
+    a, b = hasher.signature(TEMPLATE.format(i=1, p=7, q=1)), hasher.signature(TEMPLATE.format(i=33, p=231, q=6))
+    assert similarity(a, b) >= 0.8
+    assert similarity(a, hasher.signature(ATTACK)) < 0.8
+
+
+def test_compact_in_place_keeps_counts():
+    qdrant = QdrantClient(":memory:")
+    _seed(qdrant)
+    report = compact.compact(qdrant, "rag")
+    assert report["clusters"] == 4 and report["final_points"] == 4
+
+    points, _ = qdrant.scroll("rag", limit=100)
+    counts = {(p.payload["label"], p.payload["attack_type"]): p.payload.get("member_count", 1) for p in points}
+    assert counts == {("normal", "normal"): 40, ("anomalous", "SQL Injection"): 1,
+                      ("anomalous", "Parameter Tampering"): 1, ("anomalous", "XSS"): 10}
+
+    # Idempotent: a second pass finds nothing new and keeps the counts
+    assert compact.compact(qdrant, "rag")["removed"] == 0
+    assert sum(p.payload.get("member_count", 1) for p in qdrant.scroll("rag", limit=100)[0]) == len(_corpus())
+
+
+def test_compact_into_new_collection_leaves_source():
+    qdrant = QdrantClient(":memory:")
+    _seed(qdrant)
+    compact.compact(qdrant, "rag", target="rag_compact")
+    assert qdrant.count("rag", exact=True).count == len(_corpus())
+    assert qdrant.count("rag_compact", exact=True).count == 4
+
+
+def test_member_count_reaches_the_prompt():
+    context = build_rag_context([{"raw_request": ATTACK, "label": "anomalous", "attack_type": "SQL Injection", "member_count": 12}])
+    assert "(x12)" in context
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll near-duplicate compaction tests passed")
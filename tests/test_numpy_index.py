@@ -0,0 +1,79 @@
+"""Test the in-process NumPy vector index (no Qdrant needed)"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import numpy as np
+
+from backends.numpy_index import NumpyIndex
+
+
+def _random(n, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_exact_top_k_matches_brute_force():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NumpyIndex(Path(tmp), dim=16)
+        vectors = _random(2000)
+        index.upsert([f"id{i}" for i in range(2000)], vectors, [{"n": i} for i in range(2000)])
+
+        query = _random(1, seed=1)[0]
+        normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        expected = list(np.argsort(-(normed @ query))[:5])
+        assert [payload["n"] for payload, _ in index.search([query], k=5)[0]] == expected
+
+
+def test_upsert_overwrites_by_id():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NumpyIndex(Path(tmp), dim=2)
+        index.upsert(["a", "b", "a"], [[1, 0], [0, 1], [1, 0]], [{"v": 1}, {"v": 2}, {"v": 3}])
+        index.upsert(["a"], [[0, 1]], [{"v": 4}])
+        assert index.count == 2
+        hits = index.search([[0, 1]], k=2)[0]
+        assert sorted(p["v"] for p, _ in hits) == [2, 4]
+
+
+def test_read_only_worker_sees_new_rows():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = NumpyIndex(Path(tmp), dim=2)
+        writer.upsert(["a"], [[1, 0]], [{"v": "a"}])
+        reader = NumpyIndex(Path(tmp), dim=2, read_only=True)
+        assert reader.search([[1, 0]], k=1)[0][0][0] == {"v": "a"}
+
+        writer.upsert([f"x{i}" for i in range(1500)], _random(1500, dim=2), [{"v": i} for i in range(1500)])
+        assert reader.search([[1, 0]], k=1)[0] and reader.count == 1501
+        try:
+            reader.upsert(["b"], [[0, 1]], [{}])
+            assert False, "read-only index accepted a write"
+        except Exception as e:
+            assert "read-only" in str(e)
+
+
+def test_ivf_recall():
+    with tempfile.TemporaryDirectory() as tmp:
+        index = NumpyIndex(Path(tmp), dim=16, nprobe=4)
+        # Clustered data: IVF with a few probes should find the true neighbours
+        centers = _random(20, seed=2) * 5
+        vectors = np.repeat(centers, 100, axis=0) + _random(2000, seed=3)
+        index.upsert([str(i) for i in range(2000)], vectors, [{"n": i} for i in range(2000)])
+        queries = centers[:10] + _random(10, seed=4) * 0.1
+
+        exact = [{p["n"] for p, _ in hits} for hits in index.search(queries, k=10)]
+        index.build_ivf(n_lists=20)
+        approx = [{p["n"] for p, _ in hits} for hits in index.search(queries, k=10)]
+        recall = np.mean([len(e & a) / 10 for e, a in zip(exact, approx)])
+        assert recall >= 0.9, recall
+
+        reopened = NumpyIndex(Path(tmp), dim=16, nprobe=4)
+        assert reopened.stats()["ivf_lists"] == 20
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll NumPy index tests passed")
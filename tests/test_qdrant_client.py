@@ -0,0 +1,110 @@
+"""Test the Qdrant client path: startup warm-up, one collection check, deadline-bounded search (no network)"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+import backends.rag_backend as rag
+from backends.deadline import DeadlineExceeded
+from backends.embedders import HashingEmbedder
+
+
+class Counting:
+    """Wrap a client and count calls per method."""
+
+    def __init__(self, inner, delay: float = 0.0):
+        self.inner, self.delay, self.calls = inner, delay, {}
+
+    def __getattr__(self, name):
+        method = getattr(self.inner, name)
+
+        def call(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            time.sleep(self.delay)
+            return method(*args, **kwargs)
+        return call
+
+
+class AsyncCounting(Counting):
+    def __getattr__(self, name):
+        method = getattr(self.inner, name)
+
+        async def call(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            await asyncio.sleep(self.delay)
+            return await method(*args, **kwargs)
+        return call
+
+
+def _with_clients(sync, async_, fn):
+    saved = (rag.client, rag.async_client, rag.vector_index, rag.embedder, rag.embedding_cache,
+             rag.RAG_RETRIEVAL, rag._collection_ready)
+    rag.client, rag.async_client, rag.vector_index = sync, async_, None
+    rag.embedder, rag.embedding_cache, rag.RAG_RETRIEVAL = HashingEmbedder(), None, "dense"
+    rag._collection_ready, rag._stored_families = False, None
+    rag._qdrant_breaker.reset()
+    try:
+        return fn()
+    finally:
+        (rag.client, rag.async_client, rag.vector_index, rag.embedder, rag.embedding_cache,
+         rag.RAG_RETRIEVAL, rag._collection_ready) = saved
+        rag._stored_families = None
+        rag._qdrant_breaker.reset()
+
+
+def test_startup_checks_once_and_warms_the_sync_client():
+    sync = Counting(QdrantClient(":memory:"))
+    async_ = AsyncCounting(AsyncQdrantClient(":memory:"), delay=0.01)
+
+    async def run():
+        # Concurrent first uses share one collection check
+        await asyncio.gather(*(rag._aensure_collection() for _ in range(5)))
+        await rag.astartup()
+
+    _with_clients(sync, async_, lambda: asyncio.run(run()))
+    assert async_.calls["collection_exists"] == 1 and async_.calls["create_collection"] == 1
+    assert sync.calls == {"collection_exists": 1}  # warmed, not re-checked
+
+
+def test_collection_lock_works_across_event_loops():
+    async_ = AsyncCounting(AsyncQdrantClient(":memory:"))
+
+    def run():
+        for _ in range(2):  # e.g. two scripts' asyncio.run in one process
+            asyncio.run(rag._aensure_collection())
+            rag._collection_ready = False
+        asyncio.run(rag._aensure_collection())
+
+    _with_clients(Counting(QdrantClient(":memory:")), async_, run)
+    assert async_.calls["collection_exists"] == 3
+
+
+def test_sync_search_keeps_a_fractional_deadline():
+    sync = Counting(QdrantClient(":memory:"))
+
+    def run():
+        rag.add_rag_example("GET /index.jsp", False)
+        sync.delay = 1.0  # a search slower than the budget
+        started = time.perf_counter()
+        try:
+            rag.vector_search("GET /index.jsp", deadline=time.monotonic() + 0.3)
+            assert False, "slow search returned"
+        except DeadlineExceeded:
+            pass
+        return time.perf_counter() - started
+
+    elapsed = _with_clients(sync, AsyncCounting(AsyncQdrantClient(":memory:")), run)
+    assert elapsed < 0.5  # math.ceil would have waited up to 1 s
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll Qdrant client path tests passed")
@@ -0,0 +1,59 @@
+"""Test Qdrant collection profiles and the profile benchmark (in-memory Qdrant)"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models as qmodels
+
+from backends.qdrant_profiles import PROFILES, collection_config, estimate_ram_bytes, search_params
+import benchmark_collection_profiles as bench
+
+
+def test_profile_settings():
+    assert collection_config("memory")["quantization_config"] is None
+    assert collection_config("memory")["vectors_config"].on_disk is False
+    assert collection_config("memory")["on_disk_payload"] is None  # server default, as before profiles
+
+    int8 = collection_config("int8")
+    assert int8["vectors_config"].on_disk and int8["quantization_config"].scalar.always_ram
+    assert isinstance(collection_config("binary")["quantization_config"], qmodels.BinaryQuantization)
+    assert collection_config("on_disk")["hnsw_config"].on_disk and collection_config("on_disk")["on_disk_payload"]
+
+    assert search_params("int8").quantization.rescore
+    assert search_params("int8", exact=True).quantization is None
+    assert search_params("memory").quantization is None
+
+    sizes = {name: estimate_ram_bytes(name, 10000) for name in PROFILES}
+    assert sizes["memory"] > sizes["int8"] > sizes["binary"] > sizes["on_disk"]
+
+
+def test_unknown_profile_is_rejected():
+    try:
+        collection_config("fp16")
+        assert False, "unknown profile accepted"
+    except Exception as e:
+        assert "fp16" in str(e)
+
+
+def test_benchmark_reports_every_profile():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(600, 32)).astype(np.float32)
+    report = bench.run_benchmark(QdrantClient(":memory:"), vectors[:500], vectors[500:], list(PROFILES), k=3)
+
+    assert set(report["profiles"]) == set(PROFILES)
+    for row in report["profiles"].values():
+        assert 0.0 <= row["recall@3"] <= 1.0 and row["p99_ms"] >= row["p50_ms"] >= 0
+    # The in-memory client ignores quantization and always searches exactly
+    assert report["profiles"]["memory"]["recall@3"] == 1.0
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll Qdrant profile tests passed")
@@ -0,0 +1,66 @@
+"""Test the compacted RAG context builder on CSIC-style neighbours (no API needed)"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from backends.rag_context import build_rag_context, context_stats, estimate_tokens, relevant_segments
+
+CSIC_REQUEST = """POST /tienda1/miembros/editar.jsp HTTP/1.1
+User-Agent: Mozilla/5.0 (compatible; Konqueror/3.5; Linux) KHTML/3.5.8 (like Gecko)
+Pragma: no-cache
+Cache-control: no-cache
+Accept: text/xml,application/xml,application/xhtml+xml,text/html;q=0.9,text/plain;q=0.8,image/png,*/*;q=0.5
+Accept-Encoding: x-gzip, x-deflate, gzip, deflate
+Accept-Charset: utf-8, utf-8;q=0.5, *;q=0.5
+Accept-Language: en
+Host: localhost:8080
+Cookie: JSESSIONID=F8F9F13A97715B436014E7C27BD0BD7B
+Content-Type: application/x-www-form-urlencoded
+Connection: close
+Content-Length: 68
+modo=registro&login=yigal{n}&password=x'%20OR%20'1'='1&B1=Registrar"""
+
+
+def _neighbour(n: int, label="anomalous", attack_type="SQL Injection") -> dict:
+    return {"raw_request": CSIC_REQUEST.format(n=n), "label": label, "attack_type": attack_type}
+
+
+def test_keeps_only_relevant_segments():
+    compact = relevant_segments(CSIC_REQUEST.format(n=1))
+    assert compact.startswith("POST /tienda1/miembros/editar.jsp")
+    assert "password=x'%20OR" in compact
+    assert "Accept-Encoding" not in compact and "Konqueror" not in compact
+    assert "JSESSIONID" not in compact  # plain session cookie carries no payload
+
+
+def test_near_duplicates_are_merged():
+    context = build_rag_context([_neighbour(1), _neighbour(2), _neighbour(3, "normal", "normal")])
+    lines = context.splitlines()
+    assert len(lines) == 2
+    assert lines[0].startswith("[ANOMALOUS] SQL Injection (x2): ")
+
+
+def test_token_budget_and_savings():
+    results = [_neighbour(i, attack_type=f"Type {i}") for i in range(5)]
+    before = context_stats()
+    context = build_rag_context(results, token_budget=60)
+    after = context_stats()
+
+    assert estimate_tokens(context) <= 61
+    assert context  # the top neighbour is always kept (clipped if needed)
+    assert after["tokens_saved"] - before["tokens_saved"] > 0
+    assert after["dropped"] > before["dropped"]
+
+
+def test_short_payloads_unchanged():
+    context = build_rag_context([{"raw_request": "id=1 UNION SELECT 1", "label": "anomalous", "attack_type": "SQL Injection"}])
+    assert context == "[ANOMALOUS] SQL Injection: id=1 UNION SELECT 1"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll RAG context tests passed")
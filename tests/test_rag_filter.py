@@ -0,0 +1,111 @@
+"""Test rule-family filtered retrieval (in-memory Qdrant, hashing embedder - no network)"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+import backends.rag_backend as rag
+from backends.embedders import HashingEmbedder
+
+EXAMPLES = [
+    ("GET /a.jsp?id=1 UNION SELECT pass FROM users", True, "SQL Injection"),
+    ("GET /a.jsp?id=2' or '1'='1", True, "SQL Injection"),
+    ("GET /s.jsp?q=<script>alert(1)</script>", True, "Cross-Site Scripting"),
+    ("GET /s.jsp?q=<img src=x onerror=alert(1)>", True, "Cross-Site Scripting"),
+    ("GET /home.jsp", False, None),
+]
+# Taxonomy of scripts/seed_rag_from_csic.py: attack_type holds the CSIC label
+CSIC_EXAMPLES = [(text, anomalous, "attack" if anomalous else "normal") for text, anomalous, _ in EXAMPLES]
+QUERY = "GET /a.jsp?id=3 UNION SELECT name FROM users"
+XSS = [{"type": "Cross-Site Scripting", "score": 5}]
+
+
+def _setup(examples=EXAMPLES):
+    rag.embedder = HashingEmbedder()
+    rag.embedding_cache = None
+    rag.vector_index = None
+    rag.client = QdrantClient(":memory:")
+    rag.async_client = AsyncQdrantClient(":memory:")
+    rag._collection_ready, rag._stored_families = False, None
+    for text, anomalous, attack_type in examples:
+        rag.add_rag_example(text, anomalous, attack_type)
+
+
+def test_filter_restricts_to_rule_families():
+    _setup()
+    hits = rag.vector_search(QUERY, k=2, attack_candidates=XSS)
+    assert [h["attack_type"] for h in hits] == ["Cross-Site Scripting", "Cross-Site Scripting"]
+
+    # No candidates: whole collection, nearest first
+    assert rag.vector_search(QUERY, k=1)[0]["attack_type"] == "SQL Injection"
+
+
+def test_short_family_is_topped_up_from_whole_collection():
+    _setup()
+    before = rag.rag_filter_stats()["fallbacks"]
+    hits = rag.vector_search(QUERY, k=4, attack_candidates=XSS)
+    assert [h["attack_type"] for h in hits[:2]] == ["Cross-Site Scripting", "Cross-Site Scripting"]
+    assert len(hits) == 4 and len({h["raw_request"] for h in hits}) == 4
+    assert rag.rag_filter_stats()["fallbacks"] == before + 1
+
+
+def test_async_batch_mixes_filtered_and_unfiltered():
+    _setup()
+    rag._collection_ready, rag._stored_families = False, None   # the async in-memory client is a separate store
+
+    async def run():
+        for text, anomalous, attack_type in EXAMPLES:
+            await rag.aadd_rag_example(text, anomalous, attack_type)
+        return await rag.avector_search_batch(
+            [QUERY, QUERY], k=2, attack_candidates=[XSS, None]
+        )
+
+    filtered, unfiltered = asyncio.run(run())
+    assert {h["attack_type"] for h in filtered} == {"Cross-Site Scripting"}
+    assert unfiltered[0]["attack_type"] == "SQL Injection"
+
+
+class CountingQueries:
+    """Wrap the client and count batch queries (one per Qdrant round trip)."""
+
+    def __init__(self, inner):
+        self.inner, self.queries = inner, 0
+
+    def __getattr__(self, name):
+        if name == "query_batch_points":
+            self.queries += 1
+        return getattr(self.inner, name)
+
+
+def test_families_missing_from_the_corpus_search_unfiltered():
+    _setup(CSIC_EXAMPLES)
+    assert rag.stored_families() == {"attack", "normal"}
+    rag.client = CountingQueries(rag.client)
+    before = rag.rag_filter_stats()
+
+    hits = rag.vector_search(QUERY, k=2, attack_candidates=[{"type": "SQL Injection", "score": 9}])
+    assert hits == rag.vector_search(QUERY, k=2)
+    assert rag.client.queries == 2  # one round trip each: no empty filtered query + top-up
+    assert rag.rag_filter_stats()["filtered"] == before["filtered"]
+    assert rag.rag_filter_stats()["fallbacks"] == before["fallbacks"]
+
+
+def test_stored_families_follow_new_examples():
+    _setup()
+    assert rag.stored_families() == {"SQL Injection", "Cross-Site Scripting", "normal"}
+    rag.add_rag_example("GET /f.jsp?file=../../etc/passwd", True, "Directory Traversal")
+    assert "Directory Traversal" in rag.stored_families()
+    hits = rag.vector_search(QUERY, k=1, attack_candidates=[{"type": "Directory Traversal", "score": 7}])
+    assert hits[0]["attack_type"] == "Directory Traversal"
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll filtered retrieval tests passed")
@@ -0,0 +1,172 @@
+"""Test RAG snapshot export / restore with manifest checks (numpy backend, hashing embedder - no network)"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import threading
+
+import backends.rag_backend as rag
+import backends.rag_snapshot as snap
+from backends.embedders import HashingEmbedder
+from backends.numpy_index import NumpyIndex
+
+EXAMPLES = [(f"GET /tienda1/publico/anadir.jsp?id={i}&precio={i * 3}", False, None) for i in range(20)]
+EXAMPLES += [("GET /tienda1/publico/anadir.jsp?id=1'+union+select+pass+from+users", True, "SQL Injection")]
+
+
+def _use_index(tmp: Path, name: str) -> None:
+    rag.VECTOR_BACKEND = "numpy"
+    rag.embedder = HashingEmbedder()
+    rag.embedding_cache = None
+    rag.vector_index = NumpyIndex(tmp / name / rag.COLLECTION_NAME, rag.VECTOR_SIZE)
+    rag.LEXICAL_INDEX_DIR = tmp / name / "lexical"
+    rag.lexical_index = None
+
+
+def _run(check):
+    saved = rag.VECTOR_BACKEND, rag.embedder, rag.embedding_cache, rag.vector_index, rag.LEXICAL_INDEX_DIR
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            check(Path(tmp))
+    finally:
+        rag.VECTOR_BACKEND, rag.embedder, rag.embedding_cache, rag.vector_index, rag.LEXICAL_INDEX_DIR = saved
+        rag.lexical_index = None
+
+
+def _export(tmp: Path) -> dict:
+    _use_index(tmp, "seeded")
+    rag.add_rag_examples(EXAMPLES)
+    rag.build_lexical_index()
+    return snap.export_snapshot(tmp / "snapshot")
+
+
+def test_export_then_restore_on_fresh_node():
+    def check(tmp):
+        manifest = _export(tmp)
+        assert manifest["points"] == len(EXAMPLES) and manifest["embedder"] == "hashing"
+        assert manifest["lexical_index"] and (tmp / "snapshot" / manifest["snapshot"]).exists()
+
+        _use_index(tmp, "fresh")
+        assert snap.collection_points() == 0
+        assert snap.restore_snapshot(tmp / "snapshot")
+        assert snap.collection_points() == len(EXAMPLES)
+        assert snap.corpus_hash(rag.corpus_payloads()) == manifest["corpus_hash"]
+        assert rag.lexical_index_path().exists()
+        assert rag.vector_search("GET /x.jsp?id=2'+union+select+1", k=1)[0]["attack_type"] == "SQL Injection"
+
+        # Populated collection: left alone unless forced
+        assert not snap.restore_snapshot(tmp / "snapshot")
+        assert snap.restore_snapshot(tmp / "snapshot", force=True)
+        assert snap.collection_points() == len(EXAMPLES)
+    _run(check)
+
+
+def test_mismatched_or_corrupt_snapshot_is_not_loaded():
+    def check(tmp):
+        _export(tmp)
+        manifest_path = tmp / "snapshot" / snap.MANIFEST_NAME
+        manifest = json.loads(manifest_path.read_text())
+
+        _use_index(tmp, "fresh")
+        manifest_path.write_text(json.dumps({**manifest, "embedder": "hf"}))
+        assert "embedder" in snap.manifest_mismatch(snap.read_manifest(tmp / "snapshot"))
+        assert not snap.restore_snapshot(tmp / "snapshot")
+        assert snap.collection_points() == 0
+
+        manifest_path.write_text(json.dumps({**manifest, "sha256": "0" * 64}))
+        try:
+            snap.restore_snapshot(tmp / "snapshot")
+            raise AssertionError("corrupt snapshot was restored")
+        except Exception as e:
+            assert "checksum" in str(e)
+    _run(check)
+
+
+def test_concurrent_workers_restore_once():
+    def check(tmp):
+        manifest = _export(tmp)
+        _use_index(tmp, "fresh")
+        outcomes, errors = [], []
+
+        def worker():  # every uvicorn worker runs the startup restore
+            try:
+                outcomes.append(snap.restore_snapshot(tmp / "snapshot"))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert not errors and sorted(outcomes) == [False, False, False, True]
+        assert snap.collection_points() == manifest["points"]
+        # The swap leaves no staging, retired or old versioned directories behind
+        names = [p.name for p in rag.vector_index.path.parent.iterdir()]
+        assert not [n for n in names if ".restore-" in n or ".old-" in n or ".link-" in n]
+        assert len([n for n in names if ".v" in n]) == 1 and rag.vector_index.path.is_symlink()
+    _run(check)
+
+
+def test_readers_see_the_old_or_new_index_during_a_restore():
+    def check(tmp):
+        manifest = _export(tmp)
+        _use_index(tmp, "fresh")
+        assert snap.restore_snapshot(tmp / "snapshot")
+        reader = NumpyIndex(rag.vector_index.path, rag.VECTOR_SIZE, read_only=True)  # another worker
+        done, seen, errors = threading.Event(), set(), []
+
+        def read():
+            while not done.is_set():
+                try:
+                    assert (reader.path / "meta.json").exists(), "index missing mid-restore"
+                    reader.refresh()
+                    seen.add(reader.count)
+                    assert len(reader.payloads()) == manifest["points"]
+                except Exception as e:
+                    errors.append(e)
+                    return
+
+        thread = threading.Thread(target=read)
+        thread.start()
+        try:
+            for _ in range(20):
+                assert snap.restore_snapshot(tmp / "snapshot", force=True)
+        finally:
+            done.set()
+            thread.join()
+        assert not errors, errors
+        assert seen == {manifest["points"]}  # never an empty or missing index
+    _run(check)
+
+
+def test_restore_checks_the_corpus_hash():
+    def check(tmp):
+        _export(tmp)
+        manifest_path = tmp / "snapshot" / snap.MANIFEST_NAME
+        manifest = json.loads(manifest_path.read_text())
+        manifest_path.write_text(json.dumps({**manifest, "corpus_hash": "0" * 64}))
+
+        _use_index(tmp, "fresh")
+        try:
+            snap.restore_snapshot(tmp / "snapshot")
+            raise AssertionError("restore with a different corpus passed")
+        except Exception as e:
+            assert "corpus hash" in str(e)
+    _run(check)
+
+
+def test_corpus_hash_ignores_order():
+    a, b = {"raw_request": "a", "label": "normal"}, {"raw_request": "b", "label": "anomalous"}
+    assert snap.corpus_hash([a, b]) == snap.corpus_hash([b, a]) != snap.corpus_hash([a])
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll RAG snapshot tests passed")
@@ -0,0 +1,98 @@
+"""Test bounded fan-out (run_bounded / arun_bounded): order, concurrency cap, failure isolation"""
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+from backends.concurrency import arun_bounded, run_bounded
+
+
+class InFlight:
+    """Track the peak number of concurrent calls."""
+
+    def __init__(self):
+        self.now = self.peak = 0
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.now += 1
+            self.peak = max(self.peak, self.now)
+
+    def leave(self):
+        with self._lock:
+            self.now -= 1
+
+
+def test_results_keep_input_order():
+    # Later calls finish first
+    def slow(i):
+        time.sleep(0.01 * (5 - i))
+        return i * 10
+    assert run_bounded(slow, [(i,) for i in range(5)], limit=5) == [0, 10, 20, 30, 40]
+
+    async def aslow(i):
+        await asyncio.sleep(0.01 * (5 - i))
+        return i * 10
+    assert asyncio.run(arun_bounded(aslow, [(i,) for i in range(5)], limit=5)) == [0, 10, 20, 30, 40]
+
+
+def test_concurrency_is_capped():
+    flight = InFlight()
+
+    def call(i):
+        flight.enter()
+        time.sleep(0.02)
+        flight.leave()
+        return i
+    started = time.perf_counter()
+    assert run_bounded(call, [(i,) for i in range(8)], limit=3) == list(range(8))
+    assert flight.peak == 3
+    assert time.perf_counter() - started < 8 * 0.02  # ran concurrently, not one by one
+
+    aflight = InFlight()
+
+    async def acall(i):
+        aflight.enter()
+        await asyncio.sleep(0.01)
+        aflight.leave()
+        return i
+    assert asyncio.run(arun_bounded(acall, [(i,) for i in range(8)], limit=2)) == list(range(8))
+    assert aflight.peak == 2
+
+
+def test_one_failure_does_not_affect_the_others():
+    def call(i):
+        if i == 2:
+            raise ConnectionError("groq down for this pack")
+        return i
+    results = run_bounded(call, [(i,) for i in range(4)], limit=4)
+    assert results[:2] == [0, 1] and results[3] == 3
+    assert isinstance(results[2], ConnectionError)
+
+    async def acall(i):
+        if i == 0:
+            raise TimeoutError("slow pack")
+        return i
+    results = asyncio.run(arun_bounded(acall, [(i,) for i in range(3)], limit=2))
+    assert isinstance(results[0], TimeoutError) and results[1:] == [1, 2]
+
+
+def test_sequential_and_empty():
+    calls = []
+    assert run_bounded(lambda i: calls.append(threading.get_ident()) or i, [(1,), (2,)], limit=1) == [1, 2]
+    assert set(calls) == {threading.get_ident()}  # limit 1: caller's thread, no pool
+    assert run_bounded(lambda: 1, [], limit=4) == []
+    assert asyncio.run(arun_bounded(lambda: 1, [], limit=4)) == []
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll bounded fan-out tests passed")
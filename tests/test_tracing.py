@@ -0,0 +1,196 @@
+"""Test per-request span tracing: nesting, threads, coalesced batches, debug summary, console export"""
+import sys
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from typing import Any, TypedDict
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+
+from langgraph.graph import END, StateGraph
+
+from backends.concurrency import MicroBatcher, run_bounded
+import backends.tracing as tracing
+from backends.tracing import ConsoleExporter, Trace, activate, atraced_node, span, traced_node
+
+
+def _by_name(trace):
+    return {s["name"]: s for s in trace.spans}
+
+
+def test_spans_nest_and_record_errors():
+    with span("outside") as record:
+        assert record is None  # untraced: no-op
+
+    trace = Trace()
+    with activate(trace):
+        with span("node", kind="node", items=2):
+            with span("call", model="m", skipped=None):
+                time.sleep(0.01)
+            try:
+                with span("failing"):
+                    raise ConnectionError("down")
+            except ConnectionError:
+                pass
+    spans = _by_name(trace)
+    assert spans["call"]["parent_id"] == spans["node"]["span_id"]
+    assert spans["node"]["parent_id"] is None
+    assert spans["call"]["attributes"] == {"model": "m"}
+    assert spans["call"]["duration_ms"] >= 10
+    assert spans["failing"]["error"] == "ConnectionError: down"
+
+
+def test_worker_threads_record_into_the_request_trace():
+    trace = Trace()
+
+    def work(n):
+        with span(f"call-{n}"):
+            return n
+
+    with activate(trace), span("llm", kind="node"):
+        assert run_bounded(work, [(1,), (2,), (3,)], limit=3) == [1, 2, 3]
+    spans = _by_name(trace)
+    assert {f"call-{n}" for n in (1, 2, 3)} <= set(spans)
+    assert all(spans[f"call-{n}"]["parent_id"] == spans["llm"]["span_id"] for n in (1, 2, 3))
+
+
+def test_coalesced_batch_spans_reach_every_caller():
+    async def batch_fn(items, deadline):
+        with span("qdrant.search", queries=len(items)):
+            await asyncio.sleep(0)
+        return items
+
+    async def run():
+        batcher = MicroBatcher(batch_fn, window=0.01, max_size=100)
+        traces = [Trace(), Trace()]
+
+        async def request(trace, items):
+            with activate(trace), span("rag", kind="node"):
+                return await batcher.submit(items)
+
+        results = await asyncio.gather(request(traces[0], ["a"]), request(traces[1], ["b", "c"]))
+        return traces, results
+
+    traces, results = asyncio.run(run())
+    assert results == [["a"], ["b", "c"]]
+    for trace in traces:
+        spans = _by_name(trace)
+        assert spans["qdrant.search"]["parent_id"] == spans["rag"]["span_id"]
+        assert spans["qdrant.search"]["attributes"] == {"queries": 3, "coalesced": 2}
+
+
+def test_summary_attributes_calls_to_their_items():
+    trace = Trace()
+    items = [{"id": "a"}, {"id": "b"}]
+    with activate(trace):
+        with span("llm", kind="node", items=2):
+            with span("llm.pack", item_ids=["b"]):
+                with span("llm.complete"):
+                    pass
+        with span("response", kind="node"):
+            pass
+    trace.finish()
+    debug = trace.summary(items)
+    assert [s["name"] for s in debug["spans"]] == ["llm", "llm.pack", "llm.complete", "response"]
+    assert debug["total_ms"] >= debug["spans"][0]["duration_ms"]
+    a, b = debug["items"]
+    assert set(a["stages_ms"]) == {"llm", "response"}
+    assert set(b["stages_ms"]) == {"llm", "llm.pack", "llm.complete", "response"}
+
+
+class _State(TypedDict):
+    items: list
+    trace: Any
+
+
+def test_traced_nodes_in_a_graph():
+    def work(state):
+        with span("embedding"):
+            pass
+        return {"items": state["items"] + ["done"]}
+
+    async def awork(state):
+        with span("embedding"):
+            await asyncio.sleep(0)
+        return {"items": state["items"] + ["done"]}
+
+    for node, run in ((traced_node("rag", work), lambda app, s: app.invoke(s)),
+                      (atraced_node("rag", awork), lambda app, s: asyncio.run(app.ainvoke(s)))):
+        graph = StateGraph(_State)
+        graph.add_node("rag", node)
+        graph.set_entry_point("rag")
+        graph.add_edge("rag", END)
+        app = graph.compile()
+
+        trace = Trace()
+        assert run(app, {"items": [], "trace": trace})["items"] == ["done"]
+        spans = _by_name(trace)
+        assert spans["rag"]["kind"] == "node" and spans["embedding"]["parent_id"] == spans["rag"]["span_id"]
+        assert run(app, {"items": [], "trace": None})["items"] == ["done"]  # untraced request
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.exported = []
+
+    def export(self, trace):
+        self.exported.append(trace)
+
+
+def test_a_failing_node_still_closes_and_exports_the_trace():
+    def fail(state):
+        raise ConnectionError("qdrant down")
+
+    async def afail(state):
+        raise ConnectionError("qdrant down")
+
+    saved = tracing.exporter
+    tracing.exporter = recorder = RecordingExporter()
+    try:
+        for node, run in ((traced_node("rag", fail), lambda app, s: app.invoke(s)),
+                          (atraced_node("rag", afail), lambda app, s: asyncio.run(app.ainvoke(s)))):
+            graph = StateGraph(_State)
+            graph.add_node("rag", node)
+            graph.set_entry_point("rag")
+            graph.add_edge("rag", END)
+            app = graph.compile()
+
+            trace = Trace()
+            try:
+                run(app, {"items": [], "trace": trace})
+                assert False, "the failing node returned"
+            except ConnectionError:
+                pass
+            assert trace.end is not None and recorder.exported[-1] is trace
+            assert _by_name(trace)["rag"]["error"] == "ConnectionError: qdrant down"
+            tracing.end_trace(trace)  # closing again (e.g. by the response node) exports nothing more
+        assert len(recorder.exported) == 2
+    finally:
+        tracing.exporter = saved
+
+
+def test_console_exporter_prints_the_span_tree():
+    trace = Trace()
+    with activate(trace):
+        with span("rag", kind="node", items=1):
+            with span("qdrant.search", queries=1, item_ids=["x"]):
+                pass
+    trace.finish()
+    out = StringIO()
+    with redirect_stdout(out):
+        ConsoleExporter().export(trace)
+    lines = out.getvalue().splitlines()
+    assert lines[0].startswith(f"[trace {trace.trace_id[:12]}]")
+    assert lines[1].lstrip().startswith("rag") and lines[2].startswith("    qdrant.search")
+    assert "queries=1" in lines[2] and "item_ids" not in lines[2]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll tracing tests passed")
@@ -0,0 +1,127 @@
+"""Test canonical verdict-cache keys and the warm-up job / artifact (no pipeline backends needed)"""
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+import asyncio
+import hashlib
+import json
+import pickle
+
+import backends.cache_backend as cache
+import warm_verdict_cache as warmup
+
+
+def _isolated(check):
+    """Run check() against an empty in-memory cache; the real cache is restored afterwards."""
+    saved = dict(cache._CACHE), dict(cache._WARMUP), cache.CACHE_FILE
+    cache._CACHE.clear()
+    cache._WARMUP.clear()
+    try:
+        with tempfile.TemporaryDirectory() as tmp, cache.deferred_saves(persist=False):
+            cache.CACHE_FILE = Path(tmp) / "cache_data.pkl"
+            check(Path(tmp))
+    finally:
+        cache._CACHE.clear()
+        cache._CACHE.update(saved[0])
+        cache._WARMUP.clear()
+        cache._WARMUP.update(saved[1])
+        cache.CACHE_FILE = saved[2]
+
+
+async def _fake_pipeline(state):
+    """Stands in for soc_app.ainvoke: caches a verdict unless the request 'degrades'."""
+    for text in state["requests"]:
+        if "timeout" not in text:
+            cache.cache_set(text, {"raw_request": text, "blocked": "union" in text.lower()})
+
+
+def test_canonical_key_ignores_case_whitespace_and_line_endings():
+    a = "GET /a.jsp?id=1  UNION SELECT 1 HTTP/1.1\r\nHost: Example\r\n"
+    b = "get /a.jsp?id=1 union select 1 http/1.1\n  host: example"
+    assert cache._make_key(a) == cache._make_key(b)
+    assert cache._make_key(a) != cache._make_key("GET /a.jsp?id=2 UNION SELECT 1 HTTP/1.1")
+
+
+def test_old_keys_are_migrated_on_load():
+    raw = "GET /x  HTTP/1.1\r\n"
+    old = {hashlib.sha256(raw.lower().encode()).hexdigest(): {"raw_request": raw, "blocked": False}}
+    assert cache._make_key(raw) in cache._rekey(old)
+
+
+def test_warm_job_writes_loadable_artifact():
+    def check(tmp):
+        texts = ["GET /a?id=1 UNION SELECT 1", "get /a?id=1 union select 1", "GET /home", "GET /timeout"]
+        pending = warmup.pending_requests(texts, set())
+        assert len(pending) == 3  # canonical duplicates run once
+
+        entries, missed = asyncio.run(warmup.warm(pending, _fake_pipeline, batch_size=2, concurrency=2))
+        assert len(entries) == 2 and missed == 1
+        cache.save_warmup(tmp / "warm.pkl", entries, "test")
+
+        # Fresh process: live verdicts win, warm ones fill the gaps
+        cache._CACHE.clear()
+        cache._WARMUP.clear()
+        cache.cache_set("GET /home", {"raw_request": "GET /home", "blocked": True, "live": True})
+        assert cache.load_warmup(tmp / "warm.pkl") == 1
+        assert cache.cache_get("GET /HOME")["live"]
+        assert cache.cache_get("GET /a?id=1   union select 1")["blocked"]
+        assert cache.cache_info()["warmup_loaded"] >= 1
+
+        # Resume: only the uncached request is pending
+        assert warmup.pending_requests(texts, set(cache.read_warmup(tmp / "warm.pkl"))) == ["GET /timeout"]
+    _isolated(check)
+
+
+def test_cache_writes_persist_only_live_entries():
+    def check(tmp):
+        warm = {cache._make_key(f"GET /warm/{i}"): {"raw_request": f"GET /warm/{i}", "blocked": False}
+                for i in range(2000)}
+        cache.save_warmup(tmp / "warm.pkl", warm, "test")
+        assert cache.load_warmup(tmp / "warm.pkl") == 2000
+
+        cache.cache_set("GET /warm/7", {"raw_request": "GET /warm/7", "blocked": True})  # live verdict wins
+        cache.cache_set("GET /live", {"raw_request": "GET /live", "blocked": False})
+        cache._save_cache()
+        with open(cache.CACHE_FILE, "rb") as f:
+            persisted = pickle.load(f)
+        assert set(persisted) == {cache._make_key("GET /warm/7"), cache._make_key("GET /live")}
+
+        assert cache.cache_get("GET /warm/7")["blocked"] and not cache.cache_get("GET /warm/8")["blocked"]
+        assert cache.cache_info()["cached_items"] == 2001 and cache.cache_info()["warmup_items"] == 1999
+        assert len(cache.cache_entries()) == 2001
+        assert cache.load_warmup(tmp / "warm.pkl") == 0  # live and already-loaded keys are skipped
+    _isolated(check)
+
+
+def test_offline_policy_admits_every_item():
+    items = [{"fast_decision": "MONITOR", "severity": "Low", "rule_score": 0.0, "attack_type": "Unknown"}
+             for _ in range(300)]
+    items += [{"fast_decision": "REVIEW", "severity": "Medium", "rule_score": 4.0} for _ in range(300)]
+    policy = warmup.offline_policy()
+    policy.queue_depth = lambda: 10**6  # even a backed-up scheduler samples nothing out
+    assert all(reason == "" for _, reason in policy.admit(items))
+
+
+def test_jsonl_and_audit_log_sources():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "requests.jsonl"
+        path.write_text("\n".join([
+            json.dumps("GET /plain"),
+            json.dumps({"request": "GET /req"}),
+            json.dumps({"time": "2026-01-01T00:00:00", "raw_request": "GET /audit", "blocked": False}),
+            "not json",
+            json.dumps({"other": 1}),
+        ]))
+        assert warmup.load_jsonl(path) == ["GET /plain", "GET /req", "GET /audit"]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print(f"✅ {name}")
+    print("\nAll verdict warm-up tests passed")